@@ -0,0 +1 @@
+"""页面共用的数据访问层：列式存储、预聚合与查询。"""
@@ -0,0 +1,77 @@
+"""原始记录浏览：倒排位图索引 + 服务端分页
+
+对 火警类型、所属街道、实/虚警 的每个取值建一张位图（np.packbits，每行 1 bit），
+筛选时同列取值按位或、不同列按位与，得到命中行；排序用缓存的 argsort 排列，
+只取出当前页的行交给前端，避免把全部命中记录序列化到浏览器。
+"""
+import numpy as np
+
+INDEX_COLS = ['火警类型', '所属街道', '实/虚警']
+PAGE_SIZES = [20, 50, 100, 200]
+
+
+class RecordIndex:
+    """只读记录索引，构造一次后反复查询"""
+
+    def __init__(self, df, index_cols=INDEX_COLS):
+        self.df = df.reset_index(drop=True)
+        self.n = len(self.df)
+        self.bitmaps = {col: self._build_bitmaps(self.df[col]) for col in index_cols}
+        self._orders = {}
+
+    def _build_bitmaps(self, col):
+        values = col.astype('category')
+        codes = values.cat.codes.to_numpy()
+        # 按编码排序后分段，每个取值只扫描一次自己的行
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(values.cat.categories) + 1))
+        bitmaps = {}
+        for k, value in enumerate(values.cat.categories):
+            mask = np.zeros(self.n, dtype=bool)
+            mask[order[bounds[k]:bounds[k + 1]]] = True
+            bitmaps[value] = np.packbits(mask)
+        return bitmaps
+
+    def options(self, col):
+        return list(self.bitmaps[col])
+
+    def match(self, filters):
+        """filters：{列: 取值列表}，空列表不过滤；返回命中位图（打包的 uint8）"""
+        full = np.packbits(np.ones(self.n, dtype=bool))
+        result = full
+        for col, values in filters.items():
+            if not values:
+                continue
+            col_bits = np.zeros_like(full)
+            for value in values:
+                bits = self.bitmaps[col].get(value)
+                if bits is not None:
+                    col_bits |= bits
+            result = result & col_bits
+        return result
+
+    def count(self, bits):
+        return int(np.unpackbits(bits, count=self.n).sum())
+
+    def _order(self, sort_by, ascending):
+        key = (sort_by, ascending)
+        if key not in self._orders:
+            col = self.df[sort_by]
+            order = col.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+            self._orders[key] = order
+        return self._orders[key]
+
+    def query(self, filters, sort_by=None, ascending=True, page=1, page_size=50):
+        """返回 (当前页 DataFrame, 命中总数)，page 从 1 开始"""
+        mask = np.unpackbits(self.match(filters), count=self.n).astype(bool)
+        if sort_by:
+            order = self._order(sort_by, ascending)
+            positions = order[mask[order]]
+        else:
+            positions = np.flatnonzero(mask)
+        start = (max(page, 1) - 1) * page_size
+        return self.df.iloc[positions[start:start + page_size]], len(positions)
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
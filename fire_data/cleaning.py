@@ -0,0 +1,74 @@
+"""每日火警详情的逐块清洗规则
+
+批量清洗（预处理/data_clean.py）和实时接入（fire_data/ingest.py）共用：删列、重排、关键列去空、
+时间列转 datetime64、微站处置归并，以及导出旧版 CSV 时的时间字符串格式。
+"""
+import pandas as pd
+import pyarrow as pa
+
+# 删除不需要的列
+COLUMNS_TO_DROP = ['中队出警用时', 'zzjly', 'ddjq', '中队到场用时']
+
+# 列顺序与目标 CSV 一致
+DESIRED_ORDER = [
+    '立案时间', '火警地址', '火警类型', '所属大队', '所属街道',
+    '实/虚警', '所属队站', '备注内容', '微站',
+    '微站调派时间', '微站出动时间', '微站到场时间', '微站出动用时',
+    '中队到场时间', '微站出水情况', '微站处置', '建筑物内/外', '中队出动时间'
+]
+
+# 关键列有空值的行删除
+REQUIRED_COLS = [
+    '微站调派时间', '微站出动时间', '所属大队',
+    '微站到场时间', '微站出动用时',
+    '中队到场时间', '中队出动时间',
+    '所属队站', '微站'
+]
+
+TIME_COLS = [
+    '立案时间', '微站调派时间', '微站出动时间',
+    '微站到场时间', '中队到场时间', '中队出动时间'
+]
+NUMERIC_COLS = ['微站出动用时']
+
+# 输出表结构：时间列为时间戳，用时为浮点，其余为字符串
+SCHEMA = pa.schema([
+    (col, pa.timestamp('us') if col in TIME_COLS else pa.float64() if col in NUMERIC_COLS else pa.string())
+    for col in DESIRED_ORDER
+])
+
+
+def format_dt_no_leading_zero(s):
+    """时间列转成 M/D/YYYY H:MM（去秒、去前导零），空值为空串；整列向量化拼接"""
+    text = (s.dt.month.astype('Int64').astype(str) + '/' + s.dt.day.astype('Int64').astype(str) + '/'
+            + s.dt.year.astype('Int64').astype(str) + ' ' + s.dt.hour.astype('Int64').astype(str) + ':'
+            + s.dt.minute.astype('Int64').astype(str).str.zfill(2))
+    return text.where(s.notna(), '')
+
+
+def clean_chunk(df, normalizer):
+    """单块清洗：删列、重排、关键列去空、时间列转 datetime64、微站处置归并（规则见 fire_data/disposal_rules.json）"""
+    df = df.drop(columns=[col for col in COLUMNS_TO_DROP if col in df.columns])
+    missing = [col for col in DESIRED_ORDER if col not in df.columns]
+    if missing:
+        raise KeyError(f"以下列在原表中不存在，请检查列名：{missing}")
+    df = df[DESIRED_ORDER].dropna(subset=REQUIRED_COLS)
+
+    for col in TIME_COLS:
+        df[col] = pd.to_datetime(df[col], errors='coerce').astype('datetime64[us]')
+    for col in NUMERIC_COLS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in DESIRED_ORDER:
+        if col not in TIME_COLS and col not in NUMERIC_COLS:
+            df[col] = df[col].astype('string')
+    df['微站处置'] = normalizer.normalize(df['微站处置'])
+    return df.reset_index(drop=True)
+
+
+def legacy_csv_frame(df):
+    """旧版 CSV 的时间字符串格式；缺失的微站处置沿用原脚本 astype(str) 写出的 'nan'（pandas 读回仍是缺失值）"""
+    out = df.copy()
+    for col in TIME_COLS:
+        out[col] = format_dt_no_leading_zero(out[col])
+    out['微站处置'] = out['微站处置'].fillna('nan')
+    return out
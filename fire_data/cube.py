@@ -0,0 +1,108 @@
+"""数据总览预聚合立方体
+
+按 日期 × 小时 × 所属街道 × 所属大队 × 所属队站 × 火警类型 × 实/虚警 × 微站处置 预先计数，
+存成一张紧凑的 Feather 表（类别列 + 小整数）。看板的各项统计都在立方体上切片求和，
+不再扫描原始记录；立方体行数只取决于维度组合数，与历史年数基本无关。
+"""
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from fire_data import store
+
+CUBE_DIMS = ['日期', '小时', '所属街道', '所属大队', '所属队站', '火警类型', '实/虚警', '微站处置']
+MEASURE = '警情数'
+CUBE_PATH = store.COLUMNAR_DIR / 'incidents_cube.feather'
+
+
+def build_cube(df):
+    """由警情明细构造立方体，返回 (立方体, 元信息)"""
+    frame = pd.DataFrame({
+        '日期': df['立案时间'].dt.normalize(),
+        '小时': df['立案时间'].dt.hour.astype('Int8'),
+        '所属街道': df['所属街道'],
+        '所属大队': df['所属大队'],
+        '所属队站': df['所属队站'],
+        '火警类型': df['火警类型'],
+        '实/虚警': df['实/虚警'],
+        '微站处置': df['微站处置'],
+    })
+    cube = frame.groupby(CUBE_DIMS, observed=True, dropna=False).size().rename(MEASURE).reset_index()
+    cube[MEASURE] = cube[MEASURE].astype('int32')
+    for col in CUBE_DIMS[2:]:
+        cube[col] = cube[col].astype('category')
+    meta = {'记录数': int(len(df)), '微站数量': int(df['微站'].nunique())}
+    return cube, meta
+
+
+def save_cube(cube, meta, path=CUBE_PATH):
+    table = pa.Table.from_pandas(cube, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}), b'cube_meta': json.dumps(meta, ensure_ascii=False).encode(),
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    feather.write_feather(table, path, compression='uncompressed')
+
+
+def is_current(path=CUBE_PATH):
+    """立方体存在、不比警情明细旧，且与当前实时接入数据版本一致"""
+    source = store.csv_path('incidents')
+    if not path.exists() or (source.exists() and source.stat().st_mtime > path.stat().st_mtime):
+        return False
+    meta = json.loads(store.read_schema(path).metadata[b'cube_meta'].decode())
+    return meta.get('数据版本', 0) == store.data_version()
+
+
+def load_cube(path=CUBE_PATH):
+    """读取立方体；警情明细比立方体新或实时接入了新警情时重新构造"""
+    if not is_current(path):
+        version = store.data_version()
+        cube, meta = build_cube(store.load('incidents'))
+        save_cube(cube, {**meta, '数据版本': version}, path)
+    table = feather.read_table(path, memory_map=True)
+    meta = json.loads(table.schema.metadata[b'cube_meta'].decode())
+    return AlarmCube(table.to_pandas(), meta)
+
+
+class AlarmCube:
+    """立方体的切片与汇总"""
+
+    def __init__(self, cells, meta=None):
+        self.cells = cells
+        self.meta = meta or {}
+
+    def slice(self, filters=None, date_range=None):
+        """filters：{维度: 取值列表}，空列表表示不过滤；date_range：(起, 止) 闭区间"""
+        mask = pd.Series(True, index=self.cells.index)
+        for dim, values in (filters or {}).items():
+            if values:
+                mask &= self.cells[dim].isin(values)
+        if date_range is not None:
+            start, end = (pd.Timestamp(d) for d in date_range)
+            mask &= self.cells['日期'].between(start, end)
+        return AlarmCube(self.cells[mask], self.meta)
+
+    def total(self):
+        return int(self.cells[MEASURE].sum())
+
+    def count_by(self, dim, fill=None):
+        """按维度汇总，降序（同 value_counts）；fill 不为空时缺失值按 fill 计入"""
+        key = self.cells[dim]
+        if fill is not None:
+            key = key.astype(object).fillna(fill)
+        counts = self.cells[MEASURE].groupby(key, observed=True).sum()
+        return counts[counts > 0].sort_values(ascending=False)
+
+    def series_by(self, dim):
+        """按维度汇总，按维度值排序（用于时间轴）"""
+        return self.cells.groupby(dim, observed=True)[MEASURE].sum().sort_index()
+
+    def crosstab(self, index, columns):
+        table = self.cells.pivot_table(index=index, columns=columns, values=MEASURE,
+                                       aggfunc='sum', fill_value=0, observed=True)
+        return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+
+    def values(self, dim):
+        return sorted(self.cells[dim].dropna().unique())
@@ -0,0 +1,153 @@
+"""微站处置归并引擎
+
+归并规则放在带版本号的配置文件 fire_data/disposal_rules.json（类别 -> 变体写法列表），
+新增写法只改配置，不改代码：
+- 复合值按 “，” “、” “,” 切分成词，每个词先整词查表；
+- 查不到的词用类别名和变体构成的字典树做分词（如“侦查警戒疏散人员控控制堵截”
+  -> 警戒、人员疏散、堵截），能被已知词完整覆盖才采用，否则原样保留并记为未识别；
+- 结果按出现顺序去重后以 “,” 连接；
+- 归并结果按不同取值缓存，整列只对唯一值计算一次再映射回各行，分块清洗时缓存跨块复用。
+
+    python -m fire_data.disposal [--input data/每日火警详情.csv]   # 输出未识别词报告
+"""
+import argparse
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+RULES_PATH = Path(__file__).resolve().with_name('disposal_rules.json')
+RULES_VERSION = 1
+JOINER = ','
+
+
+def load_rules(path=RULES_PATH):
+    """读取归并配置并校验版本"""
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+    if rules.get('version') != RULES_VERSION:
+        raise ValueError(f"微站处置归并配置版本不受支持：{rules.get('version')}（需要 {RULES_VERSION}）")
+    return rules
+
+
+def build_lookup(categories):
+    """写法 -> 类别；类别名本身也是合法写法，同一写法不能归到两个类别"""
+    lookup = {}
+    for category, variants in categories.items():
+        for word in [category] + list(variants):
+            if lookup.get(word, category) != category:
+                raise ValueError(f"写法“{word}”同时归到“{lookup[word]}”和“{category}”")
+            lookup[word] = category
+    return lookup
+
+
+def build_trie(lookup):
+    """字典树：嵌套 dict，None 键存放在该处结束的写法对应的类别"""
+    root = {}
+    for word, category in lookup.items():
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[None] = category
+    return root
+
+
+def segment(token, trie):
+    """把 token 切成字典树中的已知写法（最少段数），返回类别列表；无法完整覆盖时返回 None"""
+    n = len(token)
+    # best[i]：前 i 个字符的最少分段，(段数, 上一切分点, 类别)
+    best = [None] * (n + 1)
+    best[0] = (0, None, None)
+    for i in range(n):
+        if best[i] is None:
+            continue
+        node = trie
+        for j in range(i, n):
+            node = node.get(token[j])
+            if node is None:
+                break
+            if None in node and (best[j + 1] is None or best[i][0] + 1 < best[j + 1][0]):
+                best[j + 1] = (best[i][0] + 1, i, node[None])
+    if best[n] is None:
+        return None
+    out, i = [], n
+    while i:
+        _, prev, category = best[i]
+        out.append(category)
+        i = prev
+    return out[::-1]
+
+
+class DisposalNormalizer:
+    """按配置归并微站处置，唯一值缓存 + 未识别词统计"""
+
+    def __init__(self, rules=None):
+        rules = rules or load_rules()
+        self.version = rules['version']
+        self.lookup = build_lookup(rules['categories'])
+        self.trie = build_trie(self.lookup)
+        self.split_pattern = re.compile('|'.join(re.escape(s) for s in rules['separators']))
+        self._cache = {}
+        self.unmapped = Counter()
+        self._unmapped_examples = {}
+
+    def normalize_value(self, value):
+        """单个取值的归并结果（已缓存），返回 (结果, 未识别词列表)"""
+        hit = self._cache.get(value)
+        if hit is None:
+            categories, unknown = [], []
+            for token in self.split_pattern.split(value):
+                token = token.strip()
+                if not token:
+                    continue
+                found = self.lookup.get(token)
+                parts = [found] if found is not None else segment(token, self.trie)
+                if parts is None:
+                    unknown.append(token)
+                    parts = [token]
+                categories.extend(parts)
+            hit = self._cache[value] = (JOINER.join(dict.fromkeys(categories)), unknown)
+        return hit
+
+    def normalize(self, s):
+        """整列归并：只对不同取值计算一次再映射回各行，空值保持为空"""
+        s = pd.Series(s)
+        codes, uniques = pd.factorize(s.astype('string').str.strip())
+        if not len(uniques):
+            return pd.Series(pd.NA, index=s.index, dtype='string')
+        results, counts = [], pd.Series(codes[codes >= 0]).value_counts()
+        for code, value in enumerate(uniques):
+            normalized, unknown = self.normalize_value(value)
+            results.append(normalized)
+            for token in unknown:
+                self.unmapped[token] += int(counts.get(code, 0))
+                self._unmapped_examples.setdefault(token, value)
+        mapped = pd.array(results, dtype='string').take(codes, allow_fill=True)
+        return pd.Series(mapped, index=s.index, dtype='string')
+
+    def report(self):
+        """未识别词报告：词、出现行数、示例原值，按行数降序"""
+        return pd.DataFrame(
+            [(token, n, self._unmapped_examples[token]) for token, n in self.unmapped.most_common()],
+            columns=['未识别词', '出现行数', '示例原值'],
+        )
+
+
+if __name__ == "__main__":
+    from fire_data import store
+
+    parser = argparse.ArgumentParser(description='微站处置归并与未识别词报告')
+    parser.add_argument('--input', default=str(store.csv_path('incidents')), help='含 微站处置 列的 CSV')
+    args = parser.parse_args()
+
+    normalizer = DisposalNormalizer()
+    raw = pd.read_csv(args.input, encoding='utf-8-sig', usecols=['微站处置'])['微站处置']
+    result = normalizer.normalize(raw)
+    print(f"配置版本 {normalizer.version}，{len(raw)} 行，{raw.nunique()} 个不同取值")
+    print(result.value_counts().to_string())
+    report = normalizer.report()
+    print("\n未识别词：" if len(report) else "\n没有未识别词")
+    if len(report):
+        print(report.to_string(index=False))
@@ -0,0 +1,272 @@
+"""实时警情接入服务
+
+接收 每日火警详情 格式的新警情（HTTP 接口或投放目录），几秒内出现在看板上：
+- 清洗规则与批量清洗相同（fire_data/cleaning.py，微站处置按配置归并）；
+- 按行键（立案时间、所属队站、微站）去掉已接入或快照里已有的记录，重复投递不会重复计数；
+- 先编码后写入：地址经同样的清洗后走地理编码缓存，编码全部返回后才把新增记录追加为 incidents 的
+  实时分段、编码成功的记录追加到 fires_cleaned / fires_geocoded 的分段；编码抛错时本批什么都不写，
+  文件移到 failed/ 后可原样重投；
+- 编码遇到网络/限流等暂时性错误（状态以“错误”开头）的记录留在 data/columnar/live/pending_geocode.feather，
+  随下一批一起重试，成功后补进 fires_cleaned / fires_geocoded；
+- 每批写完后数据版本号加 1，页面的加载函数以版本号为缓存键，定时检查到版本变化即刷新。
+
+HTTP 接口：
+    POST /alarms    请求体为记录列表（或 {"records": [...]}），返回本批统计与新版本号
+    GET  /version   当前数据版本号
+投放目录 data/inbox/：放入 .csv / .xlsx / .json 文件（建议先写临时名再改名），
+处理完移到 done/，失败的移到 failed/ 并附错误说明。
+
+    python -m fire_data.ingest serve [--port 8765] [--inbox data/inbox] [--interval 2]
+    python -m fire_data.ingest file 新警情.csv     # 单次接入一个文件
+    python -m fire_data.ingest prune               # 删除已进入批量快照的分段
+"""
+import argparse
+import json
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from fire_data import store
+from fire_data.cleaning import clean_chunk
+from fire_data.disposal import DisposalNormalizer
+from fire_geocode.client import GeocodeFatalError, env_api_key, geocode_addresses
+from fire_geocode.normalize import clean_addresses
+from fire_spatial.transform import with_wgs84
+
+INBOX_DIR = store.DATA_DIR / 'inbox'
+INBOX_SUFFIXES = ('.csv', '.xlsx', '.json')
+HOST = '127.0.0.1'
+PORT = 8765
+POLL_SECONDS = 2
+SETTLE_SECONDS = 1  # 投放文件修改后至少静置这么久才读取，避免读到写了一半的文件
+LIVE_DATASETS = ['incidents', 'fires_cleaned', 'fires_geocoded']
+GEOCODED_DATASETS = ['fires_cleaned', 'fires_geocoded']
+EMPTY_CODE = (None, None, '地址为空')
+# 编码服务本身不可用（key 无效、连不上），HTTP 接口按 502 回报
+GEOCODER_ERRORS = (GeocodeFatalError, ConnectionError, TimeoutError)
+RETRY_PREFIX = '错误'  # 暂时性错误，下一批重试；“失败”是高德明确查无结果，留给 fire_geocode_fail.py 补充编码
+
+
+def pending_path():
+    return store.LIVE_DIR / 'pending_geocode.feather'
+
+
+def load_pending():
+    """待重试编码的记录（incidents 列）；批量快照里已有的（已由流水线编码）跳过"""
+    path = pending_path()
+    if not path.exists():
+        return None
+    pending = feather.read_feather(path)
+    key = store.INCIDENT_KEY_COLS
+    done = store.row_keys(store.load('fires_cleaned', key), key)
+    pending = pending[~store.row_keys(pending, key).isin(done)].reset_index(drop=True)
+    return pending if len(pending) else None
+
+
+def pending_count():
+    """待重试文件里的记录数（不与快照比对，供出错时回报）"""
+    path = pending_path()
+    return feather.read_table(path, columns=store.INCIDENT_KEY_COLS).num_rows if path.exists() else 0
+
+
+def save_pending(df):
+    """整体替换待重试文件（原子改名），为空时删除"""
+    path = pending_path()
+    if df.empty:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    feather.write_feather(df.reset_index(drop=True), tmp, compression='uncompressed')
+    tmp.replace(path)
+
+
+def read_records(path):
+    """读取投放文件为 DataFrame（CSV / XLSX / JSON 记录列表）"""
+    path = Path(path)
+    if path.suffix == '.csv':
+        return pd.read_csv(path, encoding='utf-8-sig')
+    if path.suffix == '.xlsx':
+        return pd.read_excel(path)
+    if path.suffix == '.json':
+        return records_frame(json.loads(path.read_text(encoding='utf-8')))
+    raise ValueError(f"不支持的文件类型：{path.name}")
+
+
+def records_frame(payload):
+    """JSON 记录列表或 {"records": [...]} 转为 DataFrame"""
+    records = payload.get('records') if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        raise ValueError("请求体应为记录列表或 {\"records\": [...]}")
+    return pd.DataFrame(records)
+
+
+class Ingestor:
+    """清洗、去重、地理编码并追加实时分段；同一时刻只处理一批（HTTP 与投放目录共用）
+
+    geocoder 为 地址列表 -> {地址: (纬度, 经度, 状态)} 的函数，默认走高德客户端及其本地缓存，
+    本地联调时可换成桩函数。
+    """
+
+    def __init__(self, api_key=None, geocoder=None):
+        # 走高德时启动即检查 key，未设置 AMAP_API_KEY 直接报错，不等到第一批接入才失败
+        self.api_key = api_key or (env_api_key() if geocoder is None else None)
+        self.geocoder = geocoder
+        self.normalizer = DisposalNormalizer()
+        self.lock = threading.Lock()
+
+    def geocode(self, addresses):
+        if self.geocoder is not None:
+            return self.geocoder(addresses)
+        results, _ = geocode_addresses(addresses, self.api_key)
+        return results
+
+    def geocoded(self, df):
+        """与 fire_geocode_address.py 相同：清洗地址、去掉误报，唯一地址编码后附经纬度和 WGS-84 列"""
+        df = df.assign(火警地址=clean_addresses(df['火警地址']).astype('string'))
+        df = df[~df['火警地址'].str.contains('误报', na=False)]
+        valid = df['火警地址'].notna() & df['火警地址'].str.strip().ne('')
+        results = self.geocode(list(df.loc[valid, '火警地址'].astype(str).unique()))
+        codes = [results.get(str(a), EMPTY_CODE) if ok else EMPTY_CODE for a, ok in zip(df['火警地址'], valid)]
+        return with_wgs84(df.assign(
+            纬度=pd.to_numeric([c[0] for c in codes], errors='coerce'),
+            经度=pd.to_numeric([c[1] for c in codes], errors='coerce'),
+            地理编码状态=[c[2] for c in codes],
+        ))
+
+    def ingest(self, raw):
+        """接入一批原始记录（连同上批待重试的记录），返回统计（收到、新增、编码成功、待重试、数据版本）"""
+        with self.lock:
+            df = clean_chunk(pd.DataFrame(raw), self.normalizer)
+            key = store.INCIDENT_KEY_COLS
+            keys = store.row_keys(df, key)
+            existing = store.row_keys(store.load('incidents', key), key)
+            df = df[~keys.isin(existing) & ~keys.duplicated()].reset_index(drop=True)
+            df = df.reindex(columns=store.columns('incidents'))
+            pending = load_pending()
+            stats = {'收到': len(raw), '新增': len(df), '编码成功': 0, '待重试': 0 if pending is None else len(pending)}
+            if df.empty and pending is None:
+                return {**stats, '数据版本': store.data_version()}
+
+            batch = df if pending is None else pd.concat([df, pending], ignore_index=True)
+            geo = self.geocoded(batch)  # 抛错时还没有写任何文件
+            ok = geo[geo['地理编码状态'] == '成功']
+            retry = batch.loc[geo.index[geo['地理编码状态'].astype(str).str.startswith(RETRY_PREFIX)]]
+            if len(df):
+                store.append_segment('incidents', df)
+            if len(ok):
+                for name in GEOCODED_DATASETS:
+                    store.append_segment(name, ok.reindex(columns=store.columns(name)))
+            save_pending(retry)
+            stats.update(编码成功=len(ok), 待重试=len(retry))
+            if df.empty and ok.empty:
+                return {**stats, '数据版本': store.data_version()}
+            return {**stats, '数据版本': store.bump_version()}
+
+
+def ingest_file(ingestor, path):
+    stats = ingestor.ingest(read_records(path))
+    print(f"[{time.strftime('%H:%M:%S')}] {Path(path).name}：" + "，".join(f"{k} {v}" for k, v in stats.items()))
+    return stats
+
+
+def watch_inbox(ingestor, inbox=INBOX_DIR, interval=POLL_SECONDS, stop=None):
+    """轮询投放目录：处理完的文件移到 done/，失败的移到 failed/ 并写 .error.txt"""
+    inbox = Path(inbox)
+    done, failed = inbox / 'done', inbox / 'failed'
+    for folder in (inbox, done, failed):
+        folder.mkdir(parents=True, exist_ok=True)
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        for path in sorted(p for p in inbox.iterdir() if p.is_file() and p.suffix in INBOX_SUFFIXES):
+            if time.time() - path.stat().st_mtime < SETTLE_SECONDS:
+                continue
+            try:
+                ingest_file(ingestor, path)
+                path.replace(done / path.name)
+            except Exception:
+                path.replace(failed / path.name)
+                (failed / f'{path.name}.error.txt').write_text(traceback.format_exc(), encoding='utf-8')
+                print(f"{path.name} 接入失败，已移到 {failed}")
+        stop.wait(interval)
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """POST /alarms 接入，GET /version 查询版本；server.ingestor 为共用的 Ingestor"""
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/version':
+            self._reply(200, {'数据版本': store.data_version()})
+        else:
+            self._reply(404, {'错误': f'未知路径 {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/alarms':
+            self._reply(404, {'错误': f'未知路径 {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            frame = records_frame(json.loads(self.rfile.read(length).decode('utf-8')))
+            self._reply(200, self.server.ingestor.ingest(frame))
+        except (ValueError, KeyError) as e:
+            self._reply(400, {'错误': str(e.args[0]) if e.args else repr(e)})
+        except Exception as e:
+            # 编码服务不可用记 502，其余（写分段失败等）记 500；本批未写入，客户端可原样重发
+            traceback.print_exc()
+            status = 502 if isinstance(e, GEOCODER_ERRORS) else 500
+            self._reply(status, {'错误': repr(e), '待重试': pending_count(), '数据版本': store.data_version()})
+
+
+def serve(host=HOST, port=PORT, inbox=INBOX_DIR, interval=POLL_SECONDS, ingestor=None):
+    """启动 HTTP 接口和投放目录轮询（同一进程，单一写入方）"""
+    ingestor = ingestor or Ingestor()
+    for name in LIVE_DATASETS:
+        store.prune_segments(name)
+    stop = threading.Event()
+    watcher = threading.Thread(target=watch_inbox, args=(ingestor, inbox, interval, stop), daemon=True)
+    watcher.start()
+    server = ThreadingHTTPServer((host, port), IngestHandler)
+    server.ingestor = ingestor
+    print(f"接入服务已启动：http://{host}:{port}/alarms，投放目录 {inbox}，当前数据版本 {store.data_version()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='实时警情接入服务')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve_parser = sub.add_parser('serve', help='启动 HTTP 接口和投放目录轮询')
+    serve_parser.add_argument('--host', default=HOST)
+    serve_parser.add_argument('--port', type=int, default=PORT)
+    serve_parser.add_argument('--inbox', default=str(INBOX_DIR), help='投放目录')
+    serve_parser.add_argument('--interval', type=float, default=POLL_SECONDS, help='轮询间隔（秒）')
+    file_parser = sub.add_parser('file', help='单次接入一个文件')
+    file_parser.add_argument('path')
+    sub.add_parser('prune', help='删除记录已全部进入批量快照的分段')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.host, args.port, args.inbox, args.interval)
+    elif args.command == 'file':
+        ingest_file(Ingestor(), args.path)
+    else:
+        for name in LIVE_DATASETS:
+            print(f"{name}：删除 {store.prune_segments(name)} 个分段")
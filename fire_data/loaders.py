@@ -0,0 +1,145 @@
+"""Streamlit 页面用的缓存加载函数，每个数据集一个
+
+缓存键有两部分：
+- 会被实时接入追加新警情的数据集（及由其派生的索引）带 version 参数，页面传入 data_version()，
+  版本号变化即换一个缓存键重新读取；
+- 每个加载函数另把所依赖源 CSV 的修改时间（store.source_mtime）放进缓存键，流水线或批量清洗
+  重写了 CSV 时同样换键，store.load() 才有机会按修改时间重新转换。
+data_version() 本身也包含这些修改时间，页面里以它为键的缓存随之失效；
+watch_data_version() 定时检查，变化时整页重跑。
+"""
+import streamlit as st
+
+from fire_data import browser, cube, response_time, store
+from fire_routing import graph, matrix, router
+from fire_routing.cache import RouteCache
+from fire_spatial import coverage
+from fire_spatial.clustering import ClusterService
+
+REFRESH_SECONDS = 5
+# 页面数据版本跟踪的源 CSV（实时接入的三个数据集及微站表）
+SNAPSHOT_SOURCES = ['incidents', 'fires_cleaned', 'fires_geocoded', 'stations']
+
+
+def data_version():
+    """数据版本：实时接入版本号 + 各警情源 CSV 的修改时间（读几个小文件/stat，不缓存）"""
+    return (store.data_version(),) + tuple(store.source_mtime(name) for name in SNAPSHOT_SOURCES)
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def watch_data_version():
+    """每 REFRESH_SECONDS 秒检查一次数据版本，接入新警情或重跑流水线后整页重跑（页面顶部调用一次）"""
+    version = data_version()
+    if st.session_state.setdefault('data_version', version) != version:
+        st.session_state['data_version'] = version
+        st.rerun()
+
+
+@st.cache_data
+def _load(name, columns, version, mtime):
+    return store.load(name, columns)
+
+
+def load_incidents(columns=None, version=None):
+    """每日火警详情"""
+    return _load('incidents', columns, version, store.source_mtime('incidents'))
+
+
+def load_fires_cleaned(columns=None, version=None):
+    """地理编码成功的火警记录（全字段）"""
+    return _load('fires_cleaned', columns, version, store.source_mtime('fires_cleaned'))
+
+
+def load_fires_geocoded(columns=None, version=None):
+    """地理编码成功的火警点（立案时间、地址、经纬度）"""
+    return _load('fires_geocoded', columns, version, store.source_mtime('fires_geocoded'))
+
+
+def load_stations(columns=None):
+    """微站地址及坐标"""
+    return _load('stations', columns, None, store.source_mtime('stations'))
+
+
+def load_squads(columns=None):
+    """中队地址及坐标"""
+    return _load('squads', columns, None, store.source_mtime('squads'))
+
+
+def load_forecast(columns=None):
+    """未来 N 天全网格预测"""
+    return _load('forecast', columns, None, store.source_mtime('forecast'))
+
+
+def load_pred_result(columns=None):
+    """测试集预测结果"""
+    return _load('pred_result', columns, None, store.source_mtime('pred_result'))
+
+
+@st.cache_data
+def _alarm_cube(version, mtime):
+    return cube.load_cube()
+
+
+def load_alarm_cube(version=None):
+    """数据总览预聚合立方体"""
+    return _alarm_cube(version, store.source_mtime('incidents'))
+
+
+@st.cache_resource
+def _record_index(version, mtime):
+    return browser.RecordIndex(store.load('incidents'))
+
+
+def load_record_index(version=None):
+    """原始记录浏览用的位图索引（只读，各会话共享）"""
+    return _record_index(version, store.source_mtime('incidents'))
+
+
+@st.cache_resource
+def _response_sketches(version, mtime):
+    return response_time.load_sketches()
+
+
+def load_response_sketches(version=None):
+    """响应用时分位数草图（读取时增量加入新警情，批量快照改动时重建）"""
+    return _response_sketches(version, store.source_mtime('incidents'))
+
+
+@st.cache_resource
+def _coverage_index(version, mtimes):
+    return coverage.CoverageIndex.from_frames(store.load('stations'), store.load('fires_geocoded'))
+
+
+def load_coverage_index(version=None):
+    """微站多半径覆盖索引（火警点顺序同 load_fires_geocoded）"""
+    return _coverage_index(version, (store.source_mtime('stations'), store.source_mtime('fires_geocoded')))
+
+
+@st.cache_resource
+def load_router():
+    """本地路网导航器；未构建路网时返回 None"""
+    if not graph.GRAPH_PATH.exists():
+        return None
+    return router.Router(graph.RoadGraph.load())
+
+
+@st.cache_resource
+def _travel_times(version, mtimes):
+    return matrix.load_matrix()
+
+
+def load_travel_times(version=None):
+    """微站/中队到火警点的行驶时间矩阵（只读内存映射）与出发点表；未计算时返回 None"""
+    return _travel_times(version, (store.file_mtime(matrix.META_PATH), store.source_mtime('fires_geocoded')))
+
+
+@st.cache_resource
+def load_route_cache():
+    """导航路线进程级缓存（LRU + TTL，各会话共用）"""
+    return RouteCache()
+
+
+@st.cache_resource
+def load_cluster_service():
+    """高发区域聚类服务（进程内常驻，后台拟合 k=2..10）"""
+    return ClusterService()
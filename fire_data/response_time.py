@@ -0,0 +1,243 @@
+"""出动/到场用时分位数分析
+
+每个 (分组方式, 分组值, 指标) 维护一个可合并的 t-digest 分位数草图：
+分组方式为 全部 / 微站 / 所属队站 / 月份，指标包括
+- 微站出动用时（原字段，沿用 0~500 的清洗范围）
+- 微站调派到场用时：微站到场时间 - 微站调派时间（分钟）
+- 中队到场用时：中队到场时间 - 微站调派时间（分钟）
+
+新警情到来时按 立案时间 高水位增量加入，不重新排序、也不逐行比对全部历史数据：
+- 只看 立案时间 不早于 高水位 - LOOKBACK_DAYS 的行，其中行键（立案时间、所属队站、微站，
+  与实时分段去重相同）没加入过的才加入，迟到或与最新记录同一时刻的警情不会漏掉；
+- 只保留回看窗口内的行键，状态大小与窗口内的警情数相关，与历史总量无关；
+  晚于窗口才到达的警情不再补入，等下一次批量快照重建时计入；
+- 批量快照 CSV 被改动（重新导出、更正历史记录）时草图整体重建。
+草图连同高水位、窗口内行键、快照修改时间以 JSON 持久化，p50/p90/p95 直接从草图读取。
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from fire_data import store
+
+SKETCH_PATH = store.COLUMNAR_DIR / 'response_sketches.json'
+GROUPINGS = ['全部', '微站', '所属队站', '月份']
+ALL = '全部'
+# 指标 -> 有效取值范围（超出视为异常记录）
+METRICS = {
+    '微站出动用时': (0, 500),
+    '微站调派到场用时': (0, 240),
+    '中队到场用时': (0, 240),
+}
+SLA_QUANTILES = [0.5, 0.9, 0.95]
+LOOKBACK_DAYS = 3  # 迟到警情的回看窗口
+SOURCE_COLS = ['立案时间', '所属队站', '微站', '微站出动用时', '微站调派时间', '微站到场时间', '中队到场时间']
+
+
+class TDigest:
+    """合并式 t-digest（k1 尺度函数），支持批量加入和两两合并"""
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def _k(self, q):
+        return self.compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1)
+
+    def _compress(self, means, weights):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        out_m, out_w = [], []
+        cur_m, cur_w = means[0], weights[0]
+        done = 0.0
+        k_lo = self._k(0.0)
+        for m, w in zip(means[1:], weights[1:]):
+            if self._k((done + cur_w + w) / total) - k_lo <= 1:
+                cur_m += (m - cur_m) * w / (cur_w + w)
+                cur_w += w
+            else:
+                out_m.append(cur_m)
+                out_w.append(cur_w)
+                done += cur_w
+                k_lo = self._k(done / total)
+                cur_m, cur_w = m, w
+        out_m.append(cur_m)
+        out_w.append(cur_w)
+        self.means, self.weights = np.asarray(out_m), np.asarray(out_w)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.total += values.sum()
+        self.total_sq += (values ** 2).sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.nan
+        centers = np.cumsum(self.weights) - self.weights / 2
+        xs = np.concatenate([[0], centers, [self.count]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q * self.count, xs, ys))
+
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def std(self):
+        """样本标准差（与 describe 一致，ddof=1）"""
+        if self.count < 2:
+            return np.nan
+        var = (self.total_sq - self.total ** 2 / self.count) / (self.count - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+    def to_dict(self):
+        return {
+            'compression': self.compression, 'means': self.means.tolist(), 'weights': self.weights.tolist(),
+            'count': self.count, 'total': self.total, 'total_sq': self.total_sq,
+            'min': None if self.count == 0 else self.min, 'max': None if self.count == 0 else self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        digest = cls(d['compression'])
+        digest.means = np.asarray(d['means'], dtype=float)
+        digest.weights = np.asarray(d['weights'], dtype=float)
+        digest.count, digest.total, digest.total_sq = d['count'], d['total'], d['total_sq']
+        digest.min = np.inf if d['min'] is None else d['min']
+        digest.max = -np.inf if d['max'] is None else d['max']
+        return digest
+
+
+def response_metrics(df):
+    """由警情明细计算各用时指标（异常值置为 NaN）及分组列"""
+    minutes = pd.Timedelta(minutes=1)
+    out = pd.DataFrame({
+        ALL: ALL,
+        '微站': df['微站'].astype(str),
+        '所属队站': df['所属队站'].astype(str),
+        '月份': df['立案时间'].dt.strftime('%Y-%m'),
+        '微站出动用时': pd.to_numeric(df['微站出动用时'], errors='coerce'),
+        '微站调派到场用时': (df['微站到场时间'] - df['微站调派时间']) / minutes,
+        '中队到场用时': (df['中队到场时间'] - df['微站调派时间']) / minutes,
+    }, index=df.index)
+    for metric, (low, high) in METRICS.items():
+        out[metric] = out[metric].where(out[metric].between(low, high))
+    return out
+
+
+def folded_keys(df):
+    """行键字符串（store.row_keys 各列以 | 连接），用于记录回看窗口内哪些警情已加入草图"""
+    return pd.Index(['|'.join(map(str, key)) for key in store.row_keys(df, store.INCIDENT_KEY_COLS)])
+
+
+class ResponseSketches:
+    """全部分组的分位数草图集合
+
+    high_water_mark 为已加入的最晚 立案时间，recent 为回看窗口内已加入的行键，
+    snapshot 为构建时批量快照 CSV 的修改时间。
+    """
+
+    def __init__(self, digests=None, high_water_mark=None, recent=None, snapshot=None, lookback_days=LOOKBACK_DAYS):
+        self.digests = digests or {}
+        self.high_water_mark = high_water_mark
+        self.recent = set(recent or ())
+        self.snapshot = snapshot
+        self.lookback = pd.Timedelta(days=lookback_days)
+
+    def digest(self, grouping, key, metric):
+        return self.digests.setdefault((grouping, key, metric), TDigest())
+
+    def update(self, df):
+        """加入回看窗口内行键尚未加入过的警情，返回新增行数"""
+        if self.high_water_mark is not None:
+            df = df[df['立案时间'] >= self.high_water_mark - self.lookback]
+        keys = folded_keys(df)
+        new = ~keys.isin(self.recent) & ~keys.duplicated()
+        if not new.any():
+            return 0
+        df = df[new]
+        metrics = response_metrics(df)
+        for grouping in GROUPINGS:
+            for key, group in metrics.groupby(grouping, sort=False):
+                for metric in METRICS:
+                    self.digest(grouping, key, metric).add(group[metric].to_numpy())
+
+        latest = df['立案时间'].max()
+        if pd.notna(latest):
+            self.high_water_mark = latest if self.high_water_mark is None else max(self.high_water_mark, latest)
+        # 窗口只保留高水位前 lookback 内的行键（行键以分钟时间开头，按时间前缀判断）
+        if self.high_water_mark is not None:
+            cutoff = self.high_water_mark.floor('min') - self.lookback
+            in_window = df['立案时间'] >= cutoff
+            self.recent = {k for k in self.recent if pd.Timestamp(k.split('|', 1)[0]) >= cutoff}
+            self.recent.update(keys[new][in_window.to_numpy()])
+        return len(df)
+
+    def summary(self, metric, grouping=ALL, quantiles=SLA_QUANTILES):
+        """某指标按分组的 数据条数 与各分位数"""
+        rows = {}
+        for (g, key, m), digest in self.digests.items():
+            if g == grouping and m == metric and digest.count:
+                rows[key] = {'数据条数': digest.count,
+                             **{f'p{int(q * 100)}': digest.quantile(q) for q in quantiles}}
+        return pd.DataFrame.from_dict(rows, orient='index').rename_axis(grouping)
+
+    def save(self, path=SKETCH_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'snapshot': self.snapshot,
+            'high_water_mark': None if self.high_water_mark is None else self.high_water_mark.isoformat(),
+            'recent': sorted(self.recent),
+            'digests': [[g, k, m, d.to_dict()] for (g, k, m), d in self.digests.items()],
+        }
+        path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path=SKETCH_PATH):
+        if not path.exists():
+            return cls()
+        payload = json.loads(path.read_text(encoding='utf-8'))
+        if 'recent' not in payload:
+            return cls()  # 旧版状态（无回看窗口），重建
+        hwm = payload['high_water_mark']
+        digests = {(g, k, m): TDigest.from_dict(d) for g, k, m, d in payload['digests']}
+        return cls(digests, None if hwm is None else pd.Timestamp(hwm), payload['recent'], payload['snapshot'])
+
+
+def load_sketches(path=SKETCH_PATH):
+    """读取持久化草图并加入回看窗口内未加入过的警情；批量快照 CSV 自上次构建后改动过时整体重建"""
+    snapshot = store.source_mtime('incidents')
+    sketches = ResponseSketches.load(path)
+    rebuilt = sketches.snapshot != snapshot
+    if rebuilt:
+        sketches = ResponseSketches(snapshot=snapshot)
+    if sketches.update(store.load('incidents', SOURCE_COLS)) or rebuilt:
+        sketches.save(path)
+    return sketches
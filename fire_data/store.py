@@ -0,0 +1,269 @@
+"""列式数据层
+
+把流水线输出的 CSV 一次性转换为带类型的 Feather（Arrow IPC，不压缩）文件：
+时间列存为 datetime64，街道/大队/火警类型/微站等存为 categorical。
+读取时按列投影并内存映射，页面冷启动不再解析 CSV 文本。
+CSV 比 Feather 新时自动重新转换，路径统一用 pathlib，Windows/Linux 通用。
+
+实时接入（fire_data/ingest.py）的新警情不改动上述文件，而是追加为 data/columnar/live/<数据集>/ 下的
+只读分段文件，读取时拼在批量快照之后（按行键去掉快照里已有的记录）；每追加一批，
+data/columnar/live/VERSION 里的数据版本号加 1，页面用它作缓存键。
+
+    python -m fire_data.store     # 转换全部数据集
+"""
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from fire_spatial import cells
+
+DATA_DIR = Path(__file__).resolve().parents[1] / 'data'
+COLUMNAR_DIR = DATA_DIR / 'columnar'
+LIVE_DIR = COLUMNAR_DIR / 'live'
+VERSION_PATH = LIVE_DIR / 'VERSION'
+
+INCIDENT_TIME_COLS = ['立案时间', '微站调派时间', '微站出动时间', '微站到场时间', '中队到场时间', '中队出动时间']
+INCIDENT_CATEGORY_COLS = ['所属街道', '所属大队', '火警类型', '微站', '所属队站', '实/虚警']
+INCIDENT_KEY_COLS = ['立案时间', '所属队站', '微站']
+
+# 数据集名 -> 源 CSV、时间列、类别列；grid 表示带网格列，旧版 0.01° 网格输出转换时补 网格编号；
+# key 为实时分段去重用的行键（立案时间按分钟比较，旧版 CSV 只精确到分钟）
+DATASETS = {
+    'incidents': {
+        'csv': '每日火警详情.csv',
+        'time_cols': INCIDENT_TIME_COLS,
+        'category_cols': INCIDENT_CATEGORY_COLS,
+        'key': INCIDENT_KEY_COLS,
+    },
+    'fires_cleaned': {
+        'csv': '火警地址_已清洗.csv',
+        'time_cols': INCIDENT_TIME_COLS,
+        'category_cols': INCIDENT_CATEGORY_COLS,
+        'key': INCIDENT_KEY_COLS,
+    },
+    'fires_geocoded': {
+        'csv': '火警地址_已地理编码_已清洗.csv',
+        'time_cols': ['立案时间'],
+        'category_cols': [],
+        'key': ['立案时间', '火警地址'],
+    },
+    'stations': {
+        'csv': '微站地址_已地理编码.csv',
+        'time_cols': [],
+        'category_cols': [],
+    },
+    'squads': {
+        'csv': '中队地址_已地理编码.csv',
+        'time_cols': [],
+        'category_cols': ['大队'],
+    },
+    'forecast': {
+        'csv': 'fire_pred_next7days_cn.csv',
+        'time_cols': ['日期'],
+        'category_cols': [],
+        'grid': True,
+    },
+    'pred_result': {
+        'csv': 'fire_pred_result_cn.csv',
+        'time_cols': ['日期'],
+        'category_cols': [],
+        'grid': True,
+    },
+}
+
+
+def csv_path(name):
+    return DATA_DIR / DATASETS[name]['csv']
+
+
+def file_mtime(path):
+    """文件修改时间（纳秒），文件不存在为 0；供页面作缓存键"""
+    path = Path(path)
+    return path.stat().st_mtime_ns if path.exists() else 0
+
+
+def source_mtime(name):
+    """源 CSV 的修改时间（纳秒）：流水线或批量清洗重写了 CSV 时变化"""
+    return file_mtime(csv_path(name))
+
+
+def columnar_path(name):
+    return COLUMNAR_DIR / f'{name}.feather'
+
+
+def read_source_csv(name):
+    """读取源 CSV 并转换类型（去 BOM、解析时间、类别化）"""
+    spec = DATASETS[name]
+    df = pd.read_csv(csv_path(name), encoding='utf-8-sig')
+    df.columns = [c.replace('\ufeff', '') for c in df.columns]
+    for col in spec['time_cols']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce', format='mixed')
+    for col in spec['category_cols']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if spec.get('grid') and '网格编号' not in df.columns and {'纬度网格', '经度网格'} <= set(df.columns):
+        df['网格编号'] = cells.from_legacy_grid(df['纬度网格'], df['经度网格'])
+    return df
+
+
+def is_stale(name):
+    src, dst = csv_path(name), columnar_path(name)
+    return not dst.exists() or (src.exists() and src.stat().st_mtime > dst.stat().st_mtime)
+
+
+def convert(name):
+    """把单个数据集转换为 Feather，返回输出路径"""
+    df = read_source_csv(name)
+    COLUMNAR_DIR.mkdir(parents=True, exist_ok=True)
+    dst = columnar_path(name)
+    tmp = dst.with_suffix('.tmp')
+    feather.write_feather(df.reset_index(drop=True), tmp, compression='uncompressed')
+    tmp.replace(dst)
+    return dst
+
+
+def write_chunks(name, frames, schema):
+    """逐块写入数据集的 Feather 文件（内存中只保留一块），写完后把类别列统一编码
+
+    frames 为按 schema 列序的 DataFrame 迭代器；类别列在最后逐列转为 categorical，
+    与从 CSV 转换得到的类型一致。
+    """
+    COLUMNAR_DIR.mkdir(parents=True, exist_ok=True)
+    dst = columnar_path(name)
+    part, tmp = dst.with_suffix('.part'), dst.with_suffix('.tmp')
+    try:
+        with pa.OSFile(str(part), 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for frame in frames:
+                writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+        table = feather.read_table(part, memory_map=True)
+        for col in DATASETS[name]['category_cols']:
+            if col in table.column_names:
+                values = table.column(col).to_pandas().astype('category')
+                table = table.set_column(table.schema.get_field_index(col), col, pa.array(values))
+        feather.write_feather(table, tmp, compression='uncompressed')
+        del table
+        tmp.replace(dst)
+    finally:
+        # 某块清洗或写入失败时不留下半截文件，已有的 dst 保持不变
+        part.unlink(missing_ok=True)
+        tmp.unlink(missing_ok=True)
+    return dst
+
+
+def convert_all():
+    return {name: convert(name) for name in DATASETS if csv_path(name).exists()}
+
+
+def read_schema(path):
+    """只读 Feather 文件的表结构（含元数据），不读数据"""
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema
+
+
+def columns(name):
+    """批量快照的列名（实时分段按同样的列写入）"""
+    if is_stale(name):
+        convert(name)
+    return read_schema(columnar_path(name)).names
+
+
+def data_version():
+    """实时接入的数据版本号，没有接入过为 0"""
+    try:
+        return int(VERSION_PATH.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_version():
+    """数据版本号加 1（原子替换），返回新版本号；只由接入服务这一个写入方调用"""
+    LIVE_DIR.mkdir(parents=True, exist_ok=True)
+    version = data_version() + 1
+    tmp = VERSION_PATH.with_suffix('.tmp')
+    tmp.write_text(str(version), encoding='utf-8')
+    tmp.replace(VERSION_PATH)
+    return version
+
+
+def segment_paths(name):
+    return sorted((LIVE_DIR / name).glob('*.feather'))
+
+
+def append_segment(name, df):
+    """追加一个实时分段文件（写完后原子改名，已有分段从不改动）；类别列按字符串写入，读取时统一编码"""
+    seg_dir = LIVE_DIR / name
+    seg_dir.mkdir(parents=True, exist_ok=True)
+    path = seg_dir / f'{time.time_ns()}.feather'
+    cats = [c for c in DATASETS[name]['category_cols'] if c in df.columns]
+    tmp = path.with_suffix('.tmp')
+    feather.write_feather(df.astype({c: 'string' for c in cats}).reset_index(drop=True), tmp,
+                          compression='uncompressed')
+    tmp.replace(path)
+    return path
+
+
+def row_keys(df, key_cols):
+    """行键：时间列取到分钟，其余列按字符串比较"""
+    parts = {}
+    for col in key_cols:
+        s = df[col]
+        parts[col] = (s.dt.floor('min').astype('datetime64[ns]') if pd.api.types.is_datetime64_any_dtype(s)
+                      else s.astype('string'))
+    return pd.MultiIndex.from_frame(pd.DataFrame(parts))
+
+
+def _read(path, columns):
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def load(name, columns=None):
+    """内存映射读取数据集，columns 只读取需要的列；源 CSV 更新过时先重新转换
+
+    有实时分段时拼在快照之后，快照（或更早分段）里已有行键的记录跳过。
+    """
+    if is_stale(name):
+        convert(name)
+    segments = segment_paths(name)
+    if not segments:
+        return _read(columnar_path(name), columns)
+
+    key = DATASETS[name]['key']
+    read_cols = None if columns is None else list(dict.fromkeys(list(columns) + key))
+    frames = [_read(columnar_path(name), read_cols)]
+    seen = row_keys(frames[0], key)
+    for path in segments:
+        part = _read(path, read_cols)
+        keys = row_keys(part, key)
+        new = ~keys.isin(seen) & ~keys.duplicated()
+        frames.append(part[new])
+        seen = seen.append(keys[new])
+    df = pd.concat(frames, ignore_index=True)
+    for col in DATASETS[name]['category_cols']:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df if columns is None else df[list(columns)]
+
+
+def prune_segments(name):
+    """删除记录已全部进入批量快照的实时分段，返回删除数"""
+    segments = segment_paths(name)
+    if not segments:
+        return 0
+    key = DATASETS[name]['key']
+    base = row_keys(_read(columnar_path(name), key), key)
+    removed = 0
+    for path in segments:
+        if row_keys(_read(path, key), key).isin(base).all():
+            path.unlink()
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    for name, path in convert_all().items():
+        print(f"{name}: {path}")
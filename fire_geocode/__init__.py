@@ -0,0 +1 @@
+"""高德地理编码：异步限速客户端与本地缓存。"""
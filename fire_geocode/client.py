@@ -0,0 +1,239 @@
+"""异步高德地理编码客户端
+
+- 令牌桶限速，默认按高德个人开发者地理编码 3 QPS 配额
+- aiohttp 连接池复用 HTTP 连接
+- 网络错误、超频（CUQPS/CKQPS 类 infocode）按指数退避重试
+- SQLite 持久缓存，键为 地址规范键 + 城市；成功和“查无结果”（含地址非法类错误码）都缓存，同一地址不会重复付费，
+  未归类的错误码和多次重试仍失败的结果不缓存，下次运行重新请求
+
+base_url 可以指向本地模拟 /v3/geocode/geo 的服务，便于离线调试。
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+import aiohttp
+
+from fire_geocode.normalize import canonical_key
+
+AMAP_BASE_URL = "https://restapi.amap.com"
+GEOCODE_PATH = "/v3/geocode/geo"
+DEFAULT_QPS = 3
+DEFAULT_CITY = "上海"
+CACHE_PATH = Path(__file__).resolve().parents[1] / 'data' / 'geocode_cache.sqlite'
+
+# 超频/服务繁忙类 infocode，属于暂时性错误，需要退避重试而不是记为失败
+RETRYABLE_INFOCODES = {'10003', '10004', '10014', '10015', '10016', '10019', '10020', '10021', '10022'}
+# key 无效、签名错误等，重试也没用，直接中止
+FATAL_INFOCODES = {'10001', '10002', '10005', '10006', '10007', '10009', '10010', '10044'}
+# 地址本身不合法（参数非法、内容违规等），换个时间请求结果也一样，与“查无结果”一样写缓存
+NO_RESULT_INFOCODES = {'20000', '20001', '20002', '20011', '20012'}
+
+
+class GeocodeFatalError(RuntimeError):
+    """API key 无效等无法通过重试恢复的错误"""
+
+
+def env_api_key():
+    """环境变量 AMAP_API_KEY 里的高德 Web 服务 key；代码里不内置默认 key，未设置时直接报错"""
+    key = os.environ.get('AMAP_API_KEY', '').strip()
+    if not key:
+        raise GeocodeFatalError("未设置环境变量 AMAP_API_KEY（高德 Web 服务 key），无法在线地理编码")
+    return key
+
+
+def cache_key(address, city=DEFAULT_CITY):
+    """缓存键：规范键（见 normalize.canonical_key）+ 城市，近似重复地址共用一条缓存"""
+    return f"{city}|{canonical_key(address)}"
+
+
+class TokenBucket:
+    """异步令牌桶：平均 rate 次/秒，允许 capacity 次突发"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class GeocodeCache:
+    """SQLite 地理编码缓存"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY, address TEXT, city TEXT,"
+            " lat REAL, lon REAL, status TEXT, updated_at TEXT)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        row = self._conn.execute("SELECT lat, lon, status FROM geocode WHERE key = ?", (key,)).fetchone()
+        return tuple(row) if row else None
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            for key, lat, lon, status in self._conn.execute(
+                f"SELECT key, lat, lon, status FROM geocode WHERE key IN ({marks})", chunk
+            ):
+                found[key] = (lat, lon, status)
+        return found
+
+    def put(self, key, address, city, result):
+        lat, lon, status = result
+        self._conn.execute(
+            "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, address, city, lat, lon, status, datetime.now().isoformat(timespec='seconds')),
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class AsyncGeocoder:
+    """异步地理编码客户端，需在 async with 中使用
+
+    结果为 (纬度, 经度, 状态) 三元组，状态沿用原脚本的 "成功" / "失败: …" / "错误: …" 写法。
+    """
+
+    def __init__(self, api_key, qps=DEFAULT_QPS, concurrency=None, cache=None,
+                 base_url=AMAP_BASE_URL, retries=5, backoff=0.5, timeout=10, retry_failed=False):
+        self.api_key = api_key
+        self.retry_failed = retry_failed
+        self.bucket = TokenBucket(qps)
+        self.concurrency = concurrency or max(1, int(qps) * 2)
+        self._own_cache = cache is None
+        self.cache = GeocodeCache() if cache is None else cache
+        self.url = base_url.rstrip('/') + GEOCODE_PATH
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.stats = {'cache_hit': 0, 'request': 0, 'retry': 0}
+        self._session = None
+        self._sem = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        self._sem = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+        if self._own_cache:
+            self.cache.close()
+
+    async def _request(self, address, city):
+        params = {"key": self.api_key, "address": address, "city": city, "output": "json"}
+        last_error = None
+        for attempt in range(self.retries):
+            if attempt:
+                self.stats['retry'] += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random()))
+            await self.bucket.acquire()
+            self.stats['request'] += 1
+            try:
+                async with self._session.get(self.url, params=params) as resp:
+                    if resp.status == 429 or resp.status >= 500:
+                        last_error = f"HTTP {resp.status}"
+                        continue
+                    resp.raise_for_status()
+                    js = await resp.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                last_error = repr(e)
+                continue
+
+            infocode = str(js.get('infocode', ''))
+            if js.get("status") == "1":
+                if js.get("geocodes"):
+                    lon, lat = js["geocodes"][0]["location"].split(",")
+                    return (float(lat), float(lon), "成功"), True
+                return (None, None, f"失败: {js.get('info')}"), True
+            if infocode in FATAL_INFOCODES:
+                raise GeocodeFatalError(f"{js.get('info')} (infocode {infocode})")
+            if infocode in RETRYABLE_INFOCODES:
+                last_error = js.get('info')
+                continue
+            if infocode in NO_RESULT_INFOCODES:
+                return (None, None, f"失败: {js.get('info')}"), True
+            # 未归类的错误码不能断定地址无解，不写缓存，下次运行重新请求
+            return (None, None, f"错误: {js.get('info')} (infocode {infocode})"), False
+        # 暂时性错误不写缓存，下次运行会重新尝试
+        return (None, None, f"错误: 多次重试失败 - {last_error}"), False
+
+    def _usable(self, cached):
+        """retry_failed 时缓存里的失败结果视为未命中，重新请求"""
+        return cached is not None and not (self.retry_failed and cached[2] != "成功")
+
+    async def geocode(self, address, city=DEFAULT_CITY):
+        key = cache_key(address, city)
+        cached = self.cache.get(key)
+        if self._usable(cached):
+            self.stats['cache_hit'] += 1
+            return cached
+        async with self._sem:
+            result, cacheable = await self._request(str(address), city)
+        if cacheable:
+            self.cache.put(key, str(address), city, result)
+        return result
+
+    async def geocode_many(self, addresses, city=DEFAULT_CITY, progress=None):
+        """批量编码，地址先按缓存键去重；返回 {原地址: 结果}"""
+        by_key = {}
+        for addr in addresses:
+            by_key.setdefault(cache_key(addr, city), []).append(addr)
+        results = {}
+        hits = {k: v for k, v in self.cache.get_many(by_key).items() if self._usable(v)}
+        for key, res in hits.items():
+            self.stats['cache_hit'] += len(by_key[key])
+            for addr in by_key[key]:
+                results[addr] = res
+        if progress is not None and hits:
+            progress(sum(len(by_key[key]) for key in hits))
+
+        async def run(key):
+            res = await self.geocode(by_key[key][0], city)
+            for addr in by_key[key]:
+                results[addr] = res
+            if progress is not None:
+                progress(len(by_key[key]))
+
+        await asyncio.gather(*(run(key) for key in by_key if key not in hits))
+        return results
+
+
+def geocode_addresses(addresses, api_key, city=DEFAULT_CITY, progress=None, **kwargs):
+    """同步调用入口：批量编码并返回 ({原地址: (纬度, 经度, 状态)}, 统计信息)"""
+    async def _run():
+        async with AsyncGeocoder(api_key, **kwargs) as geocoder:
+            results = await geocoder.geocode_many(addresses, city, progress)
+            return results, geocoder.stats
+    return asyncio.run(_run())
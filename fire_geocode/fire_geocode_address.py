@@ -1,86 +1,71 @@
+import argparse
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
 import pandas as pd
-import requests
-import time
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
-# 读取你的表格
-df = pd.read_csv(r"data\每日火警详情.csv")
+from fire_geocode.client import env_api_key, geocode_addresses
+from fire_geocode.incremental import run_incremental
+from fire_geocode.normalize import clean_addresses, dedup_report
+from fire_spatial.transform import with_wgs84
+
+DATA_DIR = Path(__file__).resolve().parents[1] / 'data'
+INPUT_PATH = DATA_DIR / '每日火警详情.csv'
+OUTPUT_PATH = DATA_DIR / '地址试案' / '火警地址.csv'
+
+def load_incidents(path=INPUT_PATH):
+    # 读取你的表格
+    df = pd.read_csv(path)
 
-# 定义清洗函数
-def clean_address(address):
-    if pd.isna(address):
-        return address
-    keywords = r'(误报|到场未处置|居民处置|其他社会力量处置|燃烧物质燃尽|消防处置|祭扫|驻防车出动|微站处置|专职队处置|单位自处|经核实无需消防处置|自动喷淋装置作用|燃烧物燃尽|车主处置|物业处置|祭祀|祭扫|EB|九小场所|自动喷淋装置作用|燃烧物质燃烬|可燃物质燃尽)'
-    pattern = r'\s*\(' + keywords + r'\)\s*'
-    cleaned = re.sub(pattern, '', str(address))
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    return cleaned
+    # 应用清洗
+    df["火警地址"] = clean_addresses(df["火警地址"])
 
-# 应用清洗
-df["火警地址"] = df["火警地址"].apply(clean_address).str.strip()
+    # 删除“误报”地址
+    df = df[~df["火警地址"].astype(str).str.contains("误报", na=False)]
 
-# 删除“误报”地址
-df = df[~df["火警地址"].astype(str).str.contains("误报", na=False)]
+    # 按立案时间降序
+    df['立案时间'] = pd.to_datetime(df['立案时间'])
+    return df.sort_values(by='立案时间', ascending=False)
 
-# 按立案时间降序
-df['立案时间'] = pd.to_datetime(df['立案时间'])
-df = df.sort_values(by='立案时间', ascending=False)
+def geocode_all(df, api_key):
+    # 异步限速编码：同一规范键只请求一次，结果持久缓存在 data/geocode_cache.sqlite
+    valid = df["火警地址"].notna() & df["火警地址"].astype(str).str.strip().ne("")
+    addresses = df.loc[valid, "火警地址"].astype(str).unique()
+    report = dedup_report(df.loc[valid, "火警地址"])
+    print(f"地址 {report['地址行数']} 行，规范键 {report['规范键数']} 个，去重率 {report['去重率']:.2%}")
+    with tqdm(total=len(addresses), desc="处理进度") as bar:
+        geocoded, stats = geocode_addresses(addresses, api_key, progress=bar.update)
+    print(f"缓存命中 {stats['cache_hit']} 条，实际请求 {stats['request']} 次，重试 {stats['retry']} 次")
 
-api_key = "21d4e687d2bf7268022e38fde34ca5b6"
-geocode_cache = {}
+    # 不过滤列，保留所有原始字段+新加的3列，另附 WGS-84 坐标供 OSM/Carto 底图使用
+    empty = (None, None, "地址为空")
+    codes = [geocoded[str(a)] if ok else empty for a, ok in zip(df["火警地址"], valid)]
+    return with_wgs84(df.assign(
+        纬度=[c[0] for c in codes],
+        经度=[c[1] for c in codes],
+        地理编码状态=[c[2] for c in codes],
+    ))
 
-def geocode_amap(address, api_key, city="上海"):
-    if address in geocode_cache:
-        return geocode_cache[address]
-    url = "https://restapi.amap.com/v3/geocode/geo"
-    params = {
-        "key": api_key,
-        "address": address,
-        "output": "json",
-        "city": city
-    }
-    for attempt in range(3):
-        try:
-            r = requests.get(url, params=params, timeout=5)
-            r.raise_for_status()
-            js = r.json()
-            if js.get("status") == "1" and js.get("geocodes"):
-                lon, lat = js["geocodes"][0]["location"].split(",")
-                result = (float(lat), float(lon), "成功")
-            else:
-                result = (None, None, f"失败: {js.get('info')}")
-            geocode_cache[address] = result
-            return result
-        except Exception as e:
-            print(f"警告: 地址 '{address}' 调用失败 (尝试 {attempt+1}/3) - 原因: {e}")
-            time.sleep(1)
-    result = (None, None, f"错误: 多次重试失败 - {e}")
-    geocode_cache[address] = result
-    return result
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="火警地址批量地理编码")
+    parser.add_argument('--incremental', action='store_true',
+                        help="增量模式：只编码新增/变更的警情并重试失败行，结果 upsert 到已有输出")
+    args = parser.parse_args(argv)
+    api_key = env_api_key()
+    df = load_incidents()
 
-def process_row(row):
-    addr = row.get("火警地址")
-    if pd.isna(addr) or not str(addr).strip():
-        return {**row.to_dict(), "纬度": None, "经度": None, "地理编码状态": "地址为空"}
-    try:
-        lat, lon, status = geocode_amap(str(addr), api_key)
-        time.sleep(0.2)
-        return {**row.to_dict(), "纬度": lat, "经度": lon, "地理编码状态": status}
-    except Exception as e:
-        print(f"错误: 处理地址 '{addr}' 时异常 - {e}")
-        return {**row.to_dict(), "纬度": None, "经度": None, "地理编码状态": f"异常: {e}"}
+    if args.incremental:
+        stats = run_incremental(df, api_key, OUTPUT_PATH)
+        print("增量编码完成：" + "，".join(f"{k} {v}" for k, v in stats.items()))
+        return
 
-results = []
-with ThreadPoolExecutor(max_workers=3) as executor:
-    futures = [executor.submit(process_row, row) for _, row in df.iterrows()]
-    for future in tqdm(as_completed(futures), total=len(futures), desc="处理进度"):
-        results.append(future.result())
+    out_df = geocode_all(df, api_key)
 
-# 不过滤列，保留所有原始字段+新加的3列
-out_df = pd.DataFrame(results)
+    # 保存
+    out_df.to_csv(OUTPUT_PATH, index=False, encoding="utf-8-sig")
+    print("OK 已导出为 火警地址_已地理编码.csv")
 
-# 保存
-out_df.to_csv(r"data\地址试案\火警地址.csv", index=False, encoding="utf-8-sig")
-print("OK 已导出为 火警地址_已地理编码.csv")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
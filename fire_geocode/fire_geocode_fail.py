@@ -1,56 +1,52 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
 import pandas as pd
-import requests
-import time
 from tqdm import tqdm
 
-# 读取文档
-df = pd.read_csv(r"data\地址试案\火警地址.csv")  # 替换为实际路径
-
-df['立案时间'] = pd.to_datetime(df['立案时间'])
-df['月份'] = df['立案时间'].dt.to_period('M')
-grouped = df.groupby('月份')
-
-api_key = "67be5dbd248dad17c40d09d83fef5537"  # 替换为你的高德key
-
-def geocode_amap(address, api_key, city="上海", retries=3):
-    url = "https://restapi.amap.com/v3/geocode/geo"
-    params = {"key": api_key, "address": address, "city": city, "output": "json"}
-    for attempt in range(retries):
-        try:
-            r = requests.get(url, params=params, timeout=10)
-            js = r.json()
-            if js["status"] == "1" and js["geocodes"]:
-                lon, lat = js["geocodes"][0]["location"].split(",")
-                return float(lat), float(lon), "成功"
-            else:
-                return None, None, f"失败: {js.get('info')}"
-        except Exception as e:
-            time.sleep(5)
-    return None, None, "失败: 多次重试失败"
-
-updated_rows = []
-for month, group in grouped:
-    print(f"\n处理月份: {month}")
-    for idx, row in tqdm(group.iterrows(), total=len(group), desc=f"处理 {month} 批次"):
-        row_dict = row.to_dict()
-        if "失败" in str(row_dict.get('地理编码状态', '')):  # 只处理失败的
-            address = row_dict['火警地址']
-            lat, lon, status = geocode_amap(address, api_key)
-            # 覆盖对应字段
-            row_dict['纬度'] = lat if lat is not None else row_dict.get('纬度')
-            row_dict['经度'] = lon if lon is not None else row_dict.get('经度')
-            row_dict['地理编码状态'] = status
-            time.sleep(1)
-        # 追加全部字段（无论是否重试）
-        updated_rows.append(row_dict)
-
-updated_df = pd.DataFrame(updated_rows)
-
-# 保存全部字段
-updated_df.to_csv(r"C:\Users\RAZER\OneDrive\桌面\vscode\浦东消防\data\地址试案\火警地址(1).csv", index=False, encoding="utf-8-sig")
-print("处理完成！更新文件已保存。")
-
-# 失败日志
-failures = updated_df[updated_df['地理编码状态'].astype(str).str.contains("失败", na=False)]
-failures.to_csv(r"data\地址试案\失败日志.csv", index=False, encoding="utf-8-sig")
-print(f"仍有 {len(failures)} 条失败，已保存到失败日志.csv")
\ No newline at end of file
+from fire_geocode.client import env_api_key, geocode_addresses
+from fire_spatial.transform import with_wgs84
+
+DATA_DIR = Path(__file__).resolve().parents[1] / 'data'
+INPUT_PATH = DATA_DIR / '地址试案' / '火警地址.csv'
+OUTPUT_PATH = DATA_DIR / '地址试案' / '火警地址(1).csv'
+FAILURE_LOG_PATH = DATA_DIR / '地址试案' / '失败日志.csv'
+# “失败: …” 为查无结果，“错误: …” 为未写缓存的暂时性/未归类错误，两类都重试
+FAILED_PREFIXES = ('失败', '错误')
+
+def retry_failed(df, api_key):
+    # 只处理失败的行：向量化筛出后按唯一地址重试（跳过缓存里的失败结果），不再逐月 iterrows
+    failed = df['地理编码状态'].astype(str).str.startswith(FAILED_PREFIXES)
+    addresses = df.loc[failed, '火警地址'].dropna().astype(str).unique()
+    print(f"待重试失败行 {int(failed.sum())} 条，唯一地址 {len(addresses)} 个")
+    with tqdm(total=len(addresses), desc="重试失败地址") as bar:
+        geocoded, _ = geocode_addresses(addresses, api_key, progress=bar.update, retry_failed=True)
+
+    retry = df.loc[failed, '火警地址'].map(lambda a: geocoded.get(str(a), (None, None, "失败: 地址为空")))
+    lat = retry.map(lambda r: r[0])
+    lon = retry.map(lambda r: r[1])
+    # 覆盖对应字段（重试仍失败时保留原经纬度）
+    updated_df = df.copy()
+    updated_df.loc[failed, '纬度'] = lat.where(lat.notna(), df.loc[failed, '纬度'])
+    updated_df.loc[failed, '经度'] = lon.where(lon.notna(), df.loc[failed, '经度'])
+    updated_df.loc[failed, '地理编码状态'] = retry.map(lambda r: r[2])
+    return with_wgs84(updated_df)
+
+def main():
+    # 读取文档
+    df = pd.read_csv(INPUT_PATH)
+    api_key = env_api_key()
+    updated_df = retry_failed(df, api_key)
+
+    # 保存全部字段
+    updated_df.to_csv(OUTPUT_PATH, index=False, encoding="utf-8-sig")
+    print("处理完成！更新文件已保存。")
+
+    # 失败日志
+    failures = updated_df[updated_df['地理编码状态'].astype(str).str.startswith(FAILED_PREFIXES)]
+    failures.to_csv(FAILURE_LOG_PATH, index=False, encoding="utf-8-sig")
+    print(f"仍有 {len(failures)} 条失败，已保存到失败日志.csv")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""增量地理编码
+
+状态库（SQLite）里记录每条警情的行键、内容哈希和编码结果，以及 立案时间 高水位：
+- 只对高水位（减去回看窗口，兼容迟到/修改的记录）之后的行计算哈希
+- 行键不存在或内容哈希变化的行才送去编码
+- 状态不是“成功”的历史行跳过缓存重新编码
+- 结果按行键 upsert 进状态库；只有新增时追加写 CSV，存在更新或首次增量运行时从状态库重写 CSV
+
+每日增量的耗时与当天新警情数量成正比，与历史长度无关。
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from fire_geocode.client import DEFAULT_CITY, geocode_addresses
+from fire_spatial.transform import with_wgs84
+
+STATE_PATH = Path(__file__).resolve().parents[1] / 'data' / 'geocode_state.sqlite'
+KEY_COLS = ['立案时间', '所属队站', '微站']
+GEO_COLS = ['纬度', '经度', '地理编码状态']
+LOOKBACK = timedelta(days=3)
+
+
+def _hex_hash(frame):
+    hashed = pd.util.hash_pandas_object(frame.astype(str), index=False)
+    return [format(int(h), '016x') for h in hashed]
+
+
+def row_keys(df):
+    """行键：立案时间 + 所属队站 + 微站 的哈希"""
+    return _hex_hash(df[KEY_COLS])
+
+
+def content_hashes(df):
+    """整行内容哈希，任何字段变化都会改变"""
+    return _hex_hash(df)
+
+
+class IncidentStore:
+    """增量编码状态库"""
+
+    def __init__(self, path=STATE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS incidents ("
+            " row_key TEXT PRIMARY KEY, content_hash TEXT, case_time TEXT, record TEXT,"
+            " lat REAL, lon REAL, status TEXT, updated_at TEXT);"
+            "CREATE INDEX IF NOT EXISTS idx_incidents_status ON incidents(status);"
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._conn.commit()
+
+    def high_water_mark(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'high_water_mark'").fetchone()
+        return pd.Timestamp(row[0]) if row else None
+
+    def set_high_water_mark(self, ts):
+        self._conn.execute(
+            "INSERT INTO meta VALUES ('high_water_mark', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (pd.Timestamp(ts).isoformat(),),
+        )
+        self._conn.commit()
+
+    def hashes(self, keys):
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            found.update(self._conn.execute(
+                f"SELECT row_key, content_hash FROM incidents WHERE row_key IN ({marks})", chunk
+            ).fetchall())
+        return found
+
+    def failed(self):
+        """状态不是“成功”的行，按原记录还原成 DataFrame（含 row_key 列）"""
+        rows = self._conn.execute(
+            "SELECT row_key, content_hash, record FROM incidents WHERE status IS NULL OR status != '成功'"
+        ).fetchall()
+        records = [dict(json.loads(rec), row_key=key, content_hash=h) for key, h, rec in rows]
+        return pd.DataFrame(records)
+
+    def upsert(self, df):
+        """按 row_key upsert，返回 (新增数, 更新数)"""
+        existing = self.hashes(df['row_key'])
+        source_cols = [c for c in df.columns if c not in GEO_COLS + ['row_key', 'content_hash']]
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for rec in df.to_dict('records'):
+            source = {c: rec[c] for c in source_cols}
+            rows.append((
+                rec['row_key'], rec['content_hash'], str(rec['立案时间']),
+                json.dumps(source, ensure_ascii=False, default=str),
+                rec['纬度'], rec['经度'], rec['地理编码状态'], now,
+            ))
+        self._conn.executemany(
+            "INSERT INTO incidents VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(row_key) DO UPDATE SET content_hash = excluded.content_hash,"
+            " case_time = excluded.case_time, record = excluded.record, lat = excluded.lat,"
+            " lon = excluded.lon, status = excluded.status, updated_at = excluded.updated_at",
+            rows,
+        )
+        self._conn.commit()
+        updated = sum(1 for k in df['row_key'] if k in existing)
+        return len(df) - updated, updated
+
+    def to_frame(self):
+        """状态库全量导出，按立案时间降序"""
+        rows = self._conn.execute(
+            "SELECT record, lat, lon, status FROM incidents ORDER BY case_time DESC"
+        ).fetchall()
+        return pd.DataFrame([dict(json.loads(rec), 纬度=lat, 经度=lon, 地理编码状态=status)
+                             for rec, lat, lon, status in rows])
+
+    def close(self):
+        self._conn.close()
+
+
+def _attach_geocodes(df, api_key, city, **geocoder_kwargs):
+    """对 df 的火警地址编码，返回追加了 纬度/经度/地理编码状态 的副本"""
+    if df.empty:
+        return df.assign(纬度=[], 经度=[], 地理编码状态=[])
+    valid = df['火警地址'].notna() & df['火警地址'].astype(str).str.strip().ne('')
+    geocoded = {}
+    if valid.any():
+        geocoded, _ = geocode_addresses(df.loc[valid, '火警地址'].astype(str).unique(), api_key, city,
+                                        **geocoder_kwargs)
+    empty = (None, None, "地址为空")
+    codes = [geocoded[str(a)] if ok else empty for a, ok in zip(df['火警地址'], valid)]
+    return df.assign(
+        纬度=[c[0] for c in codes],
+        经度=[c[1] for c in codes],
+        地理编码状态=[c[2] for c in codes],
+    )
+
+
+def run_incremental(df, api_key, output_csv, store=None, city=DEFAULT_CITY, **geocoder_kwargs):
+    """对已清洗、立案时间已解析的警情表做增量编码，返回本次统计"""
+    own_store = store is None
+    store = store or IncidentStore()
+    try:
+        hwm = store.high_water_mark()
+        candidates = df if hwm is None else df[df['立案时间'] >= hwm - LOOKBACK]
+        candidates = candidates.assign(row_key=row_keys(candidates),
+                                       content_hash=content_hashes(candidates))
+        known = store.hashes(candidates['row_key'])
+        changed = candidates[[known.get(k) != h for k, h in
+                              zip(candidates['row_key'], candidates['content_hash'])]]
+
+        # 历史失败行：跳过缓存重试，已在本次新增/变更里的不重复处理
+        failed = store.failed()
+        if not failed.empty:
+            failed = failed[~failed['row_key'].isin(changed['row_key'])]
+            failed = failed.assign(立案时间=pd.to_datetime(failed['立案时间']))
+
+        fresh = _attach_geocodes(changed, api_key, city, **geocoder_kwargs)
+        retried = _attach_geocodes(failed, api_key, city, retry_failed=True, **geocoder_kwargs)
+        # 重试后仍失败的行保持原样，不触发 CSV 重写
+        recovered = retried[retried['地理编码状态'] == "成功"] if not retried.empty else retried
+        merged = pd.concat([fresh, recovered], ignore_index=True)
+        inserted, updated = store.upsert(merged) if not merged.empty else (0, 0)
+        if len(df):
+            latest = df['立案时间'].max()
+            store.set_high_water_mark(latest if hwm is None else max(hwm, latest))
+
+        # 只有新增时追加写；有更新或状态库刚建立（首次增量，已有的全量输出里已包含这些行）时
+        # 从状态库重写（两种写法都附 WGS-84 坐标列，列序一致）
+        output_csv = Path(output_csv)
+        if updated or hwm is None or not output_csv.exists():
+            with_wgs84(store.to_frame()).to_csv(output_csv, index=False, encoding='utf-8-sig')
+        elif inserted:
+            with_wgs84(fresh.drop(columns=['row_key', 'content_hash'])).to_csv(
+                output_csv, mode='a', header=False, index=False, encoding='utf-8')
+        return {
+            '候选行': len(candidates), '新增': inserted, '更新': updated,
+            '重试失败行': len(retried), '重试成功': len(recovered),
+            '仍失败': int((fresh['地理编码状态'] != "成功").sum()) + len(retried) - len(recovered),
+        }
+    finally:
+        if own_store:
+            store.close()
@@ -0,0 +1,62 @@
+"""火警地址规范化
+
+正则全部预编译，整列用 pandas str 向量化处理：
+- clean_addresses：与原 clean_address 相同的清洗（去掉半角括号里的处置备注、合并空白）
+- canonical_keys：全角转半角、去掉括号处置备注（误报、到场未处置等）、去掉“上海市/浦东新区”前缀和空白，
+  得到用于去重和缓存的规范键；只差后缀、全半角或区名前缀的地址会落到同一个键上
+"""
+import re
+import unicodedata
+
+import pandas as pd
+
+# 原 clean_address 的关键词（只匹配半角括号）
+CLEAN_KEYWORDS = (
+    '误报|到场未处置|居民处置|其他社会力量处置|燃烧物质燃尽|消防处置|祭扫|驻防车出动|微站处置|专职队处置|'
+    '单位自处|经核实无需消防处置|自动喷淋装置作用|燃烧物燃尽|车主处置|物业处置|祭祀|EB|九小场所|'
+    '燃烧物质燃烬|可燃物质燃尽'
+)
+# 规范键额外去掉的处置/场所备注
+KEY_EXTRA_KEYWORDS = '到场处置|中途返队|一出动|烟花|人密场所|九小场所-[^()]*'
+
+CLEAN_PATTERN = re.compile(r'\s*\((?:' + CLEAN_KEYWORDS + r')\)\s*')
+NOTE_PATTERN = re.compile(r'\((?:' + CLEAN_KEYWORDS + '|' + KEY_EXTRA_KEYWORDS + r')\)')
+PREFIX_PATTERN = re.compile(r'^(?:上海市)?\s*(?:浦东新区)?')
+SPACE_PATTERN = re.compile(r'\s+')
+
+
+def clean_addresses(addresses):
+    """整列清洗，结果与原逐行 clean_address 一致"""
+    s = pd.Series(addresses)
+    cleaned = s.astype(str).str.replace(CLEAN_PATTERN, '', regex=True)
+    cleaned = cleaned.str.replace(SPACE_PATTERN, ' ', regex=True).str.strip()
+    return cleaned.where(s.notna(), s)
+
+
+def canonical_keys(addresses):
+    """整列计算规范键，空地址返回空字符串"""
+    s = pd.Series(addresses).fillna('').astype(str).str.normalize('NFKC').str.upper()
+    s = s.str.replace(NOTE_PATTERN, '', regex=True)
+    s = s.str.replace(SPACE_PATTERN, '', regex=True)
+    return s.str.replace(PREFIX_PATTERN, '', regex=True)
+
+
+def canonical_key(address):
+    """单个地址的规范键，规则与 canonical_keys 相同"""
+    s = unicodedata.normalize('NFKC', '' if address is None else str(address)).upper()
+    s = NOTE_PATTERN.sub('', s)
+    s = SPACE_PATTERN.sub('', s)
+    return PREFIX_PATTERN.sub('', s)
+
+
+def dedup_report(addresses):
+    """去重效果：行数、原始唯一地址数、规范键数和去重率（相对行数少请求的比例）"""
+    s = pd.Series(addresses).dropna().astype(str)
+    s = s[s.str.strip() != '']
+    n_keys = canonical_keys(s).nunique()
+    return {
+        '地址行数': len(s),
+        '原始唯一地址': s.nunique(),
+        '规范键数': n_keys,
+        '去重率': round(1 - n_keys / len(s), 4) if len(s) else 0.0,
+    }
@@ -0,0 +1 @@
+"""火警风险预测模型：特征工程、训练与评分。"""
@@ -0,0 +1,34 @@
+"""模型包的保存与加载
+
+一个文件里同时存放模型、StandardScaler、类别编码词表、备注高频词词表和空间聚类中心，
+评分时只需加载这一个文件即可复现训练时的全部特征变换。
+"""
+from datetime import datetime
+
+import joblib
+import sklearn
+
+ARTIFACT_VERSION = 2  # 2：网格改为整数网格编号（15 级墨卡托瓦片）
+
+
+def save_artifact(path, model, scaler, encoders, feature_cols, threshold):
+    payload = {
+        'version': ARTIFACT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'sklearn_version': sklearn.__version__,
+        'model': model,
+        'scaler': scaler,
+        'encoders': encoders,
+        'feature_cols': list(feature_cols),
+        'threshold': threshold,
+    }
+    joblib.dump(payload, path)
+    return payload
+
+
+def load_artifact(path):
+    payload = joblib.load(path)
+    version = payload.get('version') if isinstance(payload, dict) else None
+    if version != ARTIFACT_VERSION:
+        raise ValueError(f"模型包版本不匹配：{version}（当前需要 {ARTIFACT_VERSION}），请重新训练：{path}")
+    return payload
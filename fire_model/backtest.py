@@ -0,0 +1,150 @@
+"""网格-日风险基线模型的滚动（walk-forward）回测
+
+随机 train_test_split 会把未来的警情混进训练集，测试集也只有一百多行，评估偏乐观。
+这里按时间滚动：每个预测起点（默认每周一个）只用起点之前的数据训练，
+对起点后一周内每个已知网格、每一天打分，与实际是否发生火警比较。
+
+注意：回测的是单独的基线模型——同样的分类器（pipeline.make_model），但只用下面 7 个网格×日特征，
+不含线上模型（pipeline.build_features）的类别编码、备注高频词、空间聚类等逐条警情特征。
+结果用来衡量“仅凭时空历史能预测到什么程度”，不是线上模型的评估。
+
+- 特征面板（网格×日期，过去 7 天火警数、邻域火警数、历史累计火警、日历特征）只计算一次，
+  各折按日期切片共用；面板里每一行的特征只依赖当天之前的数据。
+- 测试期内的动态特征冻结为起点当天的值，与线上预测（forecast.py 沿用最新一行特征）一致。
+- 各折互不依赖，用 joblib 多进程并行（模型内部单线程，避免过度占用 CPU）。
+- 每折输出 ROC-AUC、PR-AUC、Top-K 召回率/查准率（每天风险最高的 K 个网格覆盖了多少实际火警），
+  并给出按历史累计火警数排序的基线 ROC-AUC 作对照。
+
+    python -m fire_model.backtest [--step 7] [--min-train-days 28] [--top-k 10] [--jobs -1]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics import average_precision_score, roc_auc_score
+
+from fire_model.features import WINDOW_DAYS, assign_grid, grid_day_features
+from fire_model.pipeline import DATA_DIR, INPUT_PATH, load_incidents, make_model
+
+BACKTEST_PATH = DATA_DIR / 'fire_backtest_folds.csv'
+DYNAMIC_COLS = ['过去七天火警数', '邻域过去七天火警数', '历史累计火警']
+STATIC_COLS = ['纬度网格', '经度网格']
+CALENDAR_COLS = ['星期', '月份']
+FEATURE_COLS = STATIC_COLS + DYNAMIC_COLS + CALENDAR_COLS
+STEP_DAYS = 7
+MIN_TRAIN_DAYS = 28
+TOP_K = 10
+
+
+def build_panel(raw, window=WINDOW_DAYS):
+    """网格×日期特征面板（只含当天之前的信息）及每个网格的首次火警日"""
+    df = assign_grid(raw.dropna(subset=['纬度', '经度']))
+    df['日期'] = df['立案时间'].dt.normalize().astype('datetime64[ns]')
+    panel = grid_day_features(df.assign(日期=df['日期'].dt.date), window)
+    panel['日期'] = pd.to_datetime(panel['日期']).astype('datetime64[ns]')
+
+    # 历史累计火警：该网格在当天之前的火警总数
+    daily = df.groupby(['网格编号', '日期']).size().rename('火警数').reset_index()
+    daily['历史累计火警'] = daily.groupby('网格编号')['火警数'].cumsum()
+    panel = pd.merge_asof(
+        panel.sort_values('日期'), daily[['日期', '网格编号', '历史累计火警']].sort_values('日期'),
+        on='日期', by='网格编号', allow_exact_matches=False,
+    )
+    panel['历史累计火警'] = panel['历史累计火警'].fillna(0).astype(int)
+    panel['月份'] = panel['日期'].dt.month
+    centers = assign_grid(pd.DataFrame({'经度': df['经度'], '纬度': df['纬度']})).drop_duplicates('网格编号')
+    panel = panel.merge(centers[['网格编号'] + STATIC_COLS], on='网格编号', how='left')
+    first_day = df.groupby('网格编号')['日期'].min()
+    panel['首次火警日'] = panel['网格编号'].map(first_day)
+    return panel.sort_values(['日期', '网格编号'], ignore_index=True)
+
+
+def _top_k(day, prob, y, k):
+    """每天按概率取前 k 个网格，返回 (命中火警网格数, 实际火警网格数, 选出网格数)"""
+    frame = pd.DataFrame({'day': day, 'prob': prob, 'y': y})
+    top = frame.sort_values('prob', ascending=False, kind='stable').groupby('day').head(k)
+    return int(top['y'].sum()), int(frame['y'].sum()), len(top)
+
+
+def _safe_metric(metric, y, score):
+    return float(metric(y, score)) if 0 < y.sum() < len(y) else np.nan
+
+
+def run_fold(arrays, origin, step=STEP_DAYS, top_k=TOP_K):
+    """单个预测起点：起点前训练，起点后 step 天测试（动态特征冻结在起点）"""
+    day, first, cell = arrays['day'], arrays['first'], arrays['cell']
+    end = origin + step
+    train = (day < origin) & (first < origin)
+    test = (day >= origin) & (day < end) & (first < origin)
+    at_origin = (day == origin) & (first < origin)
+    y_train, y_test = arrays['y'][train], arrays['y'][test]
+    if y_train.min() == y_train.max() or not test.any() or not at_origin.any():
+        return None
+
+    # 测试期动态特征取起点当天的值
+    X_test = arrays['X'][test].copy()
+    frozen = pd.DataFrame(arrays['X'][at_origin][:, arrays['dynamic']], index=cell[at_origin])
+    X_test[:, arrays['dynamic']] = frozen.reindex(cell[test]).fillna(0).to_numpy()
+
+    model = make_model(n_jobs=1).fit(arrays['X'][train], y_train)
+    prob = model.predict_proba(X_test)[:, 1]
+    hits, positives, picked = _top_k(day[test], prob, y_test, top_k)
+    baseline = X_test[:, FEATURE_COLS.index('历史累计火警')]
+    return {
+        '预测起点': pd.Timestamp(origin, unit='D').date(),
+        '训练样本': int(train.sum()),
+        '测试样本': int(test.sum()),
+        '测试火警网格日': int(y_test.sum()),
+        'ROC-AUC': _safe_metric(roc_auc_score, y_test, prob),
+        'PR-AUC': _safe_metric(average_precision_score, y_test, prob),
+        f'Top{top_k}召回率': hits / positives if positives else np.nan,
+        f'Top{top_k}查准率': hits / picked if picked else np.nan,
+        '基线ROC-AUC': _safe_metric(roc_auc_score, y_test, baseline),
+    }
+
+
+def walk_forward(panel, step=STEP_DAYS, min_train_days=MIN_TRAIN_DAYS, top_k=TOP_K, n_jobs=-1):
+    """按 step 天滚动的各折结果表"""
+    # 面板转为整数日期和数值数组，各进程共享（joblib 对大数组自动内存映射）
+    epoch = np.datetime64('1970-01-01', 'D')
+    arrays = {
+        'X': panel[FEATURE_COLS].to_numpy(dtype=float),
+        'y': panel['有无火警'].to_numpy(dtype=int),
+        'day': (panel['日期'].to_numpy('datetime64[D]') - epoch).astype(np.int64),
+        'first': (panel['首次火警日'].to_numpy('datetime64[D]') - epoch).astype(np.int64),
+        'cell': panel['网格编号'].to_numpy(),
+        'dynamic': np.array([FEATURE_COLS.index(c) for c in DYNAMIC_COLS]),
+    }
+    first_day, last_day = arrays['day'].min(), arrays['day'].max()
+    # 只取测试期完整落在数据范围内的起点
+    origins = range(first_day + min_train_days, last_day - step + 2, step)
+    folds = Parallel(n_jobs=n_jobs)(delayed(run_fold)(arrays, o, step, top_k) for o in origins)
+    return pd.DataFrame([f for f in folds if f is not None])
+
+
+def summarize(folds):
+    """各指标的折间均值"""
+    return folds.drop(columns=['预测起点']).mean(numeric_only=True)
+
+
+def run(input_path=INPUT_PATH, output_path=BACKTEST_PATH, **kwargs):
+    folds = walk_forward(build_panel(load_incidents(input_path)), **kwargs)
+    folds.to_csv(output_path, index=False, encoding='utf-8-sig')
+    return folds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='网格-日风险模型滚动回测')
+    parser.add_argument('--input', default=str(INPUT_PATH), help='聚类结果 CSV 路径')
+    parser.add_argument('--step', type=int, default=STEP_DAYS, help='预测起点间隔（天）')
+    parser.add_argument('--min-train-days', type=int, default=MIN_TRAIN_DAYS, help='首个起点前至少的训练天数')
+    parser.add_argument('--top-k', type=int, default=TOP_K, help='每天取风险最高的网格数')
+    parser.add_argument('--jobs', type=int, default=-1, help='并行进程数')
+    args = parser.parse_args()
+
+    folds = run(args.input, step=args.step, min_train_days=args.min_train_days, top_k=args.top_k,
+                n_jobs=args.jobs)
+    print(folds.to_string(index=False))
+    print(summarize(folds).round(4).to_string())
+    print(f'已输出各折回测结果：{BACKTEST_PATH}')
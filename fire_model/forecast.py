@@ -0,0 +1,49 @@
+"""未来 N 天全网格预测表构造
+
+每个网格只取一次最新记录（groupby().tail(1)），与预测日期做笛卡尔积，
+批量填充日历列后一次 predict_proba 打分，避免逐网格逐日筛选和逐行 copy。
+"""
+from datetime import date, timedelta
+
+import pandas as pd
+
+GRID_COLS = ['网格编号']
+MAX_HORIZON_DAYS = 90
+FORECAST_HOUR = 12
+
+
+def forecast_dates(horizon=7, start=None):
+    """从 start（默认今天）的次日起，连续 horizon 天的日期列表"""
+    if not 1 <= horizon <= MAX_HORIZON_DAYS:
+        raise ValueError(f"预测天数需在 1~{MAX_HORIZON_DAYS} 之间：{horizon}")
+    start = start or date.today()
+    return [start + timedelta(days=i) for i in range(1, horizon + 1)]
+
+
+def latest_grid_rows(df):
+    """每个网格按日期取最新的一行"""
+    return (
+        df.sort_values('日期', kind='stable')
+        .groupby(GRID_COLS, sort=False)
+        .tail(1)
+    )
+
+
+def build_forecast_frame(df, days, hour=FORECAST_HOUR):
+    """最新网格记录 × 预测日期，日期在外层、网格在内层，并填好日历特征"""
+    latest = latest_grid_rows(df).drop(columns=['日期']).reset_index(drop=True)
+    frame = pd.DataFrame({'日期': list(days)}).merge(latest, how='cross')
+    day_ts = pd.to_datetime(frame['日期'])
+    frame['hour'] = hour
+    frame['month'] = day_ts.dt.month
+    frame['weekday'] = day_ts.dt.weekday
+    frame['is_weekend'] = (frame['weekday'] >= 5).astype(int)
+    return frame
+
+
+def score_forecast(frame, model, scaler, feature_cols):
+    """一次性对整张预测表打分，返回带 预测有火警概率 列的副本"""
+    X = scaler.transform(frame[feature_cols].fillna(0))
+    out = frame.copy()
+    out['预测有火警概率'] = model.predict_proba(X)[:, 1]
+    return out
@@ -0,0 +1,239 @@
+"""火警风险预测流水线
+
+train：构造特征、训练 BalancedRandomForestClassifier、输出评估结果，并保存模型包；
+score：只加载模型包，对最新数据构造特征并输出未来 N 天预测，不再重新训练。
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from imblearn.ensemble import BalancedRandomForestClassifier
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.metrics import (
+    average_precision_score, classification_report, confusion_matrix, roc_auc_score
+)
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from fire_model.artifact import load_artifact, save_artifact
+from fire_model.features import assign_grid, grid_day_features
+from fire_model.forecast import build_forecast_frame, forecast_dates, score_forecast
+
+DATA_DIR = Path(__file__).resolve().parents[1] / 'data'
+INPUT_PATH = DATA_DIR / '火警地址_KMeans聚类结果.csv'
+ARTIFACT_PATH = DATA_DIR / 'fire_model_artifact.joblib'
+FORECAST_PATH = DATA_DIR / 'fire_pred_next7days_cn.csv'
+
+CATEGORY_COLS = ['火警类型', '所属大队', '所属街道', '所属队站', '建筑物内/外']
+TEXT_TOKEN_PATTERN = r'[\u4e00-\u9fa5]{2,}'
+TEXT_TOP_WORDS = 10
+N_SPATIAL_CLUSTERS = 8
+THRESHOLD = 0.12  # 查全率优先，实际可调
+
+
+def make_model(n_jobs=-1):
+    """训练与回测共用的模型配置"""
+    return BalancedRandomForestClassifier(
+        n_estimators=100,
+        max_depth=12,
+        random_state=42,
+        n_jobs=n_jobs
+    )
+
+
+def load_incidents(path=INPUT_PATH):
+    return pd.read_csv(path, encoding='utf-8', parse_dates=['立案时间'])
+
+
+def fit_encoders(df):
+    """拟合类别编码、备注高频词（自动发现 top10）和空间聚类，返回可持久化的词表与中心"""
+    label_vocab = {
+        col: LabelEncoder().fit(df[col].astype(str)).classes_.tolist() for col in CATEGORY_COLS
+    }
+    vectorizer = CountVectorizer(max_features=TEXT_TOP_WORDS, token_pattern=TEXT_TOKEN_PATTERN)
+    vectorizer.fit(df['备注内容'].astype(str))
+    kmeans = KMeans(n_clusters=N_SPATIAL_CLUSTERS, random_state=0).fit(df[['纬度', '经度']])
+    return {
+        'label_vocab': label_vocab,
+        'text_vocab': vectorizer.get_feature_names_out().tolist(),
+        'kmeans_centers': kmeans.cluster_centers_,
+    }
+
+
+def feature_columns(encoders):
+    return (
+        ['纬度网格', '经度网格', '过去七天火警数', '邻域过去七天火警数', 'hour', 'month', 'weekday', 'is_weekend',
+         '火警类型', '所属大队', '所属街道', '所属队站', '建筑物内/外', '微站出动用时', '空间聚类', '历史累计火警']
+        + [f'备注高频_{w}' for w in encoders['text_vocab']]
+    )
+
+
+def build_features(df, encoders):
+    """按给定的编码状态构造特征，训练与评分共用"""
+    df = df.copy()
+
+    # 类别特征编码（训练时未见过的取值编码为 -1）
+    for col, classes in encoders['label_vocab'].items():
+        codes = {c: i for i, c in enumerate(classes)}
+        df[col] = df[col].astype(str).map(codes).fillna(-1).astype(int)
+
+    # 时间特征
+    df['hour'] = df['立案时间'].dt.hour
+    df['month'] = df['立案时间'].dt.month
+    df['weekday'] = df['立案时间'].dt.weekday
+    df['is_weekend'] = (df['weekday'] >= 5).astype(int)
+
+    # 文本高频词特征
+    vectorizer = CountVectorizer(vocabulary=encoders['text_vocab'], token_pattern=TEXT_TOKEN_PATTERN)
+    word_counts = vectorizer.transform(df['备注内容'].astype(str)).toarray()
+    for i, word in enumerate(encoders['text_vocab']):
+        df[f'备注高频_{word}'] = word_counts[:, i]
+
+    # 响应时间/空间特征
+    df['微站出动用时'] = pd.to_numeric(df['微站出动用时'], errors='coerce').fillna(0)
+    df = assign_grid(df)
+    df['日期'] = df['立案时间'].dt.date
+
+    # 空间聚类：归到最近的聚类中心
+    centers = np.asarray(encoders['kmeans_centers'])
+    points = df[['纬度', '经度']].to_numpy(dtype=float)
+    df['空间聚类'] = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+
+    # 历史累计特征
+    df['历史累计火警'] = df.groupby('网格编号').cumcount()
+
+    # 网格-日统计
+    return pd.merge(df, grid_day_features(df), how='left', on=['网格编号', '日期'])
+
+
+def _show_curves(y_test, y_proba):
+    """弹窗显示 ROC/PR 曲线（会阻塞，仅在需要时调用）"""
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import precision_recall_curve, roc_curve
+
+    fpr, tpr, _ = roc_curve(y_test, y_proba)
+    plt.figure()
+    plt.plot(fpr, tpr, label='ROC曲线')
+    plt.xlabel('假阳性率')
+    plt.ylabel('真阳性率')
+    plt.title('ROC曲线')
+    plt.legend()
+    plt.show()
+
+    prec, recall, _ = precision_recall_curve(y_test, y_proba)
+    plt.figure()
+    plt.plot(recall, prec, label='PR曲线')
+    plt.xlabel('召回率')
+    plt.ylabel('查准率')
+    plt.title('PR曲线')
+    plt.legend()
+    plt.show()
+
+
+def _save_evaluation(df, model, feature_cols, X_test, y_test, y_proba, y_pred):
+    report = classification_report(y_test, y_pred, digits=4, output_dict=True)
+    rocauc = roc_auc_score(y_test, y_proba)
+    prauc = average_precision_score(y_test, y_proba)
+    cmatrix = confusion_matrix(y_test, y_pred)
+    print(classification_report(y_test, y_pred, digits=4))
+    print("ROC-AUC:", rocauc)
+    print("PR-AUC:", prauc)
+    print("混淆矩阵：\n", cmatrix)
+
+    # 保存模型评估信息
+    info = {
+        "准确率": report["accuracy"],
+        "查准率": report["1"]["precision"],
+        "查全率": report["1"]["recall"],
+        "F1分数": report["1"]["f1-score"],
+        "ROC-AUC": rocauc,
+        "PR-AUC": prauc
+    }
+    pd.DataFrame([info]).to_csv(DATA_DIR / 'fire_model_info.csv', index=False, encoding='utf-8-sig')
+    np.savetxt(DATA_DIR / 'fire_confusion_matrix.csv', cmatrix, delimiter=',', fmt='%d')
+
+    # 保存特征重要性（如果有）
+    if hasattr(model, 'feature_importances_'):
+        fi = pd.Series(model.feature_importances_, index=feature_cols).sort_values(ascending=False)
+        fi.to_csv(DATA_DIR / 'fire_feature_importance.csv', encoding='utf-8-sig')
+
+    # 全中文表头的测试集结果
+    result_df = X_test.copy()
+    result_df['真实标签'] = y_test.values
+    result_df['预测概率'] = y_proba
+    result_df['预测标签'] = y_pred
+    for col in ['日期', '网格编号', 'hour', 'month', 'weekday', '空间聚类']:
+        if col in df.columns and col not in result_df.columns:
+            result_df[col] = df.loc[result_df.index, col]
+    rename_dict = {
+        '日期': '日期', '网格编号': '网格编号', '经度网格': '经度网格', '纬度网格': '纬度网格',
+        'hour': '小时', 'month': '月份', 'weekday': '星期几', '空间聚类': '空间聚类标签',
+        '过去七天火警数': '过去七天火警数', '邻域过去七天火警数': '邻域过去七天火警数',
+        '真实标签': '真实是否有火警', '预测概率': '预测有火警概率', '预测标签': '预测结果'
+    }
+    cols_to_save = [
+        '日期', '网格编号', '经度网格', '纬度网格', '小时', '月份', '星期几',
+        '空间聚类标签', '过去七天火警数', '邻域过去七天火警数',
+        '真实是否有火警', '预测有火警概率', '预测结果'
+    ]
+    result_df = result_df.rename(columns=rename_dict)
+    result_df = result_df[[c for c in cols_to_save if c in result_df.columns]]
+    result_df.to_csv(DATA_DIR / 'fire_pred_result_cn.csv', encoding='utf-8-sig', index=False)
+
+
+def write_forecast(df, artifact, horizon=7, output_path=FORECAST_PATH):
+    """用模型包对特征表做未来 horizon 天全网格预测并写出 CSV"""
+    future_df = build_forecast_frame(df, forecast_dates(horizon))
+    future_df = score_forecast(future_df, artifact['model'], artifact['scaler'], artifact['feature_cols'])
+    future_rename_dict = {'hour': '小时', 'month': '月份', 'weekday': '星期几'}
+    future_df = future_df.rename(columns=future_rename_dict)
+    future_df = future_df[['日期', '网格编号', '经度网格', '纬度网格', '小时', '月份', '星期几', '预测有火警概率']]
+    future_df.to_csv(output_path, encoding='utf-8-sig', index=False)
+    return future_df
+
+
+def train(input_path=INPUT_PATH, artifact_path=ARTIFACT_PATH, horizon=7, show_plots=False):
+    """完整训练：特征构造、划分、拟合、评估，保存模型包并顺带输出一次预测"""
+    raw = load_incidents(input_path)
+    encoders = fit_encoders(raw)
+    df = build_features(raw, encoders)
+    feature_cols = feature_columns(encoders)
+    X = df[feature_cols].fillna(0)
+    y = df['有无火警'].fillna(0).astype(int)
+
+    # 划分训练/测试集
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    # 标准化
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    # BalancedRandomForestClassifier
+    model = make_model()
+    model.fit(X_train_scaled, y_train)
+    y_proba = model.predict_proba(X_test_scaled)[:, 1]
+    y_pred = (y_proba > THRESHOLD).astype(int)
+
+    _save_evaluation(df, model, feature_cols, X_test, y_test, y_proba, y_pred)
+    if show_plots:
+        _show_curves(y_test, y_proba)
+    print('已输出模型评估信息、混淆矩阵、特征重要性、全中文表头预测结果。')
+
+    artifact = save_artifact(artifact_path, model, scaler, encoders, feature_cols, THRESHOLD)
+    print(f'已保存模型包：{artifact_path}')
+    write_forecast(df, artifact, horizon)
+    print(f'已输出未来{horizon}天全网格火警概率预测：{FORECAST_PATH.name}')
+    return artifact
+
+
+def score(input_path=INPUT_PATH, artifact_path=ARTIFACT_PATH, horizon=7, output_path=FORECAST_PATH):
+    """仅评分：加载模型包，对最新数据构造特征并输出未来 horizon 天预测"""
+    artifact = load_artifact(artifact_path)
+    df = build_features(load_incidents(input_path), artifact['encoders'])
+    future_df = write_forecast(df, artifact, horizon, output_path)
+    print(f'已用模型包（{artifact["created_at"]}）输出未来{horizon}天全网格火警概率预测：{Path(output_path).name}')
+    return future_df
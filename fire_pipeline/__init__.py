@@ -0,0 +1 @@
+"""数据流水线：阶段声明与按内容指纹增量执行的 DAG 运行器。"""
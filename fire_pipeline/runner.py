@@ -0,0 +1,260 @@
+"""按内容指纹增量执行的流水线运行器
+
+stages.py 里每个阶段声明输入、输出、代码依赖和参数，运行器据此：
+- 自动按 输出 -> 输入 连边得到 DAG，拓扑顺序调度，互不依赖的阶段用线程池并行（每个阶段一个子进程）；
+- 阶段指纹 = 输入文件内容哈希 + 代码文件哈希 + 命令参数（daily 阶段再加当天日期），
+  与上次成功时记录的指纹相同且输出文件未被改动时跳过；
+- 上游重跑但输出内容没变时，下游指纹不变，同样跳过，夜间重建只重做受新数据影响的阶段；
+- 文件哈希按 (大小, 修改时间) 缓存在状态文件里，未改动的大文件不重复读取；
+- 每个阶段的输出写到 data/pipeline_logs/<阶段>.log，失败时打印日志末尾，其下游阶段不再执行。
+
+    python -m fire_pipeline.runner run all                 # 全部阶段，未变化的跳过
+    python -m fire_pipeline.runner run --from geocode      # 从 geocode 起（强制重跑 geocode）及其下游
+    python -m fire_pipeline.runner run train backtest      # 只跑指定阶段
+    python -m fire_pipeline.runner status                  # 查看各阶段是否需要重跑
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from pathlib import Path
+
+from fire_pipeline.stages import STAGES
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_PATH = ROOT / 'data' / 'pipeline_state.json'
+LOG_DIR = ROOT / 'data' / 'pipeline_logs'
+HASH_BLOCK = 1 << 20
+LOG_TAIL_LINES = 20
+
+
+def load_state(path=STATE_PATH):
+    if Path(path).exists():
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    return {'stages': {}, 'files': {}}
+
+
+def save_state(state, path=STATE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=1), encoding='utf-8')
+    tmp.replace(path)
+
+
+def file_hash(rel, cache):
+    """文件内容 sha256；(大小, 修改时间) 与缓存一致时直接用缓存值，文件不存在返回 None"""
+    path = ROOT / rel
+    if not path.is_file():
+        return None
+    stat = path.stat()
+    hit = cache.get(rel)
+    if hit and hit[0] == stat.st_size and hit[1] == stat.st_mtime_ns:
+        return hit[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    cache[rel] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return cache[rel][2]
+
+
+def code_files(paths):
+    """代码依赖展开为文件列表（目录取其中全部 .py，按路径排序）"""
+    files = []
+    for rel in paths:
+        path = ROOT / rel
+        if path.is_dir():
+            files += sorted(p.relative_to(ROOT).as_posix() for p in path.rglob('*.py'))
+        else:
+            files.append(rel)
+    return files
+
+
+def fingerprint(name, cache):
+    """阶段指纹；有输入文件不存在时返回 (None, 缺失列表)"""
+    spec = STAGES[name]
+    missing = [rel for rel in spec['inputs'] if file_hash(rel, cache) is None]
+    if missing:
+        return None, missing
+    digest = hashlib.sha256(json.dumps(spec['cmd'], ensure_ascii=False).encode())
+    if spec.get('daily'):
+        digest.update(date.today().isoformat().encode())
+    for rel in spec['inputs'] + code_files(spec.get('code', [])):
+        digest.update(f"{rel}:{file_hash(rel, cache)}".encode())
+    return digest.hexdigest(), []
+
+
+def dependencies(stages=STAGES):
+    """阶段 -> 上游阶段集合（某阶段的输入是另一阶段的输出）"""
+    producer = {out: name for name, spec in stages.items() for out in spec['outputs']}
+    return {name: {producer[i] for i in spec['inputs'] if i in producer and producer[i] != name}
+            for name, spec in stages.items()}
+
+
+def topological_order(deps):
+    order, done = [], set()
+
+    def visit(name, path=()):
+        if name in done:
+            return
+        if name in path:
+            raise ValueError(f"流水线存在环：{' -> '.join(path + (name,))}")
+        for dep in sorted(deps[name]):
+            visit(dep, path + (name,))
+        done.add(name)
+        order.append(name)
+
+    for name in deps:
+        visit(name)
+    return order
+
+
+def downstream(start, deps):
+    """start 及其全部下游阶段"""
+    selected, changed = {start}, True
+    while changed:
+        changed = False
+        for name, ups in deps.items():
+            if name not in selected and ups & selected:
+                selected.add(name)
+                changed = True
+    return selected
+
+
+def is_fresh(name, fp, state):
+    """指纹与上次成功时一致，且输出都还在、内容未被改动"""
+    record = state['stages'].get(name)
+    if not record or record['fingerprint'] != fp:
+        return False
+    return all(h is not None and file_hash(rel, state['files']) == h for rel, h in record['outputs'].items())
+
+
+def run_stage(name):
+    """子进程执行阶段命令，输出写日志，返回 (退出码, 耗时秒)"""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    start = time.time()
+    with open(LOG_DIR / f'{name}.log', 'w', encoding='utf-8') as log:
+        code = subprocess.run([sys.executable] + STAGES[name]['cmd'], cwd=ROOT, stdout=log,
+                              stderr=subprocess.STDOUT, env=dict(os.environ, PYTHONIOENCODING='utf-8')).returncode
+    return code, time.time() - start
+
+
+def log_tail(name, lines=LOG_TAIL_LINES):
+    path = LOG_DIR / f'{name}.log'
+    if not path.exists():
+        return ''
+    return '\n'.join(path.read_text(encoding='utf-8', errors='replace').splitlines()[-lines:])
+
+
+def run(targets=None, start=None, force=False, jobs=2):
+    """执行选中的阶段，返回 阶段 -> 结果（运行/跳过/失败/上游失败/缺少输入）"""
+    deps = dependencies()
+    order = topological_order(deps)
+    if start:
+        selected = downstream(start, deps)
+    else:
+        selected = set(targets or order)
+    unknown = selected - set(STAGES)
+    if unknown:
+        raise KeyError(f"未知阶段：{sorted(unknown)}，可选：{order}")
+    forced = set(selected) if force else ({start} if start else set())
+
+    state = load_state()
+    pending = [name for name in order if name in selected]
+    results, running = {}, {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                ups = deps[name] & selected
+                if any(results.get(u) in ('失败', '上游失败', '缺少输入') for u in ups):
+                    results[name] = '上游失败'
+                elif any(results.get(u) is None for u in ups):
+                    continue  # 上游还在运行或等待
+                else:
+                    fp, missing = fingerprint(name, state['files'])
+                    if fp is None:
+                        results[name] = '缺少输入'
+                        print(f"[{name}] 缺少输入：{missing}")
+                    elif name not in forced and is_fresh(name, fp, state):
+                        results[name] = '跳过'
+                        print(f"[{name}] 输入未变化，跳过")
+                    else:
+                        print(f"[{name}] 开始运行")
+                        running[pool.submit(run_stage, name)] = (name, fp)
+                        results[name] = None
+                pending.remove(name)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fp = running.pop(future)
+                code, seconds = future.result()
+                if code == 0:
+                    outputs = STAGES[name]['outputs']
+                    state['stages'][name] = {
+                        'fingerprint': fp,
+                        'outputs': {rel: file_hash(rel, state['files']) for rel in outputs},
+                        'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+                        'seconds': round(seconds, 1),
+                    }
+                    save_state(state)
+                    results[name] = '运行'
+                    print(f"[{name}] 完成，用时 {seconds:.1f} 秒")
+                else:
+                    results[name] = '失败'
+                    print(f"[{name}] 失败（退出码 {code}），日志 {LOG_DIR / f'{name}.log'}：\n{log_tail(name)}")
+    save_state(state)
+    return results
+
+
+def status():
+    """各阶段当前是否需要重跑（上游需要重跑时下游记为待定）"""
+    deps = dependencies()
+    state = load_state()
+    rows = []
+    stale = set()
+    for name in topological_order(deps):
+        record = state['stages'].get(name, {})
+        if deps[name] & stale:
+            verdict = '待上游'
+            stale.add(name)
+        else:
+            fp, missing = fingerprint(name, state['files'])
+            if fp is None:
+                verdict = f"缺少输入 {missing}"
+                stale.add(name)
+            elif is_fresh(name, fp, state):
+                verdict = '最新'
+            else:
+                verdict = '需要运行'
+                stale.add(name)
+        rows.append((name, verdict, record.get('finished', '-')))
+    save_state(state)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='火警数据流水线')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run', help='运行流水线')
+    run_parser.add_argument('stages', nargs='*', help="阶段名，all 或留空表示全部")
+    run_parser.add_argument('--from', dest='start', choices=list(STAGES), help='从该阶段起（强制重跑）并包含其下游')
+    run_parser.add_argument('--force', action='store_true', help='忽略指纹，选中阶段全部重跑')
+    run_parser.add_argument('--jobs', type=int, default=2, help='并行阶段数')
+    sub.add_parser('status', help='查看各阶段是否需要重跑')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        for name, verdict, finished in status():
+            print(f"{name:<14}{verdict:<10}上次完成：{finished}")
+    else:
+        targets = None if not args.stages or args.stages == ['all'] else args.stages
+        results = run(targets, args.start, args.force, args.jobs)
+        print('，'.join(f"{name} {result}" for name, result in results.items()))
+        sys.exit(1 if any(r in ('失败', '上游失败', '缺少输入') for r in results.values()) else 0)
@@ -0,0 +1,66 @@
+"""流水线各阶段声明
+
+阶段名 -> 命令（在项目根目录用当前 Python 执行）、输入文件、输出文件、代码依赖和参数。
+阶段之间的依赖不单独声明：某阶段的输入是另一阶段的输出时自动连边。
+路径均相对项目根目录；代码依赖可以是文件或目录（目录取其中全部 .py）。
+"""
+
+STAGES = {
+    'clean': {
+        'cmd': ['预处理/data_clean.py'],
+        'inputs': ['data/每日火警详情.xlsx'],
+        'outputs': ['data/每日火警详情.csv', 'data/columnar/incidents.feather'],
+        'code': ['预处理/data_clean.py', 'fire_data/cleaning.py', 'fire_data/disposal.py',
+                 'fire_data/disposal_rules.json', 'fire_data/store.py', 'fire_spatial/cells.py'],
+    },
+    # 增量编码首次运行时从状态库重写输出（不在已有全量输出上追加），见 tests/test_pipeline_stages.py
+    'geocode': {
+        'cmd': ['fire_geocode/fire_geocode_address.py', '--incremental'],
+        'inputs': ['data/每日火警详情.csv'],
+        'outputs': ['data/地址试案/火警地址.csv'],
+        'code': ['fire_geocode/fire_geocode_address.py', 'fire_geocode/client.py',
+                 'fire_geocode/incremental.py', 'fire_geocode/normalize.py', 'fire_spatial/transform.py'],
+    },
+    'geocode_fail': {
+        'cmd': ['fire_geocode/fire_geocode_fail.py'],
+        'inputs': ['data/地址试案/火警地址.csv'],
+        'outputs': ['data/地址试案/火警地址(1).csv', 'data/地址试案/失败日志.csv'],
+        'code': ['fire_geocode/fire_geocode_fail.py', 'fire_geocode/client.py', 'fire_geocode/normalize.py',
+                 'fire_spatial/transform.py'],
+    },
+    'geocode_clean': {
+        'cmd': ['fire_geocode/fire_grocode_cleaned.py'],
+        'inputs': ['data/地址试案/火警地址(1).csv'],
+        'outputs': ['data/火警地址_已清洗.csv'],
+        'code': ['fire_geocode/fire_grocode_cleaned.py'],
+    },
+    'cluster': {
+        'cmd': ['-m', 'fire_spatial.clustering', '--k', '4'],
+        'inputs': ['data/火警地址_已清洗.csv'],
+        'outputs': ['data/火警地址_KMeans聚类结果.csv'],
+        'code': ['fire_spatial/clustering.py', 'fire_data/store.py', 'fire_spatial/cells.py'],
+    },
+    # train 顺带写的未来预测由 score 阶段声明并每天重写，这里不重复声明，否则 train 每次都会因输出变化而重跑
+    'train': {
+        'cmd': ['预处理/generate_fire_predict.py', 'train'],
+        'inputs': ['data/火警地址_KMeans聚类结果.csv'],
+        'outputs': ['data/fire_model_artifact.joblib', 'data/fire_pred_result_cn.csv',
+                    'data/fire_model_info.csv', 'data/fire_confusion_matrix.csv',
+                    'data/fire_feature_importance.csv'],
+        'code': ['预处理/generate_fire_predict.py', 'fire_model', 'fire_spatial/cells.py'],
+    },
+    # 预测从当天的次日起算，参数里带上日期，数据不变时也每天刷新一次
+    'score': {
+        'cmd': ['预处理/generate_fire_predict.py', 'score', '--horizon', '7'],
+        'inputs': ['data/火警地址_KMeans聚类结果.csv', 'data/fire_model_artifact.joblib'],
+        'outputs': ['data/fire_pred_next7days_cn.csv'],
+        'code': ['预处理/generate_fire_predict.py', 'fire_model', 'fire_spatial/cells.py'],
+        'daily': True,
+    },
+    'backtest': {
+        'cmd': ['-m', 'fire_model.backtest'],
+        'inputs': ['data/火警地址_KMeans聚类结果.csv'],
+        'outputs': ['data/fire_backtest_folds.csv'],
+        'code': ['fire_model', 'fire_spatial/cells.py'],
+    },
+}
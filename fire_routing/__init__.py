@@ -0,0 +1 @@
+"""离线路网导航：OSM 路网图与最短时间路径。"""
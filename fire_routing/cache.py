@@ -0,0 +1,126 @@
+"""导航路线进程级缓存
+
+键为 (路线来源, 微站, 吸附后的终点)：本地路网用终点吸附到的路网节点，高德接口用终点坐标
+取 4 位小数（约 10 米）。值只保存路线信息、途经路名和编码后的折线（Google polyline
+算法，精度 1e-6 度，每个点约 4~8 字节），渲染时才解码。
+缓存按 LRU 淘汰并带 TTL，所有会话共用一份（加锁），并统计命中率。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+POLYLINE_PRECISION = 6
+DEFAULT_MAXSIZE = 512
+DEFAULT_TTL = 6 * 3600
+
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """[[纬度, 经度], ...] -> 编码字符串（整数化、差分后按 5 bit 分组）"""
+    if len(points) == 0:
+        return ''
+    scaled = np.rint(np.asarray(points, dtype=float) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=0).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    chars = []
+    for v in values.tolist():
+        while v >= 0x20:
+            chars.append(chr((0x20 | (v & 0x1f)) + 63))
+            v >>= 5
+        chars.append(chr(v + 63))
+    return ''.join(chars)
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    """编码字符串 -> [[纬度, 经度], ...]"""
+    values, shift, result = [], 0, 0
+    for ch in encoded:
+        b = ord(ch) - 63
+        result |= (b & 0x1f) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            shift, result = 0, 0
+    coords = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return coords.tolist()
+
+
+class CachedRoute:
+    """缓存中的一条路线；points 在访问时才解码"""
+
+    __slots__ = ('info', 'roads', 'encoded', 'created')
+
+    def __init__(self, info, points, roads):
+        self.info = info
+        self.roads = list(roads)
+        self.encoded = encode_polyline(points) if points else ''
+        self.created = time.monotonic()
+
+    @property
+    def points(self):
+        return decode_polyline(self.encoded) if self.encoded else None
+
+    def nbytes(self):
+        return len(self.encoded) + sum(len(r.encode('utf-8')) for r in self.roads) + len(self.info.encode('utf-8'))
+
+
+class RouteCache:
+    """线程安全的 LRU + TTL 路线缓存"""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def _fresh(self, key):
+        entry = self._data.get(key)
+        if entry is not None and time.monotonic() - entry.created > self.ttl:
+            del self._data[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def peek(self, key):
+        """只读取不计入命中统计（页面重绘用）"""
+        with self._lock:
+            return self._fresh(key)
+
+    def get_or_compute(self, key, compute):
+        """命中直接返回；未命中调用 compute() -> (信息, 折线点, 路名)，只缓存成功的路线"""
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        info, points, roads = compute()
+        entry = CachedRoute(info, points, roads)
+        if entry.encoded:
+            with self._lock:
+                self._data[key] = entry
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                '缓存路线数': len(self._data),
+                '命中': self.hits,
+                '未命中': self.misses,
+                '命中率': self.hits / total if total else 0.0,
+                'LRU淘汰': self.evictions,
+                '过期': self.expirations,
+                '占用字节': sum(e.nbytes() for e in self._data.values()),
+            }
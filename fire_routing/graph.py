@@ -0,0 +1,158 @@
+"""路网图：OSM 导出 -> CSR 邻接结构
+
+只保留机动车可通行的 way（highway 类型见 SPEED_KMH），按 oneway 生成有向边，
+边权为按 maxspeed（缺省按道路等级估算）计算的行驶秒数。图保存为 data/road_graph.npz：
+节点经纬度（WGS-84）、边的起终点/长度/时间/路名编号，以及按起点、终点排序的正反向 CSR 索引。
+
+OSM 导出需为 XML（.osm 或 .osm.bz2），.pbf 可先用 `osmium cat pudong.osm.pbf -o pudong.osm` 转换。
+
+    python -m fire_routing.graph data/pudong.osm        # 构建并保存到 data/road_graph.npz
+"""
+import argparse
+import bz2
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+DATA_DIR = Path(__file__).resolve().parents[1] / 'data'
+GRAPH_PATH = DATA_DIR / 'road_graph.npz'
+EARTH_RADIUS = 6371008.8
+
+# 道路等级 -> 缺省车速（km/h）
+SPEED_KMH = {
+    'motorway': 80, 'motorway_link': 40, 'trunk': 60, 'trunk_link': 35,
+    'primary': 45, 'primary_link': 30, 'secondary': 40, 'secondary_link': 25,
+    'tertiary': 30, 'tertiary_link': 20, 'unclassified': 25, 'residential': 20,
+    'living_street': 10, 'service': 15, 'road': 20,
+}
+ONEWAY_BY_DEFAULT = {'motorway', 'motorway_link', 'trunk_link', 'primary_link'}
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def _csr(keys, n):
+    order = np.argsort(keys, kind='stable').astype(np.int32)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, order
+
+
+class RoadGraph:
+    """有向路网；边按下标存放，fwd/bwd CSR 给出每个节点的出边/入边下标"""
+
+    def __init__(self, lat, lon, src, dst, length, seconds, name_id, names):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.src = np.asarray(src, dtype=np.int32)
+        self.dst = np.asarray(dst, dtype=np.int32)
+        self.length = np.asarray(length, dtype=np.float32)
+        self.seconds = np.asarray(seconds, dtype=np.float32)
+        self.name_id = np.asarray(name_id, dtype=np.int32)
+        self.names = list(names)
+        self.fwd_ptr, self.fwd_edge = _csr(self.src, self.n_nodes)
+        self.bwd_ptr, self.bwd_edge = _csr(self.dst, self.n_nodes)
+
+    @property
+    def n_nodes(self):
+        return len(self.lat)
+
+    @property
+    def n_edges(self):
+        return len(self.src)
+
+    def save(self, path=GRAPH_PATH):
+        np.savez(path, lat=self.lat, lon=self.lon, src=self.src, dst=self.dst, length=self.length,
+                 seconds=self.seconds, name_id=self.name_id, names=np.array(self.names, dtype=str))
+
+    @classmethod
+    def load(cls, path=GRAPH_PATH):
+        with np.load(path) as z:
+            return cls(z['lat'], z['lon'], z['src'], z['dst'], z['length'], z['seconds'],
+                       z['name_id'], z['names'].tolist())
+
+
+def _parse_speed(value, default):
+    digits = ''.join(ch for ch in (value or '').split(';')[0] if ch.isdigit() or ch == '.')
+    try:
+        speed = float(digits)
+    except ValueError:
+        return default
+    return speed * 1.609 if 'mph' in value else speed
+
+
+def read_osm(path):
+    """流式解析 OSM XML，返回 (节点经纬度字典, [(节点序列, 标签)])"""
+    path = Path(path)
+    opener = bz2.open if path.suffix == '.bz2' else open
+    nodes, ways = {}, []
+    with opener(path, 'rb') as f:
+        refs, tags = [], {}
+        for event, elem in ET.iterparse(f, events=('end',)):
+            if elem.tag == 'node':
+                nodes[int(elem.get('id'))] = (float(elem.get('lat')), float(elem.get('lon')))
+                elem.clear()
+            elif elem.tag == 'nd':
+                refs.append(int(elem.get('ref')))
+            elif elem.tag == 'tag':
+                tags[elem.get('k')] = elem.get('v')
+            elif elem.tag == 'way':
+                if tags.get('highway') in SPEED_KMH:
+                    ways.append((refs, tags))
+                refs, tags = [], {}
+                elem.clear()
+            elif elem.tag == 'relation':
+                refs, tags = [], {}
+                elem.clear()
+    return nodes, ways
+
+
+def build_graph(nodes, ways):
+    """由节点和 way 生成 RoadGraph，只保留被道路引用的节点"""
+    ids = {}
+    src, dst, seconds, name_ids = [], [], [], []
+    names = {'': 0}
+    for refs, tags in ways:
+        refs = [r for r in refs if r in nodes]
+        if len(refs) < 2:
+            continue
+        highway = tags['highway']
+        speed = _parse_speed(tags.get('maxspeed'), SPEED_KMH[highway]) / 3.6
+        oneway = tags.get('oneway', '')
+        forward = oneway not in ('-1', 'reverse')
+        backward = not (oneway in ('yes', 'true', '1', '-1', 'reverse')
+                        or tags.get('junction') == 'roundabout'
+                        or (highway in ONEWAY_BY_DEFAULT and oneway != 'no'))
+        if oneway in ('-1', 'reverse'):
+            backward = True
+        name = names.setdefault(tags.get('name') or tags.get('ref') or '', len(names))
+        idx = [ids.setdefault(r, len(ids)) for r in refs]
+        for a, b in zip(idx[:-1], idx[1:]):
+            for u, v, ok in ((a, b, forward), (b, a, backward)):
+                if ok:
+                    src.append(u)
+                    dst.append(v)
+                    seconds.append(speed)
+                    name_ids.append(name)
+    coords = np.empty((len(ids), 2))
+    for node_id, k in ids.items():
+        coords[k] = nodes[node_id]
+    src, dst = np.asarray(src, dtype=np.int32), np.asarray(dst, dtype=np.int32)
+    length = haversine(coords[src, 0], coords[src, 1], coords[dst, 0], coords[dst, 1])
+    seconds = length / np.asarray(seconds)
+    name_list = sorted(names, key=names.get)
+    return RoadGraph(coords[:, 0], coords[:, 1], src, dst, length, seconds, name_ids, name_list)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='由 OSM 导出构建路网图')
+    parser.add_argument('osm', help='OSM XML 文件（.osm / .osm.bz2）')
+    parser.add_argument('--output', default=str(GRAPH_PATH))
+    args = parser.parse_args()
+    graph = build_graph(*read_osm(args.osm))
+    graph.save(args.output)
+    print(f"节点 {graph.n_nodes}，有向边 {graph.n_edges}，已保存 {args.output}")
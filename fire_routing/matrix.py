@@ -0,0 +1,141 @@
+"""微站/中队 -> 历史火警 行驶时间矩阵
+
+每个出发点（微站、中队）做一次一对多 Dijkstra（scipy.sparse.csgraph，C 实现），
+只取火警点吸附节点那一列；出发点按块分给进程池，各进程只加载一次路网，
+把结果直接写入磁盘上的 float32 矩阵（.npy，行 = 出发点，列 = 火警点，单位秒，
+不可达为 inf）。页面用 mmap_mode='r' 打开，不需要把矩阵读进内存。
+起终点与路网节点之间的吸附距离按 SNAP_SPEED_KMH 折算为接驳时间。
+
+    python -m fire_routing.matrix [--workers 4]
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from fire_data import store
+from fire_routing.graph import DATA_DIR, GRAPH_PATH, RoadGraph
+from fire_routing.router import Router
+from fire_spatial.transform import gcj02_to_wgs84
+
+MATRIX_PATH = DATA_DIR / 'travel_time.npy'
+META_PATH = DATA_DIR / 'travel_time.json'
+SNAP_SPEED_KMH = 15
+CHUNK_SIZE = 8
+
+
+def responder_sources(stations, squads):
+    """出发点表：类型、名称、经纬度（GCJ-02）"""
+    squads = squads.dropna(subset=['中队地址_纬度', '中队地址_经度'])
+    return pd.concat([
+        pd.DataFrame({'类型': '微站', '名称': stations['所属微站'].astype(str),
+                      '纬度': stations['微站地址_纬度'], '经度': stations['微站地址_经度']}),
+        pd.DataFrame({'类型': '中队', '名称': squads['队站名称'].astype(str),
+                      '纬度': squads['中队地址_纬度'], '经度': squads['中队地址_经度']}),
+    ], ignore_index=True)
+
+
+def time_graph(graph):
+    """按行驶秒数构造稀疏邻接矩阵，平行边取最小值"""
+    edges = pd.DataFrame({'u': graph.src, 'v': graph.dst, 'w': graph.seconds.astype(float)})
+    edges = edges.groupby(['u', 'v'], sort=False)['w'].min().reset_index()
+    return csr_matrix((edges['w'], (edges['u'], edges['v'])), shape=(graph.n_nodes,) * 2)
+
+
+def snap(router, lon, lat):
+    """GCJ-02 坐标吸附到路网节点，返回 (节点, 接驳秒数)；坐标缺失时节点为 -1"""
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    nodes = np.full(len(lon), -1, dtype=np.int64)
+    seconds = np.full(len(lon), np.inf)
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    if valid.any():
+        node, dist = router.nearest_nodes(*gcj02_to_wgs84(lon[valid], lat[valid]))
+        nodes[valid] = node
+        seconds[valid] = dist / (SNAP_SPEED_KMH / 3.6)
+    return nodes, seconds
+
+
+_worker = {}
+
+
+def _init_worker(graph_path, matrix_path, fire_nodes, fire_snap):
+    _worker['graph'] = time_graph(RoadGraph.load(graph_path))
+    _worker['out'] = np.load(matrix_path, mmap_mode='r+')
+    _worker['fire_nodes'] = fire_nodes
+    _worker['fire_snap'] = fire_snap
+
+
+def _solve_chunk(rows, source_nodes, source_snap):
+    """一块出发点的一对多最短路，写入矩阵对应行"""
+    out, fire_nodes = _worker['out'], _worker['fire_nodes']
+    valid = fire_nodes >= 0
+    dist = dijkstra(_worker['graph'], indices=source_nodes)
+    block = np.full((len(rows), len(fire_nodes)), np.inf)
+    block[:, valid] = dist[:, fire_nodes[valid]] + source_snap[:, None] + _worker['fire_snap'][valid]
+    out[rows] = block.astype(np.float32)
+    out.flush()
+    return len(rows)
+
+
+def build_matrix(graph_path=GRAPH_PATH, matrix_path=MATRIX_PATH, meta_path=META_PATH, workers=None):
+    """计算并保存行驶时间矩阵，返回 (出发点数, 火警点数)"""
+    router = Router(RoadGraph.load(graph_path))
+    sources = responder_sources(store.load('stations'), store.load('squads'))
+    fires = store.load('fires_geocoded', ['经度', '纬度'])
+    source_nodes, source_snap = snap(router, sources['经度'], sources['纬度'])
+    fire_nodes, fire_snap = snap(router, fires['经度'], fires['纬度'])
+
+    out = np.lib.format.open_memmap(matrix_path, mode='w+', dtype=np.float32, shape=(len(sources), len(fires)))
+    out[:] = np.inf
+    out.flush()
+    del out
+
+    rows = np.flatnonzero(source_nodes >= 0)
+    chunks = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(graph_path, matrix_path, fire_nodes, fire_snap)) as pool:
+        list(pool.map(_solve_chunk, chunks, [source_nodes[c] for c in chunks], [source_snap[c] for c in chunks]))
+
+    meta = {
+        'sources': sources[['类型', '名称']].values.tolist(),
+        'n_fires': int(len(fires)),
+        'fires_mtime': store.csv_path('fires_geocoded').stat().st_mtime,
+        'graph_mtime': os.path.getmtime(graph_path),
+    }
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+    return len(sources), len(fires)
+
+
+def load_matrix(matrix_path=MATRIX_PATH, meta_path=META_PATH):
+    """只读内存映射矩阵与出发点表；文件缺失或火警数据已更新（含实时接入的新火警点）时返回 None"""
+    if not matrix_path.exists() or not meta_path.exists() or store.segment_paths('fires_geocoded'):
+        return None
+    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    if meta['fires_mtime'] < store.csv_path('fires_geocoded').stat().st_mtime:
+        return None
+    matrix = np.load(matrix_path, mmap_mode='r')
+    return matrix, pd.DataFrame(meta['sources'], columns=['类型', '名称'])
+
+
+def nearest_responders(matrix, sources, kind=None):
+    """每个火警点用时最短的出发点：(名称, 类型, 分钟)，kind 限定 微站/中队"""
+    rows = np.arange(len(sources)) if kind is None else np.flatnonzero(sources['类型'] == kind)
+    sub = np.asarray(matrix[rows])
+    best = np.argmin(sub, axis=0)
+    minutes = sub[best, np.arange(sub.shape[1])] / 60
+    picked = sources.iloc[rows[best]].reset_index(drop=True)
+    return pd.DataFrame({'最近出发点': picked['名称'], '类型': picked['类型'], '行驶分钟': minutes})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='计算微站/中队到历史火警的行驶时间矩阵')
+    parser.add_argument('--graph', default=str(GRAPH_PATH))
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    n_sources, n_fires = build_matrix(args.graph, workers=args.workers)
+    print(f"出发点 {n_sources} × 火警点 {n_fires}，已保存 {MATRIX_PATH}")
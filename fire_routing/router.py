@@ -0,0 +1,103 @@
+"""最短时间路径：双向 Dijkstra
+
+起终点先用 KD 树吸附到最近路网节点，再从两端同时扩展，
+两侧堆顶距离之和不小于当前最优值时停止。返回与高德驾车接口一致的信息：
+全程米数、秒数、折线点（[纬度, 经度]，WGS-84）和合并连续重复后的途经路名。
+与 scipy Dijkstra 的一致性校验见 tests/test_router.py。
+"""
+import heapq
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from fire_routing.graph import RoadGraph
+from fire_spatial.coverage import to_web_mercator
+
+INF = float('inf')
+
+
+class Router:
+    """构造一次（建吸附索引、把 CSR 转成 Python 列表供内层循环使用），之后反复查询"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._tree = cKDTree(to_web_mercator(graph.lon, graph.lat))
+        self._fwd_ptr, self._fwd_edge = graph.fwd_ptr.tolist(), graph.fwd_edge.tolist()
+        self._bwd_ptr, self._bwd_edge = graph.bwd_ptr.tolist(), graph.bwd_edge.tolist()
+        self._src, self._dst = graph.src.tolist(), graph.dst.tolist()
+        self._cost = graph.seconds.tolist()
+
+    def nearest_nodes(self, lon, lat):
+        """批量吸附，返回 (节点下标数组, 吸附距离米数组)；墨卡托距离按纬度余弦还原为实际米数"""
+        dist, node = self._tree.query(to_web_mercator(lon, lat))
+        return node, dist * np.cos(np.radians(np.asarray(lat, dtype=float)))
+
+    def nearest_node(self, lon, lat):
+        """返回 (节点下标, 吸附距离米)"""
+        node, dist = self.nearest_nodes([lon], [lat])
+        return int(node[0]), float(dist[0])
+
+    def shortest_path(self, s, t):
+        """返回 (总秒数, 边下标列表)，不可达时返回 (inf, None)"""
+        if s == t:
+            return 0.0, []
+        dist = ({s: 0.0}, {t: 0.0})
+        pred = ({s: -1}, {t: -1})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        done = (set(), set())
+        ptrs, edges, heads = (self._fwd_ptr, self._bwd_ptr), (self._fwd_edge, self._bwd_edge), (self._dst, self._src)
+        cost = self._cost
+        best, meet = INF, None
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in done[side]:
+                continue
+            done[side].add(u)
+            ptr, edge, head = ptrs[side], edges[side], heads[side]
+            mine, other = dist[side], dist[1 - side]
+            for k in range(ptr[u], ptr[u + 1]):
+                e = edge[k]
+                v = head[e]
+                nd = d + cost[e]
+                if nd < mine.get(v, INF):
+                    mine[v] = nd
+                    pred[side][v] = e
+                    heapq.heappush(heaps[side], (nd, v))
+                    if v in other and nd + other[v] < best:
+                        best, meet = nd + other[v], v
+        if meet is None:
+            return INF, None
+        path = []
+        node = meet
+        while pred[0][node] != -1:
+            e = pred[0][node]
+            path.append(e)
+            node = self._src[e]
+        path.reverse()
+        node = meet
+        while pred[1][node] != -1:
+            e = pred[1][node]
+            path.append(e)
+            node = self._dst[e]
+        return best, path
+
+    def route(self, start, end):
+        """start/end 为 (经度, 纬度)（WGS-84）；不可达返回 None"""
+        s, _ = self.nearest_node(*start)
+        t, _ = self.nearest_node(*end)
+        seconds, path = self.shortest_path(s, t)
+        if path is None:
+            return None
+        g = self.graph
+        nodes = [s] + [self._dst[e] for e in path]
+        roads = [g.names[i] for i in g.name_id[path] if g.names[i]] if path else []
+        return {
+            'distance': float(g.length[path].sum()) if path else 0.0,
+            'duration': float(seconds),
+            'points': [[float(g.lat[n]), float(g.lon[n])] for n in nodes],
+            # 合并连续重复路名
+            'roads': [r for i, r in enumerate(roads) if i == 0 or r != roads[i - 1]],
+        }
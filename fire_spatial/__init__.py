@@ -0,0 +1 @@
+"""空间分析：微站覆盖索引等。"""
@@ -0,0 +1,156 @@
+"""高发区域聚类服务（MiniBatchKMeans）
+
+服务对象在进程内常驻，按数据版本缓存 k=2..10 全部模型：
+- 首次加载或数据有删改时，后台线程依次拟合全部 k（页面默认的 k 最先拟合），
+  并在抽样子集上计算肘部法 SSE 与轮廓系数；
+- 只有新增警情时，对已拟合模型 partial_fit 新增点，增量移动聚类中心，不重新拟合；
+- 标签按 (k, 数据版本) 缓存，页面只取结果，不在请求里拟合或写文件。
+火警地址_KMeans聚类结果.csv 是模型训练/回测的输入，只由命令行（流水线 cluster 阶段）导出：
+读取批量快照 CSV 原样保留各列格式，不含实时接入的记录，服务本身从不写文件。
+
+    python -m fire_spatial.clustering --k 4     # 同步拟合并导出聚类结果 CSV
+"""
+import argparse
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+from fire_data import store
+
+FEATURES = ['纬度', '经度']
+K_RANGE = range(2, 11)
+DEFAULT_K = 4
+SAMPLE_SIZE = 2000
+BATCH_SIZE = 1024
+RANDOM_STATE = 42
+EXPORT_PATH = store.DATA_DIR / '火警地址_KMeans聚类结果.csv'
+
+
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df[FEATURES], index=False).to_numpy()
+
+
+def data_version(hashes):
+    return hashlib.sha1(np.sort(hashes).tobytes()).hexdigest()[:16]
+
+
+def fit_model(X, k, random_state=RANDOM_STATE):
+    return MiniBatchKMeans(n_clusters=k, random_state=random_state, batch_size=BATCH_SIZE, n_init=3).fit(X)
+
+
+def diagnose(model, sample):
+    """抽样子集上的 SSE（肘部法）与轮廓系数"""
+    labels = model.predict(sample)
+    silhouette = silhouette_score(sample, labels) if len(np.unique(labels)) > 1 else np.nan
+    return {'SSE': float(-model.score(sample)), '轮廓系数': float(silhouette)}
+
+
+def export_labels(df, labels, path=EXPORT_PATH):
+    df.assign(聚类簇=labels).to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def export_snapshot(k=DEFAULT_K, path=EXPORT_PATH):
+    """按批量快照 火警地址_已清洗.csv 拟合并导出聚类结果，列值原样写回"""
+    df = pd.read_csv(store.csv_path('fires_cleaned'), encoding='utf-8-sig')
+    X = df[FEATURES].to_numpy(dtype=float)
+    export_labels(df, fit_model(X, k).predict(X), path)
+    return len(df)
+
+
+class ClusterService:
+    """各 k 的聚类模型、标签与诊断指标，线程安全"""
+
+    def __init__(self, k_range=K_RANGE, default_k=DEFAULT_K):
+        self.k_range = list(k_range)
+        self.default_k = default_k
+        self.version = None
+        self._X = None
+        self._hashes = None
+        self._models = {}
+        self._diagnostics = {}
+        self._labels = {}
+        self._ready = {k: threading.Event() for k in self.k_range}
+        self._lock = threading.Lock()
+
+    def sync(self, df):
+        """与当前数据对齐；返回 'unchanged' / 'incremental' / 'refit'"""
+        hashes = row_hashes(df)
+        version = data_version(hashes)
+        if version == self.version:
+            return 'unchanged'
+        X = df[FEATURES].to_numpy(dtype=float)
+        with self._lock:
+            all_fitted = len(self._models) == len(self.k_range)
+            if all_fitted and np.isin(self._hashes, hashes).all():
+                # 只有新增行：增量更新中心
+                new = X[~np.isin(hashes, self._hashes)]
+                for model in self._models.values():
+                    model.partial_fit(new)
+                self._X, self._hashes, self.version = X, hashes, version
+                self._labels.clear()
+                return 'incremental'
+            self._X, self._hashes, self.version = X, hashes, version
+            self._models.clear()
+            self._diagnostics.clear()
+            self._labels.clear()
+            for event in self._ready.values():
+                event.clear()
+        threading.Thread(target=self._fit_all, args=(X, version), daemon=True).start()
+        return 'refit'
+
+    def _fit_all(self, X, version):
+        rng = np.random.default_rng(RANDOM_STATE)
+        sample = X[rng.choice(len(X), min(SAMPLE_SIZE, len(X)), replace=False)]
+        order = [self.default_k] + [k for k in self.k_range if k != self.default_k]
+        for k in order:
+            if k not in self._ready or k > len(X):
+                continue
+            model = fit_model(X, k)
+            diagnostics = diagnose(model, sample)
+            with self._lock:
+                if self.version != version:
+                    return
+                self._models[k] = model
+                self._diagnostics[k] = diagnostics
+                self._ready[k].set()
+
+    def model(self, k, timeout=None):
+        """已拟合模型；timeout 内未就绪返回 None"""
+        if not self._ready[k].wait(timeout):
+            return None
+        with self._lock:
+            return self._models.get(k)
+
+    def result(self, k, timeout=None):
+        """当前数据（最近一次 sync 的行顺序）的 (标签, 聚类中心)，标签按 (k, 数据版本) 缓存
+
+        标签和中心在同一把锁内取自同一个模型；timeout 内未就绪，或等待后其他会话已触发重新拟合，
+        返回 None，页面不会阻塞在拟合上。
+        """
+        if not self._ready[k].wait(timeout):
+            return None
+        with self._lock:
+            model = self._models.get(k)
+            if model is None:
+                return None
+            key = (k, self.version)
+            if key not in self._labels:
+                self._labels[key] = model.predict(self._X)
+            return self._labels[key], model.cluster_centers_.copy()
+
+    def diagnostics(self):
+        """已完成的 k 的肘部法 SSE 与轮廓系数（抽样计算）"""
+        with self._lock:
+            return pd.DataFrame.from_dict(self._diagnostics, orient='index').rename_axis('k').sort_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='拟合火警空间聚类并导出结果 CSV')
+    parser.add_argument('--k', type=int, default=DEFAULT_K)
+    args = parser.parse_args()
+    n = export_snapshot(args.k)
+    print(f"k={args.k}，{n} 行，已导出 {EXPORT_PATH}")
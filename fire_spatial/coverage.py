@@ -0,0 +1,81 @@
+"""微站多半径覆盖索引
+
+在 Web 墨卡托（EPSG:3857，与页面原先 buffer 所用坐标系一致）平面坐标上，
+用 KD 树一次性求出每个火警点在最大半径内的全部微站及距离：
+- 每个火警点保存到最近微站的距离，“是否被覆盖”即 最近距离 <= 半径；
+- 每个微站（按站名合并）保存半径内火警点的距离并排好序，
+  任意半径下的覆盖火警数用二分查找得到。
+拖动半径滑块时只做 searchsorted，不再 buffer 多边形和空间连接。
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS = 6378137.0
+MIN_RADIUS = 300
+MAX_RADIUS = 5000
+
+
+def to_web_mercator(lon, lat):
+    """经纬度 -> EPSG:3857 平面坐标（米）"""
+    lon = np.radians(np.asarray(lon, dtype=float))
+    lat = np.radians(np.asarray(lat, dtype=float))
+    return np.column_stack([EARTH_RADIUS * lon, EARTH_RADIUS * np.log(np.tan(np.pi / 4 + lat / 2))])
+
+
+class CoverageIndex:
+    """构造一次，之后按任意半径（<= max_radius）查询"""
+
+    def __init__(self, station_xy, station_names, fire_xy, max_radius=MAX_RADIUS):
+        self.max_radius = max_radius
+        self.station_names = pd.Series(station_names).astype(str).reset_index(drop=True)
+        codes, self.names = pd.factorize(self.station_names)
+        self.station_codes = codes
+
+        fire_xy = np.asarray(fire_xy, dtype=float)
+        valid = np.isfinite(fire_xy).all(axis=1)
+        fire_ids = np.flatnonzero(valid)
+        self.n_fires = len(fire_xy)
+
+        tree = cKDTree(station_xy)
+        # 最近微站距离（坐标缺失的火警点视为无穷远）
+        self.nearest = np.full(self.n_fires, np.inf)
+        if len(fire_ids):
+            self.nearest[fire_ids] = tree.query(fire_xy[valid], k=1)[0]
+
+        # 半径内的 (火警点, 微站) 对，同名微站取最小距离
+        pairs = cKDTree(fire_xy[valid]).sparse_distance_matrix(tree, max_radius, output_type='ndarray')
+        pairs = pd.DataFrame({
+            'fire': fire_ids[pairs['i']], 'name': codes[pairs['j']], 'dist': pairs['v'],
+        }).groupby(['name', 'fire'])['dist'].min().reset_index()
+        pairs = pairs.sort_values(['name', 'dist'], kind='stable')
+
+        # 每个站名一段升序距离，段偏移 2*max_radius，合并成一条有序键便于批量二分
+        self._span = 2.0 * max_radius
+        self._keys = pairs['name'].to_numpy() * self._span + pairs['dist'].to_numpy()
+        self._offsets = np.searchsorted(self._keys, np.arange(len(self.names)) * self._span)
+
+    @classmethod
+    def from_frames(cls, stations, fires, max_radius=MAX_RADIUS):
+        station_xy = to_web_mercator(stations['微站地址_经度'], stations['微站地址_纬度'])
+        fire_xy = to_web_mercator(fires['经度'], fires['纬度'])
+        return cls(station_xy, stations['所属微站'], fire_xy, max_radius)
+
+    def _check(self, radius):
+        if radius > self.max_radius:
+            raise ValueError(f"半径 {radius} 超出索引最大半径 {self.max_radius}")
+
+    def covered(self, radius):
+        """每个火警点是否在任一微站半径内（布尔数组，顺序同输入火警点）"""
+        self._check(radius)
+        return self.nearest <= radius
+
+    def counts_by_name(self, radius):
+        """每个站名半径内的火警点数（同名微站合并去重）"""
+        self._check(radius)
+        ends = np.searchsorted(self._keys, np.arange(len(self.names)) * self._span + radius, side='right')
+        return pd.Series(ends - self._offsets, index=self.names)
+
+    def station_counts(self, radius):
+        """按输入微站顺序返回覆盖火警点数"""
+        return self.station_names.map(self.counts_by_name(radius)).fillna(0).astype(int)
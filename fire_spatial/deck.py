@@ -0,0 +1,102 @@
+"""点位地图的 pydeck（deck.gl WebGL）图层
+
+火警点整理成只含 经度/纬度/名称 三列的紧凑表（高德坐标转为 WGS-84 以对齐 Carto 底图），整体作为一个 ScatterplotLayer
+（或 HeatmapLayer）交给浏览器用 GPU 绘制，不再逐点生成 folium 标记；
+微站服务区用以米为单位的圆直接绘制（半径按纬度换算成与覆盖统计一致的地面米数），不生成 buffer 多边形；热点边界用 PolygonLayer 绘制。
+"""
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+from fire_spatial.transform import gcj02_to_wgs84
+
+FIRE_COLOR = [220, 30, 30, 150]
+UNCOVERED_COLOR = [255, 150, 0, 230]
+STATION_COLOR = [0, 90, 255, 220]
+HOTSPOT_FILL = [255, 80, 0, 70]
+SCAN_FILL = [150, 0, 200, 60]
+SERVICE_FILL = [0, 120, 255, 18]
+SERVICE_LINE = [0, 0, 255, 90]
+TOOLTIP = {'text': '{name}'}
+
+
+def point_table(lon, lat, names):
+    """紧凑点表：GCJ-02 转 WGS-84，坐标保留 6 位小数（约 0.1 米），缺失坐标剔除"""
+    lon, lat = gcj02_to_wgs84(pd.to_numeric(pd.Series(lon), errors='coerce').to_numpy(dtype=float),
+                              pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype=float))
+    table = pd.DataFrame({
+        'lon': lon.round(6),
+        'lat': lat.round(6),
+        'name': pd.Series(names).astype(str).to_numpy(),
+    })
+    return table.dropna(subset=['lon', 'lat'])
+
+
+def fire_points(fires):
+    return point_table(fires['经度'], fires['纬度'], fires['火警地址'])
+
+
+def station_points(stations):
+    return point_table(stations['微站地址_经度'], stations['微站地址_纬度'], stations['所属微站'])
+
+
+def fire_layer(points, color=FIRE_COLOR, layer_id='fires'):
+    return pdk.Layer(
+        'ScatterplotLayer', points, id=layer_id, get_position='[lon, lat]', get_fill_color=color,
+        get_radius=30, radius_min_pixels=2, radius_max_pixels=8, pickable=True,
+    )
+
+
+def heatmap_layer(points):
+    return pdk.Layer('HeatmapLayer', points, id='fire-heat', get_position='[lon, lat]',
+                     radius_pixels=40, intensity=1, threshold=0.05)
+
+
+def service_radius(lat, radius):
+    """覆盖统计用的 EPSG:3857 平面半径 -> 地面米数
+
+    墨卡托平面距离在纬度 φ 处放大 1/cos(φ)（浦东约 1.17 倍），deck.gl 的 meters 是地面米，
+    圆按 radius·cos(φ) 绘制才与 CoverageIndex 统计为已覆盖的范围一致。
+    """
+    return radius * np.cos(np.radians(np.asarray(lat, dtype=float)))
+
+
+def station_layers(points, radius):
+    """服务区圆 + 微站点；半径变化时只需重建这两个小图层"""
+    circles = points.assign(radius=service_radius(points['lat'], radius).round(1))
+    service = pdk.Layer(
+        'ScatterplotLayer', circles, id='service-area', get_position='[lon, lat]', get_radius='radius',
+        radius_units='meters', filled=True, stroked=True, get_fill_color=SERVICE_FILL,
+        get_line_color=SERVICE_LINE, line_width_min_pixels=1,
+    )
+    marker = pdk.Layer(
+        'ScatterplotLayer', points, id='stations', get_position='[lon, lat]', get_fill_color=STATION_COLOR,
+        get_radius=80, radius_min_pixels=5, stroked=True, get_line_color=[0, 0, 0, 255],
+        line_width_min_pixels=1, pickable=True,
+    )
+    return [service, marker]
+
+
+def polygon_table(polygons, names):
+    """多边形表：边界 [[经度, 纬度], ...] 由 GCJ-02 转 WGS-84"""
+    rings = []
+    for ring in polygons:
+        ring = np.asarray(ring, dtype=float)
+        lon, lat = gcj02_to_wgs84(ring[:, 0], ring[:, 1])
+        rings.append(np.column_stack([lon, lat]).round(6).tolist())
+    return pd.DataFrame({'polygon': rings, 'name': pd.Series(names).astype(str).to_numpy()})
+
+
+def polygon_layer(table, fill=HOTSPOT_FILL, layer_id='hotspots'):
+    return pdk.Layer(
+        'PolygonLayer', table, id=layer_id, get_polygon='polygon', get_fill_color=fill,
+        get_line_color=fill[:3] + [220], line_width_min_pixels=1, stroked=True, filled=True, pickable=True,
+    )
+
+
+def view_state(points, zoom=10.5):
+    return pdk.ViewState(latitude=float(points['lat'].mean()), longitude=float(points['lon'].mean()), zoom=zoom)
+
+
+def build_deck(layers, view):
+    return pdk.Deck(layers=layers, initial_view_state=view, tooltip=TOOLTIP, map_style=None)
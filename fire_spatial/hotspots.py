@@ -0,0 +1,254 @@
+"""火警密度热点识别与时空扫描
+
+密度热点：经纬度转弧度后用 haversine 距离做 DBSCAN / HDBSCAN，邻域查询走 BallTree，
+不计算 O(n²) 距离矩阵；稀疏点标为噪声（-1），不强行归类。每个热点输出火警数、中心、
+面积和边界多边形（簇内各点外扩半个邻域半径后的凸包）。
+
+时空扫描（前瞻式，空间-时间置换模型）：以火警点为圆心、若干半径画圆，时间窗口取截至
+最新立案时间的最近 N 天。圆内窗口期的观测数与期望数（圆内总数 × 窗口期总数 / 总数）
+之比给出对数似然比；把立案时间随机置换若干次，取每次的最大似然比作为零分布得到 p 值。
+圆与点的归属用 BallTree 半径查询一次建成稀疏矩阵，置换时只做稀疏矩阵乘法。
+
+    python -m fire_spatial.hotspots --eps 300 --min-samples 8
+    python -m fire_spatial.hotspots --bench 100000      # 随机 10 万点测耗时
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import ConvexHull
+from sklearn.cluster import DBSCAN, HDBSCAN
+from sklearn.neighbors import BallTree
+
+from fire_data import store
+
+EARTH_RADIUS = 6371008.8
+DEFAULT_EPS = 300
+DEFAULT_MIN_SAMPLES = 8
+SCAN_WINDOWS = (7, 14, 30)
+SCAN_RADII = (500, 1000, 2000)
+MAX_CENTERS = 1000
+N_PERMUTATIONS = 99
+CIRCLE_VERTICES = 36
+HOTSPOT_COLUMNS = ['热点编号', '火警数', '中心经度', '中心纬度', '面积_平方公里', '边界']
+SCAN_COLUMNS = ['中心经度', '中心纬度', '半径_米', '窗口天数', '窗口起始', '观测数', '期望数', '相对风险',
+                '对数似然比', 'p值', '边界']
+
+
+def to_radians(lon, lat):
+    """(纬度, 经度) 弧度数组，sklearn haversine 距离要求的顺序"""
+    return np.radians(np.column_stack([np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)]))
+
+
+def local_xy(lon, lat, lon0, lat0):
+    """以 (lon0, lat0) 为原点的局部平面坐标（米），用于求凸包和面积"""
+    x = np.radians(np.asarray(lon) - lon0) * EARTH_RADIUS * np.cos(np.radians(lat0))
+    y = np.radians(np.asarray(lat) - lat0) * EARTH_RADIUS
+    return x, y
+
+
+def from_local_xy(x, y, lon0, lat0):
+    lon = lon0 + np.degrees(x / (EARTH_RADIUS * np.cos(np.radians(lat0))))
+    lat = lat0 + np.degrees(y / EARTH_RADIUS)
+    return lon, lat
+
+
+def density_labels(lon, lat, eps=DEFAULT_EPS, min_samples=DEFAULT_MIN_SAMPLES, method='dbscan'):
+    """每个点的热点编号，噪声为 -1；eps 为米（HDBSCAN 时作为合并阈值）"""
+    X = to_radians(lon, lat)
+    if method == 'hdbscan':
+        model = HDBSCAN(min_cluster_size=min_samples, metric='haversine', algorithm='ball_tree',
+                        cluster_selection_epsilon=eps / EARTH_RADIUS, copy=False)
+    else:
+        model = DBSCAN(eps=eps / EARTH_RADIUS, min_samples=min_samples, metric='haversine',
+                       algorithm='ball_tree', n_jobs=-1)
+    return model.fit_predict(X)
+
+
+def _hull(lon, lat, buffer):
+    """点集外扩 buffer 米后的凸包 -> ([[经度, 纬度], ...], 面积平方米)"""
+    lon0, lat0 = float(np.mean(lon)), float(np.mean(lat))
+    x, y = local_xy(lon, lat, lon0, lat0)
+    angles = np.linspace(0, 2 * np.pi, 8, endpoint=False)
+    px = (x[:, None] + buffer * np.cos(angles)).ravel()
+    py = (y[:, None] + buffer * np.sin(angles)).ravel()
+    hull = ConvexHull(np.column_stack([px, py]))
+    ring_lon, ring_lat = from_local_xy(px[hull.vertices], py[hull.vertices], lon0, lat0)
+    ring = np.column_stack([ring_lon, ring_lat]).round(6)
+    return np.vstack([ring, ring[:1]]).tolist(), hull.volume
+
+
+def hotspot_polygons(lon, lat, labels, times=None, eps=DEFAULT_EPS):
+    """每个热点一行：火警数、中心、面积、边界；按火警数降序"""
+    lon, lat, labels = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float), np.asarray(labels)
+    keep = labels >= 0
+    order = np.argsort(labels[keep], kind='stable')
+    idx = np.flatnonzero(keep)[order]
+    ids, starts = np.unique(labels[idx], return_index=True)
+    rows = []
+    for hid, members in zip(ids, np.split(idx, starts[1:])):
+        ring, area = _hull(lon[members], lat[members], eps / 2)
+        row = {
+            '热点编号': int(hid),
+            '火警数': len(members),
+            '中心经度': round(float(lon[members].mean()), 6),
+            '中心纬度': round(float(lat[members].mean()), 6),
+            '面积_平方公里': round(area / 1e6, 3),
+        }
+        if times is not None:
+            t = pd.to_datetime(pd.Series(times).iloc[members])
+            row['最早立案时间'], row['最近立案时间'] = t.min(), t.max()
+        row['边界'] = ring
+        rows.append(row)
+    if not rows:
+        return pd.DataFrame(columns=HOTSPOT_COLUMNS)
+    return pd.DataFrame(rows).sort_values('火警数', ascending=False, ignore_index=True)
+
+
+def detect_hotspots(fires, eps=DEFAULT_EPS, min_samples=DEFAULT_MIN_SAMPLES, method='dbscan'):
+    """火警表 -> (每点热点编号, 热点多边形表)；缺坐标的点编号为 -1"""
+    valid = fires[['纬度', '经度']].notna().all(axis=1).to_numpy()
+    points = fires[valid]
+    labels = np.full(len(fires), -1)
+    if len(points) >= min_samples:
+        labels[valid] = density_labels(points['经度'], points['纬度'], eps, min_samples, method)
+    times = points['立案时间'] if '立案时间' in points else None
+    return labels, hotspot_polygons(points['经度'], points['纬度'], labels[valid], times, eps)
+
+
+def circle(lon, lat, radius, n=CIRCLE_VERTICES):
+    angles = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    ring_lon, ring_lat = from_local_xy(radius * np.cos(angles), radius * np.sin(angles), lon, lat)
+    ring = np.column_stack([ring_lon, ring_lat]).round(6)
+    return np.vstack([ring, ring[:1]]).tolist()
+
+
+def _llr(c, total_z, total_w, n):
+    """空间-时间置换模型的对数似然比，只对观测多于期望的圆计分"""
+    expected = total_z * total_w / n
+    c = np.asarray(c, dtype=float)
+    rest, rest_exp = total_w - c, total_w - expected
+    with np.errstate(divide='ignore', invalid='ignore'):
+        llr = (np.where(c > 0, c * np.log(c / expected), 0.0)
+               + np.where(rest > 0, rest * np.log(rest / rest_exp), 0.0))
+    return np.where((c > expected) & (expected > 0), llr, 0.0), expected
+
+
+def space_time_scan(lon, lat, times, windows=SCAN_WINDOWS, radii=SCAN_RADII, end=None,
+                    max_centers=MAX_CENTERS, n_perm=N_PERMUTATIONS, max_clusters=10, min_cases=2, seed=0):
+    """前瞻式时空扫描：截至 end 的最近若干天内异常聚集的圆形区域，按似然比降序、互不重叠"""
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    times = pd.to_datetime(pd.Series(times)).to_numpy()
+    n = len(lon)
+    end = np.datetime64(pd.Timestamp(end)) if end is not None else times.max()
+    rng = np.random.default_rng(seed)
+
+    X = to_radians(lon, lat)
+    tree = BallTree(X, metric='haversine')
+    # 圆心：去重后的火警坐标，过多时抽样
+    _, first = np.unique(np.round(X, 7), axis=0, return_index=True)
+    centers = np.sort(first)
+    if len(centers) > max_centers:
+        centers = np.sort(rng.choice(centers, max_centers, replace=False))
+
+    # 所有 (圆心, 半径) 圆的成员关系一次建成稀疏矩阵
+    blocks = []
+    for r in radii:
+        members = tree.query_radius(X[centers], r / EARTH_RADIUS)
+        indptr = np.concatenate([[0], np.cumsum([len(m) for m in members])])
+        indices = np.concatenate(members) if len(members) else np.array([], dtype=int)
+        blocks.append(sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(len(centers), n)))
+    membership = sparse.vstack(blocks).tocsr()
+    circle_center = np.tile(centers, len(radii))
+    circle_radius = np.repeat(radii, len(centers))
+    total_z = np.asarray(membership.sum(axis=1)).ravel()
+
+    def window_matrix(t):
+        return np.column_stack([t > end - np.timedelta64(w, 'D') for w in windows]).astype(float)
+
+    in_window = window_matrix(times)
+    total_w = in_window.sum(axis=0)
+    observed = membership @ in_window
+    llr, expected = _llr(observed, total_z[:, None], total_w, n)
+
+    # 置换立案时间得到最大似然比的零分布
+    null_max = np.empty(n_perm)
+    for i in range(n_perm):
+        perm = window_matrix(times[rng.permutation(n)])
+        null_max[i] = _llr(membership @ perm, total_z[:, None], total_w, n)[0].max()
+
+    rows, taken = [], []
+    for flat in np.argsort(llr, axis=None)[::-1]:
+        ci, wi = np.unravel_index(flat, llr.shape)
+        if llr[ci, wi] <= 0 or len(rows) >= max_clusters:
+            break
+        center, radius = circle_center[ci], circle_radius[ci]
+        if observed[ci, wi] < min_cases:
+            continue
+        # 与已选圆重叠的跳过
+        if any(haversine_m(lon[center], lat[center], lon[c], lat[c]) < radius + r for c, r in taken):
+            continue
+        taken.append((center, radius))
+        c, e = observed[ci, wi], expected[ci, wi]
+        rows.append({
+            '中心经度': round(float(lon[center]), 6),
+            '中心纬度': round(float(lat[center]), 6),
+            '半径_米': int(radius),
+            '窗口天数': int(windows[wi]),
+            '窗口起始': pd.Timestamp(end - np.timedelta64(windows[wi], 'D')),
+            '观测数': int(c),
+            '期望数': round(float(e), 2),
+            '相对风险': round(float(c / e), 2),
+            '对数似然比': round(float(llr[ci, wi]), 3),
+            'p值': float((1 + np.sum(null_max >= llr[ci, wi])) / (n_perm + 1)),
+            '边界': circle(lon[center], lat[center], radius),
+        })
+    return pd.DataFrame(rows, columns=SCAN_COLUMNS)
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def benchmark(n, eps=DEFAULT_EPS, min_samples=DEFAULT_MIN_SAMPLES, seed=0):
+    """在真实火警点附近随机生成 n 个点（带时间），测密度聚类与时空扫描耗时"""
+    fires = store.load('fires_cleaned').dropna(subset=['纬度', '经度'])
+    rng = np.random.default_rng(seed)
+    base = fires.sample(n, replace=True, random_state=seed)
+    lon = base['经度'].to_numpy() + rng.normal(0, 0.01, n)
+    lat = base['纬度'].to_numpy() + rng.normal(0, 0.01, n)
+    times = base['立案时间'].to_numpy()
+    result = {'点数': n}
+    t = time.perf_counter()
+    labels = density_labels(lon, lat, eps, min_samples)
+    result['DBSCAN秒'] = round(time.perf_counter() - t, 2)
+    t = time.perf_counter()
+    polygons = hotspot_polygons(lon, lat, labels, eps=eps)
+    result['多边形秒'] = round(time.perf_counter() - t, 2)
+    result['热点数'] = len(polygons)
+    t = time.perf_counter()
+    space_time_scan(lon, lat, times)
+    result['时空扫描秒'] = round(time.perf_counter() - t, 2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='火警密度热点与时空扫描')
+    parser.add_argument('--eps', type=float, default=DEFAULT_EPS, help='邻域半径（米）')
+    parser.add_argument('--min-samples', type=int, default=DEFAULT_MIN_SAMPLES, help='核心点最少邻居数')
+    parser.add_argument('--method', choices=['dbscan', 'hdbscan'], default='dbscan')
+    parser.add_argument('--bench', type=int, default=0, help='随机点数，给出时只跑基准')
+    args = parser.parse_args()
+
+    if args.bench:
+        print(benchmark(args.bench, args.eps, args.min_samples))
+    else:
+        fires = store.load('fires_cleaned').dropna(subset=['纬度', '经度'])
+        _, polygons = detect_hotspots(fires, args.eps, args.min_samples, args.method)
+        print(polygons.drop(columns='边界').to_string(index=False))
+        scan = space_time_scan(fires['经度'], fires['纬度'], fires['立案时间'])
+        print(scan.drop(columns='边界').to_string(index=False))
@@ -0,0 +1,226 @@
+"""微站选址优化（最大覆盖问题）
+
+需求点为历史火警点（权重 1，或取所在网格未来 N 天的平均预测火警概率），
+候选站址为火警所在网格（fire_spatial.cells 整数网格，约 1 公里）中心和各中队地址。每个候选站址在服务半径内的
+需求点用 KD 树一次性求出，存成 CSR 结构；选址用惰性贪心（CELF）：
+覆盖函数是子模的，候选的旧增益就是新增益的上界，堆顶重算后仍最大即可直接选中，
+大部分候选不需要重算。同时给出在线上界 f(S) + 前 K 大边际增益，用于判断离最优还差多少。
+
+    python -m fire_spatial.siting --k 5 --radius 2000 [--forecast]
+    python -m fire_spatial.siting --bench 5000      # 随机候选规模下与朴素贪心对比耗时
+"""
+import argparse
+import heapq
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from fire_data import store
+from fire_spatial import cells
+from fire_spatial.coverage import to_web_mercator
+
+GRID_ZOOM = cells.DEFAULT_ZOOM
+DEFAULT_RADIUS = 2000
+
+
+def grid_candidates(fires, zoom=GRID_ZOOM):
+    """火警所在网格的中心点"""
+    ids = np.unique(cells.cell_id(fires['经度'], fires['纬度'], zoom))
+    lon, lat = cells.cell_center(ids[ids >= 0])
+    return pd.DataFrame({
+        '类型': '网格',
+        '名称': [f'网格({a:.3f},{o:.3f})' for a, o in zip(lat, lon)],
+        '纬度': lat,
+        '经度': lon,
+    })
+
+
+def squad_candidates(squads):
+    squads = squads.dropna(subset=['中队地址_纬度', '中队地址_经度'])
+    return pd.DataFrame({
+        '类型': '中队',
+        '名称': squads['队站名称'].astype(str).to_numpy(),
+        '纬度': squads['中队地址_纬度'].to_numpy(),
+        '经度': squads['中队地址_经度'].to_numpy(),
+    })
+
+
+def forecast_weights(fires, forecast, zoom=GRID_ZOOM):
+    """每个火警点取所在网格在预测期内的平均预测概率，无预测的网格记 0"""
+    prob = forecast.groupby('网格编号')['预测有火警概率'].mean()
+    return prob.reindex(cells.cell_id(fires['经度'], fires['纬度'], zoom)).fillna(0).to_numpy()
+
+
+def coverage_sets(site_xy, demand_xy, radius):
+    """每个站址半径内的需求点，CSR：(indptr, indices)"""
+    hits = cKDTree(site_xy).query_ball_tree(cKDTree(demand_xy), radius)
+    indptr = np.zeros(len(hits) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(h) for h in hits])
+    indices = np.fromiter((i for h in hits for i in h), dtype=np.int64, count=indptr[-1])
+    return indptr, indices
+
+
+class SitingProblem:
+    """需求点、候选站址与现有微站构成的最大覆盖问题"""
+
+    def __init__(self, demand_xy, weights, candidate_xy, existing_xy=None, radius=DEFAULT_RADIUS):
+        self.weights = np.asarray(weights, dtype=float)
+        self.radius = radius
+        self.cand_ptr, self.cand_idx = coverage_sets(candidate_xy, demand_xy, radius)
+        if existing_xy is not None and len(existing_xy):
+            self.exist_ptr, self.exist_idx = coverage_sets(existing_xy, demand_xy, radius)
+        else:
+            self.exist_ptr, self.exist_idx = np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    def _members(self, ptr, idx, j):
+        return idx[ptr[j]:ptr[j + 1]]
+
+    def covered_by_existing(self, keep=None):
+        """现有微站（keep 为保留的下标，None 表示全部）覆盖的需求点计数"""
+        counts = np.zeros(len(self.weights), dtype=np.int32)
+        n = len(self.exist_ptr) - 1
+        for j in (range(n) if keep is None else keep):
+            counts[self._members(self.exist_ptr, self.exist_idx, j)] += 1
+        return counts
+
+    def gain(self, j, covered):
+        members = self._members(self.cand_ptr, self.cand_idx, j)
+        return float(self.weights[members][~covered[members]].sum())
+
+    def greedy(self, k, covered=None, lazy=True):
+        """选 k 个候选站址，返回 (选中下标, 各步增益, 上界)"""
+        covered = np.zeros(len(self.weights), dtype=bool) if covered is None else covered.copy()
+        n = len(self.cand_ptr) - 1
+        chosen, gains = [], []
+        if lazy:
+            heap = [(-self.gain(j, covered), j, 0) for j in range(n)]
+            heapq.heapify(heap)
+        bound = np.inf
+        for step in range(min(k, n)):
+            if lazy:
+                while True:
+                    neg, j, stamp = heapq.heappop(heap)
+                    if stamp == step:
+                        break
+                    heapq.heappush(heap, (-self.gain(j, covered), j, step))
+                # 堆中旧增益都是当前增益的上界，据此给出 OPT 的在线上界
+                top = sorted([-neg] + [-h[0] for h in heapq.nsmallest(k - 1, heap)], reverse=True)[:k]
+                best, best_gain = j, -neg
+            else:
+                all_gains = np.array([self.gain(j, covered) if j not in chosen else -1.0 for j in range(n)])
+                best = int(np.argmax(all_gains))
+                best_gain = all_gains[best]
+                top = np.sort(all_gains)[::-1][:k]
+            bound = min(bound, sum(gains) + float(np.sum(top)))
+            if best_gain <= 0:
+                break
+            chosen.append(best)
+            gains.append(best_gain)
+            covered[self._members(self.cand_ptr, self.cand_idx, best)] = True
+        return chosen, gains, bound
+
+    def relocation_order(self, covered_counts):
+        """各现有微站独占覆盖的需求权重；按独占覆盖、再按总覆盖升序即建议优先搬迁的站"""
+        members = [self._members(self.exist_ptr, self.exist_idx, j) for j in range(len(self.exist_ptr) - 1)]
+        unique = np.array([self.weights[m][covered_counts[m] == 1].sum() for m in members])
+        total = np.array([self.weights[m].sum() for m in members])
+        return np.lexsort((total, unique)), unique
+
+
+def build_problem(fires, stations, squads, radius=DEFAULT_RADIUS, forecast=None):
+    fires = fires.dropna(subset=['纬度', '经度']).reset_index(drop=True)
+    candidates = pd.concat([grid_candidates(fires), squad_candidates(squads)], ignore_index=True)
+    weights = np.ones(len(fires)) if forecast is None else forecast_weights(fires, forecast)
+    stations = stations.dropna(subset=['微站地址_纬度', '微站地址_经度']).reset_index(drop=True)
+    problem = SitingProblem(
+        to_web_mercator(fires['经度'], fires['纬度']), weights,
+        to_web_mercator(candidates['经度'], candidates['纬度']),
+        to_web_mercator(stations['微站地址_经度'], stations['微站地址_纬度']), radius,
+    )
+    return problem, candidates, stations
+
+
+def _summary(problem, picks, gains, bound, base):
+    total = problem.weights.sum()
+    return {
+        '需求总量': round(float(total), 2),
+        '原覆盖': round(float(base), 2),
+        '优化后覆盖': round(float(base + sum(gains)), 2),
+        '覆盖率': round(float((base + sum(gains)) / total), 4) if total else 0.0,
+        '新增上界': round(float(bound), 2),
+    }
+
+
+def _site_table(candidates, picks, gains):
+    table = candidates.iloc[picks].reset_index(drop=True)
+    table.insert(0, '序号', np.arange(1, len(picks) + 1))
+    table['新增覆盖'] = np.round(gains, 2)
+    table['累计新增'] = np.round(np.cumsum(gains), 2)
+    return table
+
+
+def propose_new_sites(fires, stations, squads, k, radius=DEFAULT_RADIUS, forecast=None):
+    """在现有微站之外新增 k 个站址，返回 (站址表, 汇总)"""
+    problem, candidates, _ = build_problem(fires, stations, squads, radius, forecast)
+    covered = problem.covered_by_existing() > 0
+    picks, gains, bound = problem.greedy(k, covered)
+    base = problem.weights[covered].sum()
+    return _site_table(candidates, picks, gains), _summary(problem, picks, gains, bound, base)
+
+
+def propose_relocations(fires, stations, squads, k, radius=DEFAULT_RADIUS, forecast=None):
+    """搬迁独占覆盖最少的 k 个微站，剩余站覆盖之外重新贪心选址，返回 (搬迁表, 汇总)"""
+    problem, candidates, stations = build_problem(fires, stations, squads, radius, forecast)
+    counts = problem.covered_by_existing()
+    order, unique = problem.relocation_order(counts)
+    moved = order[:k]
+    keep = np.setdiff1d(np.arange(len(stations)), moved)
+    covered = problem.covered_by_existing(keep) > 0
+    picks, gains, bound = problem.greedy(len(moved), covered)
+    base = problem.weights[covered].sum()
+    table = _site_table(candidates, picks, gains)
+    table.insert(1, '搬迁微站', stations['所属微站'].iloc[moved[:len(picks)]].to_numpy())
+    table.insert(2, '原独占覆盖', np.round(unique[moved[:len(picks)]], 2))
+    summary = _summary(problem, picks, gains, bound, base)
+    summary['原覆盖'] = round(float(problem.weights[counts > 0].sum()), 2)
+    return table, summary
+
+
+def benchmark(n_candidates, k=10, radius=DEFAULT_RADIUS, seed=0):
+    """随机候选站址下比较惰性贪心与朴素贪心的耗时和结果"""
+    fires = store.load('fires_geocoded').dropna(subset=['纬度', '经度'])
+    demand_xy = to_web_mercator(fires['经度'], fires['纬度'])
+    rng = np.random.default_rng(seed)
+    lo, hi = demand_xy.min(axis=0), demand_xy.max(axis=0)
+    cand_xy = rng.uniform(lo, hi, size=(n_candidates, 2))
+    t = time.perf_counter()
+    problem = SitingProblem(demand_xy, np.ones(len(demand_xy)), cand_xy, radius=radius)
+    t_index = time.perf_counter() - t
+    result = {'候选数': n_candidates, '需求点数': len(demand_xy), '建索引秒': round(t_index, 3)}
+    for lazy in (True, False):
+        t = time.perf_counter()
+        picks, gains, _ = problem.greedy(k, lazy=lazy)
+        result['惰性贪心' if lazy else '朴素贪心'] = (round(time.perf_counter() - t, 3), float(sum(gains)))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='微站选址优化')
+    parser.add_argument('--k', type=int, default=5, help='新增/搬迁站数')
+    parser.add_argument('--radius', type=float, default=DEFAULT_RADIUS, help='服务半径（米）')
+    parser.add_argument('--forecast', action='store_true', help='按预测概率加权')
+    parser.add_argument('--relocate', action='store_true', help='搬迁现有微站而非新增')
+    parser.add_argument('--bench', type=int, default=0, help='随机候选数，给出时只跑基准')
+    args = parser.parse_args()
+
+    if args.bench:
+        print(benchmark(args.bench, args.k, args.radius))
+    else:
+        forecast = store.load('forecast') if args.forecast else None
+        solve = propose_relocations if args.relocate else propose_new_sites
+        table, summary = solve(store.load('fires_geocoded'), store.load('stations'), store.load('squads'),
+                               args.k, args.radius, forecast)
+        print(table.to_string(index=False))
+        print(summary)
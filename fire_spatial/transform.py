@@ -0,0 +1,85 @@
+"""GCJ-02（高德）与 WGS-84（OSM/GPS/Carto 底图）坐标转换，numpy 向量化
+
+正向 WGS-84 -> GCJ-02 为解析公式；反向没有解析解，先用一步近似，
+再以正向公式的残差迭代修正（不动点迭代），通常 2~3 轮即收敛到 1e-9 度（约 0.1 毫米）。
+整列数组一次计算，10 万个点在毫秒级完成；标量输入返回 float。
+"""
+import numpy as np
+import pandas as pd
+
+GCJ_A = 6378245.0
+GCJ_EE = 0.00669342162296594323
+INVERSE_TOL = 1e-9
+INVERSE_MAX_ITER = 10
+
+
+def out_of_china(lon, lat):
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    return ~((lon > 73.66) & (lon < 135.05) & (lat > 3.86) & (lat < 53.55))
+
+
+def gcj02_offset(lon, lat):
+    """WGS-84 坐标 (lon, lat) 处的 GCJ-02 偏移量 (dlon, dlat)，国外为 0
+
+    与常见的标量公式逐项相同，只是纬度、经度两组级数共用的 sin(6πx)、sin(2πx)、sqrt|x|
+    只算一次，sin/cos(纬度) 由同一个 sin 得到。
+    """
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    x, y = lon - 105.0, lat - 35.0
+    shared = (20.0 * np.sin(6.0 * x * np.pi) + 20.0 * np.sin(2.0 * x * np.pi)) * 2.0 / 3.0
+    root = np.sqrt(np.abs(x))
+    d_lat = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * root + shared
+    d_lat += (20.0 * np.sin(y * np.pi) + 40.0 * np.sin(y / 3.0 * np.pi)) * 2.0 / 3.0
+    d_lat += (160.0 * np.sin(y / 12.0 * np.pi) + 320 * np.sin(y * np.pi / 30.0)) * 2.0 / 3.0
+    d_lon = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * root + shared
+    d_lon += (20.0 * np.sin(x * np.pi) + 40.0 * np.sin(x / 3.0 * np.pi)) * 2.0 / 3.0
+    d_lon += (150.0 * np.sin(x / 12.0 * np.pi) + 300.0 * np.sin(x / 30.0 * np.pi)) * 2.0 / 3.0
+    sin_lat = np.sin(lat / 180.0 * np.pi)
+    magic = 1 - GCJ_EE * sin_lat ** 2
+    sqrt_magic = np.sqrt(magic)
+    d_lat = (d_lat * 180.0) / ((GCJ_A * (1 - GCJ_EE)) / (magic * sqrt_magic) * np.pi)
+    d_lon = (d_lon * 180.0) / (GCJ_A / sqrt_magic * np.sqrt(1 - sin_lat ** 2) * np.pi)
+    outside = out_of_china(lon, lat)
+    return np.where(outside, 0.0, d_lon), np.where(outside, 0.0, d_lat)
+
+
+def _result(lon, lat, scalar):
+    return (float(lon), float(lat)) if scalar else (lon, lat)
+
+
+def wgs84_to_gcj02(lon, lat):
+    """WGS-84 -> GCJ-02"""
+    scalar = np.ndim(lon) == 0 and np.ndim(lat) == 0
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    d_lon, d_lat = gcj02_offset(lon, lat)
+    return _result(lon + d_lon, lat + d_lat, scalar)
+
+
+def gcj02_to_wgs84(lon, lat, tol=INVERSE_TOL, max_iter=INVERSE_MAX_ITER):
+    """GCJ-02 -> WGS-84，迭代求逆，残差小于 tol 度后停止；缺失坐标保持 NaN"""
+    scalar = np.ndim(lon) == 0 and np.ndim(lat) == 0
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    d_lon, d_lat = gcj02_offset(lon, lat)
+    w_lon, w_lat = lon - d_lon, lat - d_lat
+    prev = None
+    for _ in range(max_iter):
+        g_lon, g_lat = wgs84_to_gcj02(w_lon, w_lat)
+        e_lon, e_lat = g_lon - lon, g_lat - lat
+        w_lon, w_lat = w_lon - e_lon, w_lat - e_lat
+        err = max(np.nanmax(np.abs(e_lon), initial=0.0), np.nanmax(np.abs(e_lat), initial=0.0))
+        # 线性收敛（每轮误差约缩小到 1/300），按收缩比预估修正后的误差，够小就不再多算一轮
+        if err <= tol or (prev and err * err / prev <= tol):
+            break
+        prev = err
+    return _result(w_lon, w_lat, scalar)
+
+
+def with_wgs84(df, lat_col='纬度', lon_col='经度'):
+    """在高德坐标列旁追加 <列名>_WGS84 两列（供 OSM/Carto 等 WGS-84 底图使用）"""
+    lon = pd.to_numeric(df[lon_col], errors='coerce').to_numpy(dtype=float)
+    lat = pd.to_numeric(df[lat_col], errors='coerce').to_numpy(dtype=float)
+    w_lon, w_lat = gcj02_to_wgs84(lon, lat)
+    missing = np.isnan(lon) | np.isnan(lat)
+    w_lon[missing], w_lat[missing] = np.nan, np.nan
+    return df.assign(**{f'{lat_col}_WGS84': w_lat, f'{lon_col}_WGS84': w_lon})
+
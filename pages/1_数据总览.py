@@ -2,34 +2,48 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from fire_data.browser import PAGE_SIZES, page_count
+from fire_data.loaders import (
+    data_version, load_alarm_cube, load_record_index, load_response_sketches, watch_data_version,
+)
+
 # ===== 数据加载与预处理 =====
-@st.cache_data
-def load_data():
-    df = pd.read_csv(r'data\每日火警详情.csv', encoding='utf-8')
-    if df.columns[0].startswith('\ufeff'):  # 去除BOM
-        df.columns = [col.replace('\ufeff', '') for col in df.columns]
-    df['立案时间'] = pd.to_datetime(df['立案时间'])
-    df['日期'] = df['立案时间'].dt.date
-    df['小时'] = df['立案时间'].dt.hour
-    return df
-
-df = load_data()
+version = data_version()
+cube = load_alarm_cube(version)
+sketches = load_response_sketches(version)
 
 st.set_page_config("每日火警数据分析", layout="wide")
 st.title("每日火警数据分析看板")
+watch_data_version()
+
+# ===== 看板筛选（在预聚合立方体上切片，不扫描原始记录） =====
+st.sidebar.markdown("## 看板筛选")
+dates = cube.cells['日期'].dropna()
+date_range = st.sidebar.date_input(
+    "日期范围", value=(dates.min().date(), dates.max().date()),
+    min_value=dates.min().date(), max_value=dates.max().date()
+)
+sel_brigade = st.sidebar.multiselect("所属大队", cube.values('所属大队'))
+sel_kind = st.sidebar.multiselect("实/虚警", cube.values('实/虚警'))
+view = cube.slice(
+    {'所属大队': sel_brigade, '实/虚警': sel_kind},
+    date_range if len(date_range) == 2 else None
+)
 
 ##############################
 # 1. 数据总览
 ##############################
 with st.expander("📊 数据总览", expanded=True):
+    real_fake = view.count_by('实/虚警')
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("警情总数", len(df))
-    col2.metric("实警", (df['实/虚警']=='实警').sum())
-    col3.metric("虚警", (df['实/虚警']=='虚警').sum())
-    col4.metric("微站数量", df['微站'].nunique())
+    col1.metric("警情总数", view.total())
+    col2.metric("实警", int(real_fake.get('实警', 0)))
+    col3.metric("虚警", int(real_fake.get('虚警', 0)))
+    col4.metric("微站数量", cube.meta['微站数量'])
 
     st.markdown("#### 火警类型分布")
-    fig_type = px.pie(df, names='火警类型', title="火警类型占比", hole=0.4)
+    type_count = view.count_by('火警类型').reset_index()
+    fig_type = px.pie(type_count, names='火警类型', values='警情数', title="火警类型占比", hole=0.4)
     st.plotly_chart(fig_type, use_container_width=True)
 
 ##############################
@@ -37,7 +51,7 @@ with st.expander("📊 数据总览", expanded=True):
 ##############################
 with st.expander("🗺️ 警情区域分布"):
     area = st.selectbox("选择分组", ['所属街道','所属大队','所属队站'], key='area')
-    area_count = df[area].value_counts().reset_index()
+    area_count = view.count_by(area).reset_index()
     area_count.columns = [area, '警情数']
     fig_area = px.bar(area_count.head(20), x=area, y='警情数', title=f"{area} 警情数Top20")
     st.plotly_chart(fig_area, use_container_width=True)
@@ -47,9 +61,9 @@ with st.expander("🗺️ 警情区域分布"):
 ##############################
 with st.expander("⏰ 时间趋势分析"):
     tab1, tab2 = st.tabs(['按日期', '按小时'])
-    date_count = df.groupby('日期').size()
+    date_count = view.series_by('日期')
     tab1.line_chart(date_count)
-    hour_count = df.groupby('小时').size()
+    hour_count = view.series_by('小时')
     tab2.bar_chart(hour_count)
 
 ##############################
@@ -57,41 +71,38 @@ with st.expander("⏰ 时间趋势分析"):
 ##############################
 with st.expander("🔥 类型与处置分析"):
     col1, col2 = st.columns(2)
-    type_top = df['火警类型'].value_counts().head(5)
+    type_top = view.count_by('火警类型').head(5)
     col1.markdown("#### 火警类型TOP5")
     col1.bar_chart(type_top)
 
     col2.markdown("#### 微站处置方式分布")
-    if '微站处置' in df.columns:
-        col2.bar_chart(df['微站处置'].fillna("无").value_counts())
-    else:
-        col2.info("无微站处置字段")
+    col2.bar_chart(view.count_by('微站处置', fill="无"))
 
     st.markdown("#### 各类型对应处置方式")
-    if '微站处置' in df.columns:
-        cross = pd.crosstab(df['火警类型'], df['微站处置'])
-        st.dataframe(cross)
-    else:
-        st.info("无微站处置字段")
+    cross = view.crosstab('火警类型', '微站处置')
+    st.dataframe(cross)
 
 ##############################
 # 5. 多维筛选与原始数据浏览
 ##############################
 with st.expander("🔎 多条件筛选/原始数据浏览"):
     st.markdown("可按类型、街道、实/虚警等多条件筛选查看原始记录")
+    index = load_record_index(version)
     col1, col2, col3 = st.columns(3)
-    sel_type = col1.multiselect("火警类型", df['火警类型'].unique())
-    sel_area = col2.multiselect("所属街道", df['所属街道'].unique())
-    sel_real = col3.multiselect("实/虚警", df['实/虚警'].unique())
-
-    mask = pd.Series([True] * len(df))
-    if sel_type:
-        mask &= df['火警类型'].isin(sel_type)
-    if sel_area:
-        mask &= df['所属街道'].isin(sel_area)
-    if sel_real:
-        mask &= df['实/虚警'].isin(sel_real)
-    df_view = df[mask]
+    sel_type = col1.multiselect("火警类型", index.options('火警类型'))
+    sel_area = col2.multiselect("所属街道", index.options('所属街道'))
+    sel_real = col3.multiselect("实/虚警", index.options('实/虚警'))
+
+    col1, col2, col3 = st.columns(3)
+    sort_by = col1.selectbox("排序字段", list(index.df.columns), index=0)
+    ascending = col2.radio("排序方式", ["降序", "升序"], horizontal=True) == "升序"
+    page_size = col3.selectbox("每页条数", PAGE_SIZES, index=1)
+
+    filters = {'火警类型': sel_type, '所属街道': sel_area, '实/虚警': sel_real}
+    total = index.count(index.match(filters))
+    n_pages = page_count(total, page_size)
+    page = st.number_input(f"页码（共 {n_pages} 页，{total} 条）", min_value=1, max_value=n_pages, value=1)
+    df_view, _ = index.query(filters, sort_by, ascending, page, page_size)
 
     st.dataframe(df_view, use_container_width=True, height=400)
 
@@ -100,11 +111,14 @@ with st.expander("🔎 多条件筛选/原始数据浏览"):
 ##############################
 with st.expander("📈 高级分析"):
     st.markdown("#### 微站出动用时分位数")
-    if '微站出动用时' in df.columns:
-        used = pd.to_numeric(df['微站出动用时'], errors='coerce')
-        # 数据清洗：仅保留0到500分钟内的用时
-        used_clean = used[(used >= 0) & (used <= 500)]
-        desc = used_clean.describe(percentiles=[.25, .5, .75, .9, .95]).round(2)
+    # 分位数直接读取增量维护的 t-digest 草图，不对全量记录排序
+    used = sketches.digest('全部', '全部', '微站出动用时')
+    if used.count:
+        desc = pd.Series({
+            'count': used.count, 'mean': used.mean(), 'std': used.std(), 'min': used.min,
+            **{f'{int(q * 100)}%': used.quantile(q) for q in [.25, .5, .75, .9, .95]},
+            'max': used.max,
+        }).round(2)
         desc_table = pd.DataFrame(desc)
         desc_table.index = [
             "数据条数", "平均用时", "用时波动", "最短用时", "25%用时", "50%用时", 
@@ -125,6 +139,14 @@ with st.expander("📈 高级分析"):
     else:
         st.info("无微站出动用时字段")
 
+    st.markdown("#### 响应用时 p50 / p90 / p95")
+    col1, col2 = st.columns(2)
+    metric = col1.selectbox("用时指标", ['微站调派到场用时', '中队到场用时', '微站出动用时'])
+    grouping = col2.selectbox("分组", ['微站', '所属队站', '月份'])
+    sla = sketches.summary(metric, grouping).round(2)
+    sla = sla.sort_index() if grouping == '月份' else sla.sort_values('p90', ascending=False)
+    st.caption("微站调派到场用时 = 微站到场时间 - 微站调派时间；中队到场用时 = 中队到场时间 - 微站调派时间（单位：分钟）")
+    st.dataframe(sla, use_container_width=True)
     
 st.markdown("---")
 st.caption("© 2025 火警数据分析 | Streamlit前端交互可视化 | 建议用 streamlit run project.py 启动，无需任何自动打开浏览器代码")
\ No newline at end of file
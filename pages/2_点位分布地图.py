@@ -1,4 +1,5 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib
@@ -7,25 +8,38 @@ import folium
 from folium.plugins import MarkerCluster
 from streamlit_folium import st_folium
 
+from fire_data.loaders import (
+    data_version, load_coverage_index, load_fires_geocoded, load_forecast, load_squads, load_stations,
+    load_travel_times, watch_data_version,
+)
+from fire_routing.matrix import nearest_responders
+from fire_spatial import deck, siting
+
 # 中文字体设置
 matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
 matplotlib.rcParams['axes.unicode_minus'] = False
 
 st.set_page_config(layout="wide")
 st.title("浦东微站火警点空间分布与覆盖统计分析")
+watch_data_version()
 
-@st.cache_data
-def load_data():
-    stations = pd.read_csv(r'data\微站地址_已地理编码.csv', encoding='utf-8')
-    fires = pd.read_csv(r'data\火警地址_已地理编码_已清洗.csv', encoding='utf-8')
-    if stations.columns[0].startswith('\ufeff'):
-        stations.columns = [c.replace('\ufeff','') for c in stations.columns]
-    if fires.columns[0].startswith('\ufeff'):
-        fires.columns = [c.replace('\ufeff','') for c in fires.columns]
-    return stations, fires
-
-stations, fires = load_data()
+stations = load_stations()
+version = data_version()
+fires = load_fires_geocoded(version=version)
 SERVICE_RADIUS = st.slider('选择微站服务半径（米）', 300, 5000, 2000, 100)
+travel = load_travel_times(version)
+by_drive = travel is not None and st.radio('覆盖口径', ['直线距离', '行驶时间'], horizontal=True) == '行驶时间'
+if by_drive:
+    DRIVE_MINUTES = st.slider('行驶时间阈值（分钟）', 1, 30, 5)
+render_mode = st.radio('地图渲染方式', ['WebGL（pydeck，适合大量点位）', 'folium（含静态图）'], horizontal=True)
+webgl = render_mode.startswith('WebGL')
+
+@st.cache_resource
+def deck_base_layers(fires, stations):
+    """WebGL 模式的底图图层（火警点、热力图）只构造一次"""
+    fire_pts = deck.fire_points(fires)
+    station_pts = deck.station_points(stations)
+    return fire_pts, deck.fire_layer(fire_pts), deck.heatmap_layer(fire_pts), station_pts
 
 @st.cache_data
 def prepare_gdf(stations, fires):
@@ -41,104 +55,148 @@ def prepare_gdf(stations, fires):
     ).to_crs('EPSG:3857')
     return st_gdf, fi_gdf
 
-gdf_st, gdf_fi = prepare_gdf(stations, fires)
-gdf_st_buffer = gdf_st.copy()
-gdf_st_buffer['geometry'] = gdf_st_buffer.geometry.buffer(SERVICE_RADIUS)
-
-# --- 空间分析：统计每站覆盖火警点数量和未覆盖火警点 ---
-join_df = gpd.sjoin(gdf_fi, gdf_st_buffer[['geometry', '所属微站']], how='left', predicate='intersects')
-fires['被覆盖'] = False
-fires['覆盖微站'] = ''
-fires.loc[join_df.index, '被覆盖'] = True
-def join_station_names(x):
-    return ';'.join(str(i) for i in set(x) if pd.notnull(i))
-cover_station = join_df.groupby(join_df.index)['所属微站'].agg(join_station_names)
-fires.loc[cover_station.index, '覆盖微站'] = cover_station
-cover_count = fires['覆盖微站'].str.split(';').explode().value_counts()
-cover_df = pd.DataFrame({
-    '微站': gdf_st['所属微站'],
-    f'服务半径{SERVICE_RADIUS}米_覆盖火警点数': gdf_st['所属微站'].map(cover_count).fillna(0).astype(int)
-})
+# --- 空间分析：统计每站覆盖火警点数量和未覆盖火警点（预计算覆盖索引，按半径二分查找） ---
+coverage = load_coverage_index(version)
+if by_drive:
+    # 行驶时间矩阵（行 = 出发点，列 = 火警点，秒），微站行与 stations 顺序一致
+    travel_times, sources = travel
+    within = np.asarray(travel_times[np.flatnonzero(sources['类型'] == '微站')]) <= DRIVE_MINUTES * 60
+    covered = within.any(axis=0)
+    basis_label = f'行驶{DRIVE_MINUTES}分钟'
+    cover_df = pd.DataFrame({'微站': stations['所属微站'], f'{basis_label}内_覆盖火警点数': within.sum(axis=1)})
+else:
+    covered = coverage.covered(SERVICE_RADIUS)
+    basis_label = f'服务半径{SERVICE_RADIUS}米'
+    cover_df = pd.DataFrame({
+        '微站': stations['所属微站'],
+        f'服务半径{SERVICE_RADIUS}米_覆盖火警点数': coverage.station_counts(SERVICE_RADIUS).to_numpy()
+    })
 
 # --- 地图与静态图 ---
-gdf_st_latlon = gdf_st.to_crs('EPSG:4326')
-gdf_st_buffer_latlon = gdf_st_buffer.to_crs('EPSG:4326')
-gdf_fi_latlon = gdf_fi.to_crs('EPSG:4326')
+if not webgl:
+    gdf_st, gdf_fi = prepare_gdf(stations, fires)
+    # 服务区多边形仅用于 folium/静态图绘制，覆盖统计不依赖它
+    gdf_st_buffer = gdf_st.copy()
+    gdf_st_buffer['geometry'] = gdf_st_buffer.geometry.buffer(SERVICE_RADIUS)
+    gdf_st_latlon = gdf_st.to_crs('EPSG:4326')
+    gdf_st_buffer_latlon = gdf_st_buffer.to_crs('EPSG:4326')
+    gdf_fi_latlon = gdf_fi.to_crs('EPSG:4326')
 
 col1, col2 = st.columns([1.5, 2])
 
 with col1:
     st.subheader("各微站覆盖火警点统计")
     st.dataframe(cover_df, use_container_width=True)
-    st.write(f'服务半径{SERVICE_RADIUS}米下，未被任何微站覆盖的火警点数量：{(~fires["被覆盖"]).sum()}')
+    st.write(f'{basis_label}下，未被任何微站覆盖的火警点数量：{(~covered).sum()}')
     st.download_button(
         '下载未覆盖火警点CSV',
-        fires[~fires['被覆盖']][['立案时间','火警地址','纬度','经度']].to_csv(index=False, encoding='utf-8-sig'),
+        fires[~covered][['立案时间','火警地址','纬度','经度']].to_csv(index=False, encoding='utf-8-sig'),
         file_name='未覆盖火警点.csv',
         mime='text/csv'
     )
+    if by_drive:
+        nearest = pd.concat([fires[['立案时间', '火警地址']], nearest_responders(*travel).round(2)], axis=1)
+        st.download_button(
+            '下载各火警点最近响应力量CSV（按行驶时间）',
+            nearest.to_csv(index=False, encoding='utf-8-sig'),
+            file_name='最近响应力量.csv',
+            mime='text/csv'
+        )
 
-    st.subheader("空间分布（静态图）")
-    fig, ax = plt.subplots(figsize=(8, 7))
-    # 服务区buffer多边形
-    gdf_st_buffer_latlon.boundary.plot(ax=ax, color='blue', linewidth=1, alpha=0.3, label='服务区边界')
-    # 微站点
-    sc1 = ax.scatter(gdf_st_latlon.geometry.x, gdf_st_latlon.geometry.y, s=90, color='blue', marker='o',
-               edgecolor='black', linewidth=1, label='微站', zorder=3, alpha=0.97)
-    # 所有火警点（统一为红色小星）
-    sc2 = ax.scatter(gdf_fi_latlon.geometry.x, gdf_fi_latlon.geometry.y, s=25, color='red', marker='*',
-               edgecolor='none', linewidth=0.5, label='火警点', zorder=2, alpha=0.7)
-    ax.set_xlabel("经度")
-    ax.set_ylabel("纬度")
-    ax.set_title(f'空间分布（服务半径{SERVICE_RADIUS}米，仅展示火警点与微站）', fontsize=15, fontweight='bold', pad=12)
-    ax.grid(linestyle='--', alpha=0.25)
-    # 图例合并，自动选择最佳位置
-    handles, labels = ax.get_legend_handles_labels()
-    by_label = dict(zip(labels, handles))
-    ax.legend(by_label.values(), by_label.keys(), loc='best', ncol=1, fontsize=11, frameon=True, borderpad=1)
-    plt.tight_layout()
-    st.pyplot(fig)
+    if not webgl:
+        st.subheader("空间分布（静态图）")
+        fig, ax = plt.subplots(figsize=(8, 7))
+        # 服务区buffer多边形
+        gdf_st_buffer_latlon.boundary.plot(ax=ax, color='blue', linewidth=1, alpha=0.3, label='服务区边界')
+        # 微站点
+        sc1 = ax.scatter(gdf_st_latlon.geometry.x, gdf_st_latlon.geometry.y, s=90, color='blue', marker='o',
+                   edgecolor='black', linewidth=1, label='微站', zorder=3, alpha=0.97)
+        # 所有火警点（统一为红色小星）
+        sc2 = ax.scatter(gdf_fi_latlon.geometry.x, gdf_fi_latlon.geometry.y, s=25, color='red', marker='*',
+                   edgecolor='none', linewidth=0.5, label='火警点', zorder=2, alpha=0.7)
+        ax.set_xlabel("经度")
+        ax.set_ylabel("纬度")
+        ax.set_title(f'空间分布（服务半径{SERVICE_RADIUS}米，仅展示火警点与微站）', fontsize=15, fontweight='bold', pad=12)
+        ax.grid(linestyle='--', alpha=0.25)
+        # 图例合并，自动选择最佳位置
+        handles, labels = ax.get_legend_handles_labels()
+        by_label = dict(zip(labels, handles))
+        ax.legend(by_label.values(), by_label.keys(), loc='best', ncol=1, fontsize=11, frameon=True, borderpad=1)
+        plt.tight_layout()
+        st.pyplot(fig)
 
 with col2:
-    st.subheader("交互式地图（火警点聚合显示）")
-    center_lat = stations['微站地址_纬度'].mean()
-    center_lon = stations['微站地址_经度'].mean()
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=12, control_scale=True)
-    folium.TileLayer(
-        tiles='http://webrd01.is.autonavi.com/appmaptile?lang=zh_cn&size=1&scl=1&style=7&x={x}&y={y}&z={z}',
-        attr='高德地图',
-        name='高德矢量',
-        overlay=False,
-        control=True
-    ).add_to(m)
-    # 服务区buffer多边形
-    for idx, row in gdf_st_buffer_latlon.iterrows():
-        folium.GeoJson(
-            row['geometry'],
-            style_function=lambda x: {"color": "blue", "weight": 2, "fillOpacity": 0.07}
+    if webgl:
+        st.subheader("交互式地图（WebGL 渲染）")
+        show_heat = st.checkbox("火警热力图", value=False)
+        fire_pts, fire_base, heat_base, station_pts = deck_base_layers(fires, stations)
+        uncovered_pts = fire_pts[~covered[fire_pts.index.to_numpy()]]
+        layers = [heat_base if show_heat else fire_base,
+                  deck.fire_layer(uncovered_pts, deck.UNCOVERED_COLOR, 'uncovered')]
+        layers += deck.station_layers(station_pts, SERVICE_RADIUS)
+        st.pydeck_chart(deck.build_deck(layers, deck.view_state(station_pts)), height=560)
+        st.caption("红色：火警点；橙色：当前半径下未被任何微站覆盖的火警点；蓝色圆：微站服务区")
+    else:
+        st.subheader("交互式地图（火警点聚合显示）")
+        center_lat = stations['微站地址_纬度'].mean()
+        center_lon = stations['微站地址_经度'].mean()
+        m = folium.Map(location=[center_lat, center_lon], zoom_start=12, control_scale=True)
+        folium.TileLayer(
+            tiles='http://webrd01.is.autonavi.com/appmaptile?lang=zh_cn&size=1&scl=1&style=7&x={x}&y={y}&z={z}',
+            attr='高德地图',
+            name='高德矢量',
+            overlay=False,
+            control=True
         ).add_to(m)
-    # 微站点
-    for idx, row in gdf_st_latlon.iterrows():
-        folium.CircleMarker(
-            location=[row.geometry.y, row.geometry.x],
-            radius=8,
-            color='blue',
-            fill=True,
-            fill_color='cyan',
-            fill_opacity=0.8,
-            popup=f"微站：{row['所属微站']}"
-        ).add_to(m)
-    # 火警点聚合
-    marker_cluster = MarkerCluster(name='火警点聚合').add_to(m)
-    for idx, row in fires.iterrows():
-        folium.CircleMarker(
-            location=[row['纬度'], row['经度']],
-            radius=5,
-            color='red',
-            fill=True,
-            fill_color='red',
-            fill_opacity=0.7,
-            popup=f"火警点：{row['火警地址']}"
-        ).add_to(marker_cluster)
-    folium.LayerControl().add_to(m)
-    st_folium(m, width=700, height=560)
\ No newline at end of file
+        # 服务区buffer多边形
+        for idx, row in gdf_st_buffer_latlon.iterrows():
+            folium.GeoJson(
+                row['geometry'],
+                style_function=lambda x: {"color": "blue", "weight": 2, "fillOpacity": 0.07}
+            ).add_to(m)
+        # 微站点
+        for idx, row in gdf_st_latlon.iterrows():
+            folium.CircleMarker(
+                location=[row.geometry.y, row.geometry.x],
+                radius=8,
+                color='blue',
+                fill=True,
+                fill_color='cyan',
+                fill_opacity=0.8,
+                popup=f"微站：{row['所属微站']}"
+            ).add_to(m)
+        # 火警点聚合
+        marker_cluster = MarkerCluster(name='火警点聚合').add_to(m)
+        for idx, row in fires.iterrows():
+            folium.CircleMarker(
+                location=[row['纬度'], row['经度']],
+                radius=5,
+                color='red',
+                fill=True,
+                fill_color='red',
+                fill_opacity=0.7,
+                popup=f"火警点：{row['火警地址']}"
+            ).add_to(marker_cluster)
+        folium.LayerControl().add_to(m)
+        st_folium(m, width=700, height=560)
+
+# --- 选址优化：新增/搬迁微站使覆盖的历史火警最多 ---
+# 读取全局 fires，version 只作缓存键：新警情接入或源 CSV 重写后版本变化，选址结果随之重算；
+# 预测表作为参数参与缓存键，重新评分后同样重算
+@st.cache_data
+def run_siting(k, radius, relocate, forecast, version):
+    solve = siting.propose_relocations if relocate else siting.propose_new_sites
+    return solve(fires, stations, load_squads(), k, radius, forecast)
+
+with st.expander("🧭 微站选址优化（最大覆盖）"):
+    c1, c2, c3 = st.columns(3)
+    k_sites = c1.number_input("站点数 K", min_value=1, max_value=30, value=5)
+    relocate = c2.radio("方案", ["新增微站", "搬迁现有微站"], horizontal=True) == "搬迁现有微站"
+    weighted = c3.checkbox("按未来预测火警概率加权", value=False)
+    site_df, site_summary = run_siting(int(k_sites), SERVICE_RADIUS, relocate, load_forecast() if weighted else None, version)
+    st.dataframe(site_df, use_container_width=True)
+    st.write(
+        f"服务半径{SERVICE_RADIUS}米：原覆盖 {site_summary['原覆盖']} / {site_summary['需求总量']}，"
+        f"优化后覆盖 {site_summary['优化后覆盖']}（覆盖率 {site_summary['覆盖率']:.1%}）；"
+        f"贪心解新增覆盖不低于最优解的 63%，最优新增覆盖不超过 {site_summary['新增上界']}。"
+    )
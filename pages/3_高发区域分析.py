@@ -1,36 +1,41 @@
 import streamlit as st
-import pandas as pd
-from sklearn.cluster import KMeans
 import plotly.express as px
 
-# ========== 数据加载 ==========
-@st.cache_data
-def load_data():
-    df = pd.read_csv(r"data\火警地址_已清洗.csv", encoding='utf-8')
-    if df.columns[0].startswith('\ufeff'):
-        df.columns = [col.replace('\ufeff', '') for col in df.columns]
-    return df
+from fire_data.loaders import data_version, load_cluster_service, load_fires_cleaned, watch_data_version
+from fire_spatial import deck, hotspots
+from fire_spatial.transform import with_wgs84
 
-df = load_data()
+RESULT_TIMEOUT = 3  # 首次访问时最多等待后台拟合的秒数
+
+# ========== 数据加载 ==========
+df = load_fires_cleaned(version=data_version())
+service = load_cluster_service()
+# 数据未变时直接返回；只有新增警情时增量更新中心；否则后台重新拟合
+service.sync(df)
 
 st.set_page_config("火警地址空间聚类", layout="wide")
 st.title("火警地址KMeans空间聚类分析")
+watch_data_version()
 
 # ========== 选择聚类数 ==========
 st.sidebar.markdown("## KMeans聚类参数")
 n_clusters = st.sidebar.slider("选择聚类数量", min_value=2, max_value=10, value=4)
 
-# ========== KMeans聚类 ==========
-X = df[['纬度', '经度']]
-kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-df['聚类簇'] = kmeans.fit_predict(X)
+# ========== KMeans聚类（取缓存结果，不在页面里拟合） ==========
+result = service.result(n_clusters, timeout=RESULT_TIMEOUT)
+if result is None:
+    st.info("聚类模型正在后台计算，请稍候刷新页面。")
+    st.stop()
+labels, centers = result
+df = df.assign(聚类簇=labels)
 
 # ========== 展示聚类结果地图 ==========
 st.markdown(f"#### KMeans聚类结果（共{n_clusters}类）")
+# 聚类仍用高德坐标；Carto 底图为 WGS-84，绘图前转换
 fig = px.scatter_mapbox(
-    df,
-    lat="纬度",
-    lon="经度",
+    with_wgs84(df),
+    lat="纬度_WGS84",
+    lon="经度_WGS84",
     color="聚类簇",
     hover_data=['火警地址', '立案时间'],
     zoom=10,
@@ -40,7 +45,6 @@ fig = px.scatter_mapbox(
 st.plotly_chart(fig, use_container_width=True)
 
 # ========== 展示聚类中心 ==========
-centers = kmeans.cluster_centers_
 st.markdown("#### 各聚类中心（纬度，经度）：")
 for i, c in enumerate(centers):
     st.write(f"第{i+1}类中心: 纬度 {c[0]:.6f}, 经度 {c[1]:.6f}")
@@ -49,11 +53,55 @@ for i, c in enumerate(centers):
 st.markdown("#### 各簇数量统计：")
 st.dataframe(df['聚类簇'].value_counts().sort_index().rename_axis('聚类簇').reset_index(name='数量'))
 
+# ========== 密度热点（DBSCAN / HDBSCAN，haversine 距离） ==========
+st.sidebar.markdown("## 密度热点参数")
+method = st.sidebar.radio("算法", ["dbscan", "hdbscan"], horizontal=True)
+eps = st.sidebar.slider("邻域半径（米）", min_value=100, max_value=1000, value=hotspots.DEFAULT_EPS, step=50)
+min_samples = st.sidebar.slider("最少火警数", min_value=3, max_value=30, value=hotspots.DEFAULT_MIN_SAMPLES)
+
+@st.cache_data
+def run_hotspots(fires, eps, min_samples, method):
+    return hotspots.detect_hotspots(fires, eps, min_samples, method)[1]
+
+@st.cache_data
+def run_scan(fires):
+    fires = fires.dropna(subset=['纬度', '经度', '立案时间'])
+    return hotspots.space_time_scan(fires['经度'], fires['纬度'], fires['立案时间'])
+
+st.markdown("#### 密度热点（稀疏点记为噪声，不强行归类）")
+hotspot_df = run_hotspots(df, eps, min_samples, method)
+scan_df = run_scan(df)
+points = deck.fire_points(df)
+hotspot_names = '热点' + hotspot_df['热点编号'].astype(str) + '：' + hotspot_df['火警数'].astype(str) + ' 起'
+scan_names = ('近' + scan_df['窗口天数'].astype(str) + '天 ' + scan_df['观测数'].astype(str)
+              + ' 起（期望 ' + scan_df['期望数'].astype(str) + '）')
+layers = [
+    deck.fire_layer(points),
+    deck.polygon_layer(deck.polygon_table(hotspot_df['边界'], hotspot_names)),
+    deck.polygon_layer(deck.polygon_table(scan_df['边界'], scan_names), fill=deck.SCAN_FILL, layer_id='scan'),
+]
+st.pydeck_chart(deck.build_deck(layers, deck.view_state(points)))
+st.write(f"共 {len(hotspot_df)} 个热点，覆盖 {int(hotspot_df['火警数'].sum())} / {len(df)} 起火警。")
+st.dataframe(hotspot_df.drop(columns='边界'), use_container_width=True)
+
+st.markdown("#### 近期异常聚集（前瞻式时空扫描，紫色圆）")
+st.caption("比较最近 7/14/30 天圆内火警数与按历史分布的期望数，p 值由 99 次立案时间置换得到。")
+st.dataframe(scan_df.drop(columns='边界'), use_container_width=True)
+
+# ========== 聚类数选择参考 ==========
+st.markdown("#### 聚类数选择参考（肘部法 / 轮廓系数，抽样计算）")
+diagnostics = service.diagnostics()
+col1, col2 = st.columns(2)
+with col1:
+    st.line_chart(diagnostics['SSE'])
+with col2:
+    st.line_chart(diagnostics['轮廓系数'])
+
 st.caption("© 2025 火警空间聚类分析 | 支持自定义类数 | 支持地图交互可视化")
 
 # ========== 下载聚类结果 ==========
 st.markdown("#### 下载聚类结果")
 st.info("如下载后用Excel打开出现中文乱码，请用Excel的“数据”->“自文本/CSV”导入，编码选择UTF-8。")
-
-# 保存一份到服务器本地
-df.to_csv(r"data\火警地址_KMeans聚类结果.csv", index=False, encoding='utf-8-sig')
\ No newline at end of file
+st.download_button(
+    "下载聚类结果", df.to_csv(index=False, encoding='utf-8-sig'), "火警地址_KMeans聚类结果.csv"
+)
\ No newline at end of file
@@ -7,6 +7,11 @@ from streamlit_folium import st_folium
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from fire_data.loaders import load_forecast, load_pred_result
+from fire_data.store import DATA_DIR
+from fire_spatial import cells
+from fire_spatial.transform import gcj02_to_wgs84
+
 # 强制中文支持
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
 plt.rcParams['axes.unicode_minus'] = False
@@ -21,9 +26,11 @@ tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
 with tab1:
     st.subheader("未来7天累计火警概率热力图")
     # 读取预测数据
-    future = pd.read_csv(f"data/fire_pred_next7days_cn.csv", encoding='utf-8-sig')
-    # 全部点叠加
-    heat_data = future[['纬度网格', '经度网格', '预测有火警概率']].values.tolist()
+    future = load_forecast(['网格编号', '预测有火警概率'])
+    # 按整数网格编号累计 7 天概率，每个网格一个点（网格中心为高德坐标，转为 WGS-84 对齐 Carto 底图）
+    cell_prob = future.groupby('网格编号')['预测有火警概率'].sum()
+    wgs_lon, wgs_lat = gcj02_to_wgs84(*cells.cell_center(cell_prob.index.to_numpy()))
+    heat_data = np.column_stack([wgs_lat, wgs_lon, cell_prob.to_numpy()]).tolist()
     center = [31.22, 121.55]
     m = folium.Map(location=center, zoom_start=10, tiles='cartodbpositron')
     HeatMap(
@@ -35,12 +42,23 @@ with tab1:
 
 with tab2:
     st.subheader("模型评估信息")
-    info = pd.read_csv(f"data/fire_model_info.csv", encoding='utf-8-sig')
+    info = pd.read_csv(DATA_DIR / "fire_model_info.csv", encoding='utf-8-sig')
     st.table(info.T)
+    backtest_path = DATA_DIR / "fire_backtest_folds.csv"
+    if backtest_path.exists():
+        st.markdown("**网格-日基线模型滚动回测（按周前推，只用预测起点之前的数据训练）**")
+        st.caption("上表为线上模型在随机划分测试集上的结果，含未来信息、偏乐观。"
+                   "下表是单独的基线模型（只用 7 个网格×日时空特征），不是线上模型的回测，"
+                   "用作无时间泄漏的对照参考。")
+        folds = pd.read_csv(backtest_path, encoding='utf-8-sig')
+        st.dataframe(folds, use_container_width=True)
+        st.table(folds.drop(columns=['预测起点']).mean(numeric_only=True).rename('各折均值').to_frame().T)
+    else:
+        st.caption("运行 `python -m fire_model.backtest` 可生成网格-日基线模型的滚动回测结果。")
 
 with tab3:
     st.subheader("混淆矩阵")
-    cmatrix = pd.read_csv(f"data/fire_confusion_matrix.csv", header=None)
+    cmatrix = pd.read_csv(DATA_DIR / "fire_confusion_matrix.csv", header=None)
     fig, ax = plt.subplots(figsize=(4,3))
     sns.heatmap(cmatrix, annot=True, fmt='d', cmap='Blues', cbar=False, ax=ax)
     ax.set_xlabel('预测标签')
@@ -49,7 +67,7 @@ with tab3:
 
 with tab4:
     st.subheader("特征重要性 Top 15")
-    fi = pd.read_csv(f"data/fire_feature_importance.csv", index_col=0, encoding='utf-8-sig')
+    fi = pd.read_csv(DATA_DIR / "fire_feature_importance.csv", index_col=0, encoding='utf-8-sig')
     fi = fi.sort_values(by=fi.columns[0], ascending=False)
     st.bar_chart(fi.head(15))
     with st.expander("显示全部特征重要性表格"):
@@ -57,13 +75,13 @@ with tab4:
 
 with tab5:
     st.subheader("测试集预测结果（前100行）")
-    result = pd.read_csv(f"data/fire_pred_result_cn.csv", encoding='utf-8-sig')
+    result = load_pred_result()
     st.dataframe(result.head(100), use_container_width=True)
     st.download_button("下载全部测试集预测结果", result.to_csv(index=False, encoding='utf-8-sig'), "fire_pred_result_cn.csv")
 
 with tab6:
     st.subheader("未来7天每日概率表（可下载）")
-    future = pd.read_csv(f"data/fire_pred_next7days_cn.csv", encoding='utf-8-sig')
+    future = load_forecast()
     st.dataframe(future.head(100), use_container_width=True)
     st.download_button("下载未来7天每日预测", future.to_csv(index=False, encoding='utf-8-sig'), "fire_pred_next7days_cn.csv")
     # 如果需要按天可视化，去掉tab1的全部热力，写成日期下拉+热力渲染（参考上面历史回复）
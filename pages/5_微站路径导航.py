@@ -1,52 +1,22 @@
+import os
+
 import streamlit as st
 import requests
-import pandas as pd
 from streamlit_folium import st_folium
 import folium
-import math
+import numpy as np
+import pandas as pd
+
+from fire_data.loaders import load_route_cache, load_router, load_stations
+from fire_spatial.transform import gcj02_to_wgs84
 
 st.set_page_config(page_title="🚗 微站-火警导航", layout="wide")
 st.title("微站到火警点导航路径展示")
 
-API_KEY = "89d2570099dca1c27439bfa3b9cda8d5"  # 替换成你的高德API Key
-
-@st.cache_data
-def load_station_data():
-    df = pd.read_csv("data/微站地址_已地理编码.csv", encoding="utf-8")
-    return df[['所属微站', '微站地址_纬度', '微站地址_经度']]
-
-def gcj02_to_wgs84(lng, lat):
-    def transformLat(x, y):
-        ret = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x))
-        ret += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
-        ret += (20.0 * math.sin(y * math.pi) + 40.0 * math.sin(y / 3.0 * math.pi)) * 2.0 / 3.0
-        ret += (160.0 * math.sin(y / 12.0 * math.pi) + 320 * math.sin(y * math.pi / 30.0)) * 2.0 / 3.0
-        return ret
-    def transformLng(x, y):
-        ret = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x))
-        ret += (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
-        ret += (20.0 * math.sin(x * math.pi) + 40.0 * math.sin(x / 3.0 * math.pi)) * 2.0 / 3.0
-        ret += (150.0 * math.sin(x / 12.0 * math.pi) + 300.0 * math.sin(x / 30.0 * math.pi)) * 2.0 / 3.0
-        return ret
-    def outOfChina(lng, lat):
-        return not (73.66 < lng < 135.05 and 3.86 < lat < 53.55)
-    if outOfChina(lng, lat):
-        return lng, lat
-    a = 6378245.0
-    ee = 0.00669342162296594323
-    dLat = transformLat(lng - 105.0, lat - 35.0)
-    dLng = transformLng(lng - 105.0, lat - 35.0)
-    radLat = lat / 180.0 * math.pi
-    magic = math.sin(radLat)
-    magic = 1 - ee * magic * magic
-    sqrtMagic = math.sqrt(magic)
-    dLat = (dLat * 180.0) / ((a * (1 - ee)) / (magic * sqrtMagic) * math.pi)
-    dLng = (dLng * 180.0) / (a / sqrtMagic * math.cos(radLat) * math.pi)
-    mgLat = lat + dLat
-    mgLng = lng + dLng
-    return lng * 2 - mgLng, lat * 2 - mgLat
-
-stations = load_station_data()
+API_KEY = os.environ.get("AMAP_API_KEY", "").strip()  # 仅在本地路网缺失时使用，未设置则不走在线路径规划
+AMAP_TIMEOUT = 10
+
+stations = load_stations(['所属微站', '微站地址_纬度', '微站地址_经度'])
 
 st.markdown("请选择微站，并输入终点（火警点）坐标：")
 station_name = st.selectbox("选择微站名称", stations['所属微站'].unique())
@@ -60,50 +30,77 @@ with col1:
 with col2:
     end_lat = st.text_input("终点纬度（火警点）", value="31.2232")
 
-if "route_points" not in st.session_state:
-    st.session_state["route_points"] = None
-if "route_info" not in st.session_state:
-    st.session_state["route_info"] = None
-if "road_list" not in st.session_state:
-    st.session_state["road_list"] = []
+# 会话里只保存缓存键；折线等大对象在进程级缓存中编码保存，各会话共用
+if "route_key" not in st.session_state:
+    st.session_state["route_key"] = None
+if "route_error" not in st.session_state:
+    st.session_state["route_error"] = None
 
-if st.button("🚀 计算并显示路径"):
+def amap_route(start_lng, start_lat, end_lng, end_lat):
+    """高德驾车路径（本地路网缺失时的后备），返回 (路线信息, 折线点, 途经路名)"""
     route_url = (
         f"https://restapi.amap.com/v3/direction/driving?"
         f"origin={start_lng},{start_lat}&destination={end_lng},{end_lat}&key={API_KEY}"
     )
-    res = requests.get(route_url).json()
-    st.session_state["road_list"] = []
+    try:
+        res = requests.get(route_url, timeout=AMAP_TIMEOUT).json()
+    except (requests.RequestException, ValueError):
+        return "❌ 高德路径服务不可用，请稍后重试或先构建本地路网。", None, []
 
     if res.get('status') == '1' and res.get('route', {}).get('paths'):
         steps = res['route']['paths'][0]['steps']
         distance = int(res['route']['paths'][0]['distance'])
         duration = int(res['route']['paths'][0]['duration']) // 60
-        st.session_state["route_info"] = f"✔️ 路径成功：全程约 {distance} 米，预计 {duration} 分钟"
-
-        all_points = []
-        roads = []
-        for step in steps:
-            road = step.get('road', '')
-            if road:
-                roads.append(road)
-            polyline = step.get('polyline', '')
-            if polyline:
-                for pair in polyline.split(';'):
-                    try:
-                        lng, lat = pair.split(',')
-                        lng, lat = float(lng), float(lat)
-                        wgs_lng, wgs_lat = gcj02_to_wgs84(lng, lat)
-                        all_points.append([wgs_lat, wgs_lng])
-                    except:
-                        continue
-        st.session_state["route_points"] = all_points
+
+        roads = [step['road'] for step in steps if step.get('road')]
+        # 全部折线点一次解析、一次向量化转换为 WGS-84
+        pairs = ';'.join(step['polyline'] for step in steps if step.get('polyline')).split(';')
+        coords = np.array([pair.split(',') for pair in pairs if pair.count(',') == 1], dtype=float).reshape(-1, 2)
+        wgs_lng, wgs_lat = gcj02_to_wgs84(coords[:, 0], coords[:, 1])
+        all_points = np.column_stack([wgs_lat, wgs_lng]).tolist()
         # 合并连续重复路名
-        st.session_state["road_list"] = [r for i, r in enumerate(roads) if i == 0 or r != roads[i-1]]
+        road_list = [r for i, r in enumerate(roads) if i == 0 or r != roads[i-1]]
+        return f"✔️ 路径成功：全程约 {distance} 米，预计 {duration} 分钟", all_points, road_list
+    return "❌ 路径计算失败，请检查坐标或 API Key 是否正确。", None, []
+
+def local_route(router, start_lng, start_lat, end_lng, end_lat):
+    """本地路网最短时间路径（路网为 WGS-84，起终点先由 GCJ-02 转换）"""
+    result = router.route(gcj02_to_wgs84(start_lng, start_lat), gcj02_to_wgs84(end_lng, end_lat))
+    if result is None:
+        return "❌ 本地路网中起终点不连通，请检查坐标。", None, []
+    info = f"✔️ 路径成功（本地路网）：全程约 {int(result['distance'])} 米，预计 {int(result['duration']) // 60} 分钟"
+    return info, result['points'], result['roads']
+
+def route_key(router, station_name, end_lng, end_lat):
+    """缓存键：本地路网按终点吸附到的路网节点，高德按终点坐标取 4 位小数（约 10 米）"""
+    if router is not None:
+        node, _ = router.nearest_node(*gcj02_to_wgs84(end_lng, end_lat))
+        return ('本地', station_name, node)
+    return ('高德', station_name, round(end_lng, 4), round(end_lat, 4))
+
+router = load_router()
+route_cache = load_route_cache()
+no_route = router is None and not API_KEY
+if no_route:
+    st.warning("未找到本地路网 data/road_graph.npz，且未设置环境变量 AMAP_API_KEY，无法计算路径。"
+               "请先构建本地路网（python -m fire_routing.graph data/pudong.osm），或设置高德 key 后重启看板。")
+elif router is None:
+    st.caption("未找到本地路网 data/road_graph.npz，使用高德在线路径规划。")
+
+if st.button("🚀 计算并显示路径", disabled=no_route):
+    key = route_key(router, station_name, float(end_lng), float(end_lat))
+    if router is not None:
+        compute = lambda: local_route(router, start_lng, start_lat, float(end_lng), float(end_lat))
     else:
-        st.session_state["route_points"] = None
-        st.session_state["route_info"] = "❌ 路径计算失败，请检查坐标或 API Key 是否正确。"
-        st.session_state["road_list"] = []
+        compute = lambda: amap_route(start_lng, start_lat, end_lng, end_lat)
+    entry = route_cache.get_or_compute(key, compute)
+    # 失败结果不进缓存，只在本会话提示
+    st.session_state["route_key"] = key if entry.encoded else None
+    st.session_state["route_error"] = None if entry.encoded else entry.info
+
+route = route_cache.peek(st.session_state["route_key"]) if st.session_state["route_key"] else None
+if st.session_state["route_key"] and route is None:
+    st.session_state["route_error"] = "路线缓存已过期，请重新计算。"
 
 center_lng, center_lat = gcj02_to_wgs84((start_lng + float(end_lng)) / 2, (start_lat + float(end_lat)) / 2)
 m = folium.Map(
@@ -118,17 +115,24 @@ folium.Marker([start_wgs_lat, start_wgs_lng], popup="起点（微站）", icon=f
 end_wgs_lng, end_wgs_lat = gcj02_to_wgs84(float(end_lng), float(end_lat))
 folium.Marker([end_wgs_lat, end_wgs_lng], popup="终点（火警点）", icon=folium.Icon(color='red')).add_to(m)
 
-if st.session_state["route_points"]:
-    folium.PolyLine(st.session_state["route_points"], color="blue", weight=5, opacity=0.8, popup="导航路线").add_to(m)
+if route is not None:
+    folium.PolyLine(route.points, color="blue", weight=5, opacity=0.8, popup="导航路线").add_to(m)
 
 st_folium(m, width=850, height=600)
 
-if st.session_state["route_info"]:
-    st.info(st.session_state["route_info"])
+if route is not None:
+    st.info(route.info)
+elif st.session_state["route_error"]:
+    st.info(st.session_state["route_error"])
 
-if st.session_state["road_list"]:
+if route is not None and route.roads:
     st.success("途径道路：")
-    for idx, road in enumerate(st.session_state["road_list"], 1):
+    for idx, road in enumerate(route.roads, 1):
         st.write(f"{idx}. {road}")
 
+with st.expander("路线缓存统计"):
+    stats = route_cache.stats()
+    stats['命中率'] = f"{stats['命中率']:.1%}"
+    st.table(pd.DataFrame([stats]))
+
 st.caption("© 2025 导航 · OSM底图 · 路名整洁标签美观显示")
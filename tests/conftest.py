@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def stub_geocode(addresses, api_key, city=None, progress=None, **kwargs):
+    """本地桩：每个地址给一个固定坐标，全部成功"""
+    results = {a: (31.2 + i * 1e-4, 121.5, '成功') for i, a in enumerate(addresses)}
+    return results, {'cache_hit': 0, 'request': len(results), 'retry': 0}
+
+
+@pytest.fixture
+def no_network(monkeypatch):
+    """地理编码改走本地桩"""
+    from fire_geocode import fire_geocode_address, incremental
+    monkeypatch.setattr(incremental, 'geocode_addresses', stub_geocode)
+    monkeypatch.setattr(fire_geocode_address, 'geocode_addresses', stub_geocode)
+
+
+@pytest.fixture
+def incidents():
+    n = 20
+    return pd.DataFrame({
+        '立案时间': pd.date_range('2025-03-01', periods=n, freq='7h'),
+        '火警地址': [f'浦东新区 测试路{i}号' for i in range(n)],
+        '所属队站': ['周浦站', '川沙站'] * (n // 2),
+        '微站': [f'微站{i % 5}' for i in range(n)],
+        '火警类型': '杂物',
+    })
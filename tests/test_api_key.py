@@ -0,0 +1,21 @@
+import pytest
+
+from fire_data import ingest
+from fire_geocode import fire_geocode_address
+from fire_geocode.client import GeocodeFatalError, env_api_key
+
+
+def test_missing_key_fails_before_any_request(monkeypatch):
+    monkeypatch.delenv('AMAP_API_KEY', raising=False)
+    with pytest.raises(GeocodeFatalError, match='AMAP_API_KEY'):
+        env_api_key()
+    with pytest.raises(GeocodeFatalError):
+        fire_geocode_address.main([])
+    with pytest.raises(GeocodeFatalError):
+        ingest.Ingestor()
+
+
+def test_key_read_from_environment(monkeypatch):
+    monkeypatch.setenv('AMAP_API_KEY', ' abc ')
+    assert env_api_key() == 'abc'
+    assert ingest.Ingestor().api_key == 'abc'
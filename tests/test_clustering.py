@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from fire_spatial.clustering import ClusterService
+
+
+def fires(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'纬度': 31.2 + rng.random(n) * 0.1, '经度': 121.5 + rng.random(n) * 0.1})
+
+
+def test_result_labels_and_centres_come_from_one_model():
+    service = ClusterService(k_range=[2, 3], default_k=2)
+    df = fires()
+    service.sync(df)
+    labels, centers = service.result(3, timeout=30)
+    assert len(labels) == len(df) and centers.shape == (3, 2)
+    nearest = ((df.to_numpy()[:, None, :] - centers[None]) ** 2).sum(axis=2).argmin(axis=1)
+    assert (nearest == labels).all()
+
+
+def test_result_returns_none_instead_of_blocking_on_refit():
+    service = ClusterService(k_range=[2, 3], default_k=2)
+    service.sync(fires())
+    assert service.result(3, timeout=30) is not None
+    # 另一会话在 wait 与取结果之间触发了重新拟合：事件仍置位但模型已清空
+    with service._lock:
+        service._models.clear()
+    assert service.result(3, timeout=0) is None
@@ -0,0 +1,64 @@
+import importlib.util
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from fire_data import store
+from fire_data.cleaning import DESIRED_ORDER
+
+ROOT = Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location('data_clean', ROOT / '预处理' / 'data_clean.py')
+data_clean = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(data_clean)
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    """临时数据目录和一个 5 行的原始工作簿，第 2 行没有微站处置"""
+    monkeypatch.setattr(store, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(store, 'COLUMNAR_DIR', tmp_path / 'columnar')
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    sheet.append(DESIRED_ORDER)
+    for i in range(5):
+        t = f'2025-03-0{i + 1} 08:0{i}'
+        row = {col: t for col in DESIRED_ORDER if '时间' in col}
+        row.update({'火警地址': f'浦东新区 清洗路{i}号', '所属大队': '三林大队', '所属队站': '周浦站',
+                    '微站': f'微站{i}', '微站出动用时': 60, '微站处置': None if i == 1 else '侦查警戒2'})
+        sheet.append([row.get(col) for col in DESIRED_ORDER])
+    path = tmp_path / 'raw.xlsx'
+    wb.save(path)
+    return path
+
+
+def test_missing_disposal_keeps_legacy_csv_value(workbook):
+    csv_path = store.csv_path('incidents')
+    total, _, disposal, _ = data_clean.run(workbook, chunk_rows=2, csv_path=csv_path)
+    assert total == 5 and disposal == {'警戒': 4}
+    lines = csv_path.read_text(encoding='utf-8-sig').splitlines()
+    assert lines[2].split(',')[DESIRED_ORDER.index('微站处置')] == 'nan'
+    # 读取方（pandas / 列式文件）都把它当缺失值
+    assert pd.read_csv(csv_path, encoding='utf-8-sig')['微站处置'].isna().sum() == 1
+    assert store.load('incidents')['微站处置'].isna().sum() == 1
+
+
+def test_failed_chunk_leaves_previous_outputs(workbook, monkeypatch):
+    csv_path = store.csv_path('incidents')
+    data_clean.run(workbook, chunk_rows=2, csv_path=csv_path)
+    before = csv_path.read_bytes(), store.columnar_path('incidents').read_bytes()
+
+    clean_chunk, calls = data_clean.clean_chunk, []
+
+    def failing(raw, normalizer):
+        calls.append(len(raw))
+        if len(calls) == 2:
+            raise ValueError('bad chunk')
+        return clean_chunk(raw, normalizer)
+
+    monkeypatch.setattr(data_clean, 'clean_chunk', failing)
+    with pytest.raises(ValueError, match='bad chunk'):
+        data_clean.run(workbook, chunk_rows=2, csv_path=csv_path)
+    assert (csv_path.read_bytes(), store.columnar_path('incidents').read_bytes()) == before
+    assert not list(store.DATA_DIR.rglob('*.part')) and not list(store.DATA_DIR.rglob('*.tmp'))
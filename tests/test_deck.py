@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from fire_spatial import deck
+from fire_spatial.coverage import EARTH_RADIUS, CoverageIndex, to_web_mercator
+
+
+def test_service_circle_matches_covered_area():
+    lon, lat, radius = 121.5, 31.2, 2000
+    drawn = deck.service_radius(lat, radius)
+    assert 0.85 < drawn / radius < 0.86
+
+    # 圆周内外各 2% 的点：向北、向东按地面米数偏移
+    ground = np.array([0.98, 1.02, 0.98, 1.02]) * drawn
+    dlat = np.degrees(ground[:2] / EARTH_RADIUS)
+    dlon = np.degrees(ground[2:] / (EARTH_RADIUS * np.cos(np.radians(lat))))
+    fires = to_web_mercator(np.r_[lon, lon, lon + dlon], np.r_[lat + dlat, lat, lat])
+    index = CoverageIndex(to_web_mercator([lon], [lat]), ['微站A'], fires)
+    assert index.covered(radius).tolist() == [True, False, True, False]
+
+
+def test_station_layer_radius_per_station():
+    points = pd.DataFrame({'lon': [121.5, 121.6], 'lat': [31.0, 31.4], 'name': ['A', 'B']})
+    service, _ = deck.station_layers(points, 1000)
+    assert 'radius' not in points.columns
+    np.testing.assert_allclose([row['radius'] for row in service.data], (1000 * np.cos(np.radians(points['lat']))).round(1))
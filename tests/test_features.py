@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from fire_model.features import assign_grid, grid_day_features, grid_window_features
+
+STEP = 0.01
+
+
+def original_grid_day_features(df, window=7):
+    """预处理/generate_fire_predict.py 原来的 0.01° 浮点网格双重循环，作为一致性校验的参照"""
+    grid_day = df.groupby(['纬度网格', '经度网格', '日期']).size().reset_index(name='火警次数')
+    all_dates = sorted(df['日期'].unique())
+    latlons = grid_day[['纬度网格', '经度网格']].drop_duplicates().values
+
+    def count_neighbor(grid_day, lat, lon, start_date, end_date):
+        delta = 0.01
+        neighbor_mask = (
+            (grid_day['纬度网格'] >= lat - delta) & (grid_day['纬度网格'] <= lat + delta) &
+            (grid_day['经度网格'] >= lon - delta) & (grid_day['经度网格'] <= lon + delta) &
+            (grid_day['日期'] >= start_date) & (grid_day['日期'] < end_date)
+        )
+        return grid_day[neighbor_mask]['火警次数'].sum()
+
+    feature_list = []
+    for day in all_dates[window:]:
+        day_dt = pd.to_datetime(day)
+        for lat, lon in latlons:
+            mask = (
+                (grid_day['纬度网格'] == lat) &
+                (grid_day['经度网格'] == lon) &
+                (grid_day['日期'] >= (day_dt - timedelta(days=window)).date()) &
+                (grid_day['日期'] < day_dt.date())
+            )
+            last7_cnt = grid_day[mask]['火警次数'].sum()
+            neighbor_last7_cnt = count_neighbor(
+                grid_day, lat, lon,
+                (day_dt - timedelta(days=window)).date(), day_dt.date()
+            )
+            cur_cnt = grid_day[
+                (grid_day['纬度网格'] == lat) &
+                (grid_day['经度网格'] == lon) &
+                (grid_day['日期'] == day_dt.date())
+            ]['火警次数'].sum()
+            feature_list.append({
+                '纬度网格': lat,
+                '经度网格': lon,
+                '日期': day_dt.date(),
+                '过去七天火警数': last7_cnt,
+                '邻域过去七天火警数': neighbor_last7_cnt,
+                '星期': day_dt.weekday(),
+                '有无火警': 1 if cur_cnt > 0 else 0
+            })
+    return pd.DataFrame(feature_list)
+
+
+def fires(n=300, days=25, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        '纬度': 31.20 + rng.random(n) * 0.06,
+        '经度': 121.50 + rng.random(n) * 0.06,
+        '立案时间': pd.Timestamp('2025-03-01') + pd.to_timedelta(rng.integers(0, days * 24, n), unit='h'),
+    })
+
+
+def test_counting_engine_matches_original_float_grid_loop():
+    df = fires()
+    df['纬度网格'] = (df['纬度'] // STEP) * STEP
+    df['经度网格'] = (df['经度'] // STEP) * STEP
+    df['日期'] = df['立案时间'].dt.date
+    lat_key = np.rint(df['纬度网格'] / STEP).astype(np.int64)
+    lon_key = np.rint(df['经度网格'] / STEP).astype(np.int64)
+
+    # 网格编号取 纬度行号 * 10^5 + 经度行号，升序即原循环的 (纬度, 经度) 顺序
+    fast = grid_window_features(lat_key * 100000 + lon_key, lat_key, lon_key, df['日期'])
+    slow = original_grid_day_features(df)
+    assert len(fast) == len(slow) > 0
+    assert (fast['日期'].to_numpy() == slow['日期'].to_numpy()).all()
+    for col in ['过去七天火警数', '邻域过去七天火警数', '星期', '有无火警']:
+        np.testing.assert_array_equal(fast[col].to_numpy(), slow[col].to_numpy(), err_msg=col)
+
+
+def test_missing_coordinates_are_skipped():
+    df = fires(n=60)
+    with_nan = pd.concat([df, pd.DataFrame({'纬度': [np.nan], '经度': [np.nan],
+                                            '立案时间': [df['立案时间'].max()]})], ignore_index=True)
+    expected = grid_day_features(assign_grid(df).assign(日期=lambda d: d['立案时间'].dt.date))
+    got = grid_day_features(assign_grid(with_nan).assign(日期=lambda d: d['立案时间'].dt.date))
+    assert (got['网格编号'] >= 0).all()
+    pd.testing.assert_frame_equal(got, expected)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from fire_geocode.client import AsyncGeocoder, GeocodeCache, GeocodeFatalError, TokenBucket
+
+# 本地模拟 /v3/geocode/geo：按地址返回不同的高德响应
+RESPONSES = {
+    '浦东新区成功路1号': [{'status': '1', 'infocode': '10000', 'geocodes': [{'location': '121.5,31.2'}]}],
+    '浦东新区限流路2号': [{'status': '0', 'infocode': '10004', 'info': 'ACCESS_TOO_FREQUENT'},
+                   {'status': '1', 'infocode': '10000', 'geocodes': [{'location': '121.6,31.3'}]}],
+    '浦东新区无结果路3号': [{'status': '1', 'infocode': '10000', 'geocodes': []}],
+    '浦东新区未知路4号': [{'status': '0', 'infocode': '30001', 'info': 'ENGINE_RESPONSE_DATA_ERROR'}],
+    '浦东新区坏key路5号': [{'status': '0', 'infocode': '10001', 'info': 'INVALID_USER_KEY'}],
+}
+
+
+def run_with_stub(addresses, cache, **kwargs):
+    """起本地模拟服务并批量编码，返回 (结果, 统计, 各地址请求次数)"""
+    hits = {}
+
+    async def geo(request):
+        address = request.query['address']
+        hits[address] = hits.get(address, 0) + 1
+        replies = RESPONSES[address]
+        return web.json_response(replies[min(hits[address], len(replies)) - 1])
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/v3/geocode/geo', geo)
+        async with TestServer(app) as server:
+            base_url = str(server.make_url(''))
+            async with AsyncGeocoder('test-key', qps=50, cache=cache, base_url=base_url, backoff=0.01,
+                                     **kwargs) as geocoder:
+                results = await geocoder.geocode_many(addresses)
+                return results, dict(geocoder.stats)
+
+    results, stats = asyncio.run(main())
+    return results, stats, hits
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = GeocodeCache(tmp_path / 'geocode_cache.sqlite')
+    yield cache
+    cache.close()
+
+
+def test_success_retry_and_classification(cache):
+    addresses = ['浦东新区成功路1号', '浦东新区限流路2号', '浦东新区无结果路3号', '浦东新区未知路4号']
+    results, stats, hits = run_with_stub(addresses, cache)
+    assert results['浦东新区成功路1号'] == (31.2, 121.5, '成功')
+    assert results['浦东新区限流路2号'] == (31.3, 121.6, '成功')
+    assert results['浦东新区无结果路3号'][2].startswith('失败')
+    assert results['浦东新区未知路4号'][2].startswith('错误')
+    assert hits['浦东新区限流路2号'] == 2 and stats['retry'] == 1
+
+    # 成功和查无结果写缓存；未归类错误码不写缓存，下次运行重新请求
+    results, stats, hits = run_with_stub(addresses, cache)
+    assert stats['cache_hit'] == 3 and hits == {'浦东新区未知路4号': 1}
+    assert results['浦东新区成功路1号'] == (31.2, 121.5, '成功')
+
+
+def test_fatal_infocode_aborts(cache):
+    with pytest.raises(GeocodeFatalError, match='INVALID_USER_KEY'):
+        run_with_stub(['浦东新区坏key路5号'], cache)
+    assert len(cache) == 0
+
+
+def test_token_bucket_limits_rate():
+    async def take(n):
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(take(6)) >= 5 / 20 * 0.9
@@ -0,0 +1,27 @@
+"""增量地理编码：全量输出之后的首次增量运行不能重复追加历史行"""
+import pandas as pd
+import pytest
+
+from fire_geocode import fire_geocode_address
+from fire_geocode.incremental import IncidentStore, run_incremental
+
+pytestmark = pytest.mark.usefixtures('no_network')
+
+
+def test_first_incremental_after_full_run_keeps_row_count(tmp_path, incidents):
+    output = tmp_path / '火警地址.csv'
+    fire_geocode_address.geocode_all(incidents, 'key').to_csv(output, index=False, encoding='utf-8-sig')
+    full_rows = len(pd.read_csv(output))
+
+    store = IncidentStore(tmp_path / 'state.sqlite')
+    try:
+        run_incremental(incidents, 'key', output, store=store)
+        assert len(pd.read_csv(output)) == full_rows
+
+        # 之后的增量只追加真正新增的行
+        new = incidents.tail(1).assign(立案时间=incidents['立案时间'].max() + pd.Timedelta(hours=1))
+        stats = run_incremental(pd.concat([incidents, new], ignore_index=True), 'key', output, store=store)
+        assert stats['新增'] == 1
+        assert len(pd.read_csv(output)) == full_rows + 1
+    finally:
+        store.close()
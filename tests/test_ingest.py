@@ -0,0 +1,119 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from fire_data import ingest, store
+from fire_data.cleaning import DESIRED_ORDER
+
+
+def raw_records(start, n):
+    t = pd.date_range(start, periods=n, freq='3h')
+    fmt = lambda s: s.strftime('%Y-%m-%d %H:%M')
+    return pd.DataFrame({
+        '立案时间': fmt(t), '火警地址': [f'浦东新区 接入路{i}号' for i in range(n)], '火警类型': '杂物',
+        '所属大队': '三林大队', '所属街道': '周浦镇', '实/虚警': '实警', '所属队站': '周浦站', '备注内容': '',
+        '微站': [f'微站{i}' for i in range(n)], '微站调派时间': fmt(t), '微站出动时间': fmt(t),
+        '微站到场时间': fmt(t + pd.Timedelta('5min')), '微站出动用时': 60.0,
+        '中队到场时间': fmt(t + pd.Timedelta('8min')), '微站出水情况': '否', '微站处置': '现场监护',
+        '建筑物内/外': '', '中队出动时间': fmt(t),
+    })[DESIRED_ORDER]
+
+
+def geocoder(fail=()):
+    """按地址给坐标；fail 里的地址返回暂时性错误"""
+    def run(addresses):
+        return {a: (None, None, '错误: 多次重试失败 - HTTP 503') if a in fail else (31.2, 121.5, '成功')
+                for a in addresses}
+    return run
+
+
+def broken(addresses):
+    raise ConnectionError('geocoder down')
+
+
+@pytest.fixture
+def live_store(tmp_path, monkeypatch):
+    """临时数据目录：批量快照 2 条，接入结果写到 tmp_path"""
+    monkeypatch.setattr(store, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(store, 'COLUMNAR_DIR', tmp_path / 'columnar')
+    monkeypatch.setattr(store, 'LIVE_DIR', tmp_path / 'columnar' / 'live')
+    monkeypatch.setattr(store, 'VERSION_PATH', tmp_path / 'columnar' / 'live' / 'VERSION')
+    ingestor = ingest.Ingestor(geocoder=geocoder())
+    snapshot = raw_records('2025-03-01', 2)
+    geo = ingestor.geocoded(ingest.clean_chunk(snapshot, ingestor.normalizer))
+    snapshot.to_csv(store.csv_path('incidents'), index=False, encoding='utf-8-sig')
+    geo.to_csv(store.csv_path('fires_cleaned'), index=False, encoding='utf-8-sig')
+    geo.to_csv(store.csv_path('fires_geocoded'), index=False, encoding='utf-8-sig')
+    return tmp_path
+
+
+def counts():
+    return {name: len(store.load(name)) for name in ingest.LIVE_DATASETS}
+
+
+def test_geocode_error_writes_nothing_and_batch_can_be_retried(live_store):
+    batch = raw_records('2025-04-01', 3)
+    with pytest.raises(ConnectionError):
+        ingest.Ingestor(geocoder=broken).ingest(batch)
+    assert counts() == {name: 2 for name in ingest.LIVE_DATASETS}
+    assert store.data_version() == 0
+
+    stats = ingest.Ingestor(geocoder=geocoder()).ingest(batch)
+    assert (stats['新增'], stats['编码成功'], stats['数据版本']) == (3, 3, 1)
+    assert counts() == {name: 5 for name in ingest.LIVE_DATASETS}
+
+
+def test_transient_failures_stay_pending_until_a_later_batch(live_store):
+    first = raw_records('2025-04-01', 3)
+    stats = ingest.Ingestor(geocoder=geocoder(fail={'浦东新区 接入路1号'})).ingest(first)
+    assert (stats['新增'], stats['编码成功'], stats['待重试']) == (3, 2, 1)
+    assert counts() == {'incidents': 5, 'fires_cleaned': 4, 'fires_geocoded': 4}
+
+    stats = ingest.Ingestor(geocoder=geocoder()).ingest(first.iloc[:0])
+    assert (stats['新增'], stats['编码成功'], stats['待重试']) == (0, 1, 0)
+    assert counts() == {name: 5 for name in ingest.LIVE_DATASETS}
+    assert not ingest.pending_path().exists()
+    assert stats['数据版本'] == 2
+
+
+def post(ingestor, records):
+    """起一个临时 HTTP 服务，POST /alarms 一次，返回 (状态码, 响应 JSON)"""
+    server = ingest.ThreadingHTTPServer(('127.0.0.1', 0), ingest.IngestHandler)
+    server.ingestor = ingestor
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        body = records.to_json(orient='records', force_ascii=False).encode('utf-8')
+        request = urllib.request.Request(f'http://127.0.0.1:{server.server_port}/alarms', data=body, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=30) as resp:
+                return resp.status, json.loads(resp.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read().decode('utf-8'))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_reports_geocoder_and_write_failures(live_store, monkeypatch):
+    batch = raw_records('2025-04-01', 2)
+    ingest.Ingestor(geocoder=geocoder(fail={'浦东新区 接入路0号'})).ingest(raw_records('2025-05-01', 1).assign(
+        火警地址='浦东新区 接入路0号'))
+    status, body = post(ingest.Ingestor(geocoder=broken), batch)
+    assert status == 502 and 'geocoder down' in body['错误'] and body['待重试'] == 1
+
+    def disk_full(name, df):
+        raise OSError('No space left on device')
+
+    append_segment = store.append_segment
+    monkeypatch.setattr(store, 'append_segment', disk_full)
+    status, body = post(ingest.Ingestor(geocoder=geocoder()), batch)
+    assert status == 500 and 'No space left' in body['错误']
+
+    monkeypatch.setattr(store, 'append_segment', append_segment)
+    status, body = post(ingest.Ingestor(geocoder=geocoder()), batch)
+    assert status == 200 and body['新增'] == 2
@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+import pytest
+
+from fire_data import loaders, store
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(store, 'COLUMNAR_DIR', tmp_path / 'columnar')
+    monkeypatch.setattr(store, 'LIVE_DIR', tmp_path / 'columnar' / 'live')
+    monkeypatch.setattr(store, 'VERSION_PATH', tmp_path / 'columnar' / 'live' / 'VERSION')
+    return tmp_path
+
+
+def rewrite(name, frame):
+    """重写源 CSV，并把修改时间往后推 1 秒（文件系统时间精度不够时也能区分）"""
+    path = store.csv_path(name)
+    existed = path.exists()
+    before = path.stat().st_mtime_ns if existed else 0
+    frame.to_csv(path, index=False, encoding='utf-8-sig')
+    if existed:
+        os.utime(path, ns=(path.stat().st_atime_ns, max(path.stat().st_mtime_ns, before + 10**9)))
+
+
+def test_forecast_reloads_after_rescoring(data_dir):
+    rewrite('forecast', pd.DataFrame({'日期': ['2025-04-01'], '网格编号': [1], '预测有火警概率': [0.1]}))
+    assert loaders.load_forecast()['预测有火警概率'].tolist() == [0.1]
+    rewrite('forecast', pd.DataFrame({'日期': ['2025-04-01'], '网格编号': [1], '预测有火警概率': [0.7]}))
+    assert loaders.load_forecast()['预测有火警概率'].tolist() == [0.7]
+
+
+def test_batch_rerun_invalidates_versioned_and_static_loaders(data_dir):
+    fires = pd.DataFrame({'立案时间': ['2025-04-01 08:00'], '所属队站': ['周浦站'], '微站': ['微站A']})
+    rewrite('incidents', fires)
+    rewrite('stations', pd.DataFrame({'所属微站': ['微站A'], '微站地址_纬度': [31.1], '微站地址_经度': [121.5]}))
+    version = loaders.data_version()
+    assert len(loaders.load_incidents(version=version)) == 1
+    assert len(loaders.load_stations()) == 1
+
+    # 流水线重跑：源 CSV 被整体重写，接入版本号不变
+    rewrite('incidents', pd.concat([fires, fires.assign(微站='微站B')], ignore_index=True))
+    rewrite('stations', pd.DataFrame({'所属微站': ['微站A', '微站B'], '微站地址_纬度': [31.1, 31.2],
+                                      '微站地址_经度': [121.5, 121.6]}))
+    assert loaders.data_version() != version and loaders.data_version()[0] == version[0]
+    assert len(loaders.load_incidents(version=version)) == 2
+    assert len(loaders.load_stations()) == 2
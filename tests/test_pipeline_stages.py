@@ -0,0 +1,60 @@
+"""流水线 geocode 阶段：在已有全量输出的检出上首次运行不能让 火警地址.csv 行数翻倍"""
+import ast
+import functools
+
+import pandas as pd
+
+from fire_geocode import fire_geocode_address
+from fire_geocode.incremental import IncidentStore, run_incremental
+from fire_pipeline.runner import ROOT, code_files, dependencies, topological_order
+from fire_pipeline.stages import STAGES
+
+
+def test_geocode_stage_on_existing_output_keeps_row_count(tmp_path, monkeypatch, no_network, incidents):
+    output = tmp_path / '火警地址.csv'
+    store = IncidentStore(tmp_path / 'state.sqlite')
+    monkeypatch.setenv('AMAP_API_KEY', 'test-key')
+    monkeypatch.setattr(fire_geocode_address, 'OUTPUT_PATH', output)
+    monkeypatch.setattr(fire_geocode_address, 'load_incidents', lambda: incidents)
+    monkeypatch.setattr(fire_geocode_address, 'run_incremental', functools.partial(run_incremental, store=store))
+    try:
+        fire_geocode_address.main([])  # 已有检出：手工跑过的全量编码
+        full_rows = len(pd.read_csv(output))
+        stage_args = STAGES['geocode']['cmd'][1:]
+        fire_geocode_address.main(stage_args)  # 流水线首次 run all
+        assert len(pd.read_csv(output)) == full_rows
+        fire_geocode_address.main(stage_args)  # 再跑一次也不变
+        assert len(pd.read_csv(output)) == full_rows
+    finally:
+        store.close()
+
+
+def test_geocode_chain_order():
+    order = topological_order(dependencies())
+    chain = ['clean', 'geocode', 'geocode_fail', 'geocode_clean', 'cluster', 'train', 'score']
+    assert [name for name in order if name in chain] == chain
+
+
+def local_imports(rel, seen=None):
+    """rel 及其递归导入的项目内模块（相对项目根目录的 .py 路径）"""
+    seen = set() if seen is None else seen
+    if rel in seen:
+        return seen
+    seen.add(rel)
+    for node in ast.walk(ast.parse((ROOT / rel).read_text(encoding='utf-8'))):
+        names = [a.name for a in node.names] if isinstance(node, ast.Import) else []
+        if isinstance(node, ast.ImportFrom) and node.module:
+            names = [node.module] + [f"{node.module}.{a.name}" for a in node.names]
+        for name in names:
+            path = name.replace('.', '/') + '.py'
+            if (ROOT / path).is_file():
+                local_imports(path, seen)
+    return seen
+
+
+def test_stage_code_covers_imported_modules():
+    for name, spec in STAGES.items():
+        cmd = spec['cmd']
+        entry = cmd[1].replace('.', '/') + '.py' if cmd[0] == '-m' else cmd[0]
+        missing = local_imports(entry) - set(code_files(spec['code']))
+        assert not missing, f"{name} 阶段缺少代码依赖：{sorted(missing)}"
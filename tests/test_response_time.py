@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+
+from fire_data import response_time, store
+
+
+def alarms(times, stations, minutes):
+    t = pd.to_datetime(pd.Series(times))
+    return pd.DataFrame({
+        '立案时间': t, '所属队站': '周浦站', '微站': stations, '微站出动用时': minutes,
+        '微站调派时间': t, '微站到场时间': t + pd.Timedelta('6min'), '中队到场时间': t + pd.Timedelta('9min'),
+    })
+
+
+def overall(sketches):
+    return sketches.digest(response_time.ALL, response_time.ALL, '微站出动用时')
+
+
+def test_late_and_same_minute_alarms_are_folded_once():
+    sketches = response_time.ResponseSketches()
+    first = alarms(['2025-03-01 08:00', '2025-03-02 09:30'], ['微站A', '微站B'], [60, 90])
+    assert sketches.update(first) == 2
+    # 与最新一条同一时刻的另一个微站、以及早于最新时刻的迟到记录
+    late = alarms(['2025-03-02 09:30', '2025-03-01 12:00'], ['微站C', '微站A'], [120, 30])
+    assert sketches.update(pd.concat([first, late], ignore_index=True)) == 2
+    assert sketches.update(pd.concat([first, late], ignore_index=True)) == 0
+    assert overall(sketches).count == 4
+
+
+def test_corrected_snapshot_rebuilds(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(store, 'COLUMNAR_DIR', tmp_path / 'columnar')
+    monkeypatch.setattr(store, 'LIVE_DIR', tmp_path / 'columnar' / 'live')
+    source, path = store.csv_path('incidents'), tmp_path / 'sketches.json'
+
+    alarms(['2025-03-01 08:00', '2025-03-02 09:30'], ['微站A', '微站B'], [60, 90]).to_csv(source, index=False)
+    assert overall(response_time.load_sketches(path)).max == 90
+
+    alarms(['2025-03-01 08:00', '2025-03-02 09:30'], ['微站A', '微站B'], [60, 300]).to_csv(source, index=False)
+    os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 10**9))
+    sketches = response_time.load_sketches(path)
+    assert (overall(sketches).count, overall(sketches).max) == (2, 300)
+    assert overall(response_time.load_sketches(path)).count == 2
+
+
+def test_state_only_keeps_lookback_window():
+    times = pd.date_range('2025-01-01', periods=24 * 60, freq='h')
+    history = alarms(times.strftime('%Y-%m-%d %H:%M'), '微站A', 60)
+    sketches = response_time.ResponseSketches()
+    assert sketches.update(history) == len(history)
+    assert len(sketches.recent) == 24 * response_time.LOOKBACK_DAYS + 1
+    assert sketches.high_water_mark == times[-1]
+    assert sketches.update(history) == 0
+
+    # 窗口内迟到的补入；早于窗口的不再补入（等批量快照重建）
+    late = alarms(['2025-03-01 12:00', '2025-01-10 12:00'], ['微站B', '微站B'], [30, 30])
+    assert sketches.update(pd.concat([history, late], ignore_index=True)) == 1
+    assert overall(sketches).count == len(history) + 1
@@ -0,0 +1,70 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from fire_routing.graph import RoadGraph
+from fire_routing.router import INF, Router
+
+
+def synthetic_grid(rows=40, cols=40, seed=0):
+    """合成网格路网（约 100 米间距，随机车速，部分单行）"""
+    rng = np.random.default_rng(seed)
+    lat = 31.2 + np.repeat(np.arange(rows), cols) * 0.0009
+    lon = 121.5 + np.tile(np.arange(cols), rows) * 0.00105
+    node = np.arange(rows * cols).reshape(rows, cols)
+    pairs = np.concatenate([
+        np.column_stack([node[:, :-1].ravel(), node[:, 1:].ravel()]),
+        np.column_stack([node[:-1, :].ravel(), node[1:, :].ravel()]),
+    ])
+    oneway = rng.random(len(pairs)) < 0.1
+    src = np.concatenate([pairs[:, 0], pairs[~oneway, 1]])
+    dst = np.concatenate([pairs[:, 1], pairs[~oneway, 0]])
+    length = np.full(len(src), 100.0)
+    seconds = length / rng.uniform(5, 20, len(src))
+    name_id = np.where(np.abs(src - dst) == 1, 1, 2)
+    return RoadGraph(lat, lon, src, dst, length, seconds, name_id, ['', '东西路', '南北路'])
+
+
+def random_graph(n=300, n_edges=1200, seed=0):
+    """随机有向图（无重边、无自环），最后一个节点孤立，与其他节点互不可达"""
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, n - 1, (n_edges, 2))
+    pairs = np.unique(pairs[pairs[:, 0] != pairs[:, 1]], axis=0)
+    src, dst = pairs[:, 0], pairs[:, 1]
+    seconds = rng.uniform(1, 60, len(src))
+    return RoadGraph(31.2 + rng.random(n) * 0.05, 121.5 + rng.random(n) * 0.05, src, dst,
+                     seconds * 10, seconds, np.zeros(len(src), dtype=int), [''])
+
+
+def assert_matches_scipy(graph, pairs):
+    router = Router(graph)
+    matrix = csr_matrix((graph.seconds.astype(float), (graph.src, graph.dst)), shape=(graph.n_nodes,) * 2)
+    sources = np.unique(pairs[:, 0])
+    expected = dijkstra(matrix, indices=sources)
+    row = {s: i for i, s in enumerate(sources)}
+    for s, t in pairs:
+        got, path = router.shortest_path(int(s), int(t))
+        want = expected[row[s], t]
+        if np.isinf(want):
+            assert got == INF and path is None
+            continue
+        assert np.isclose(got, want)
+        # 路径首尾相接、边权之和等于总秒数
+        nodes = [int(s)] + [int(graph.dst[e]) for e in path]
+        assert nodes[-1] == t and all(graph.src[e] == a for e, a in zip(path, nodes))
+        assert np.isclose(graph.seconds[path].astype(float).sum(), got)
+
+
+def test_bidirectional_dijkstra_matches_scipy_on_random_graph():
+    graph = random_graph()
+    rng = np.random.default_rng(1)
+    pairs = rng.integers(0, graph.n_nodes - 1, (300, 2))
+    isolated = graph.n_nodes - 1
+    pairs = np.vstack([pairs, [[0, isolated], [isolated, 0], [5, 5]]])
+    assert_matches_scipy(graph, pairs)
+
+
+def test_bidirectional_dijkstra_matches_scipy_on_grid():
+    graph = synthetic_grid()
+    pairs = np.random.default_rng(2).integers(0, graph.n_nodes, (100, 2))
+    assert_matches_scipy(graph, pairs)
@@ -1,122 +1,109 @@
 # coding: utf-8
+"""每日火警详情清洗
+
+按行块流式读取 XLSX（openpyxl 只读模式，不把整个工作簿读入内存），每块做删列、重排、
+关键列去空、时间列转换和微站处置归并，逐块写出：
+- 带类型的列式文件 data/columnar/incidents.feather：时间列保持 datetime64，
+  街道/大队等为类别列，页面和后续脚本直接读取，不再解析时间字符串；
+- 旧版 CSV data/每日火警详情.csv（时间格式 M/D/YYYY H:MM，地理编码脚本仍读取它），
+  只在导出时才格式化时间字符串，可用 --no-csv 跳过。
+内存占用只与块大小有关，与导出包含几个月的警情无关。
+
+    python 预处理/data_clean.py [--input data/每日火警详情.xlsx] [--chunk-rows 5000] [--no-csv]
+"""
 import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 sys.stdout.reconfigure(encoding='utf-8')
 
+import argparse
+from collections import Counter
+
+import openpyxl
 import pandas as pd
-import os
 
-def format_dt_no_leading_zero(ts):
-    """把 Timestamp 转成 M/D/YYYY H:MM（去秒、去前导零）"""
-    if pd.isna(ts):
-        return ""
-    return f"{ts.month}/{ts.day}/{ts.year} {ts.hour}:{ts.minute:02d}"
+from fire_data import store
+from fire_data.cleaning import SCHEMA, clean_chunk, legacy_csv_frame
+from fire_data.disposal import DisposalNormalizer
 
-def main():
-    # 1. 读取原始 XLSX 文件
-    input_path = r'data\每日火警详情.xlsx'
-    if not os.path.exists(input_path):
+INPUT_PATH = store.DATA_DIR / '每日火警详情.xlsx'
+OUTPUT_PATH = store.csv_path('incidents')
+CHUNK_ROWS = 5000
+
+
+def read_xlsx_chunks(path, chunk_rows=CHUNK_ROWS):
+    """只读模式逐行读取第一个工作表，每 chunk_rows 行产出一个 DataFrame"""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else '' for c in next(rows)]
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        wb.close()
+
+
+def run(input_path=INPUT_PATH, chunk_rows=CHUNK_ROWS, write_csv=True, csv_path=OUTPUT_PATH):
+    """流式清洗并写出列式文件（和旧版 CSV），返回 (总行数, 第一块预览, 微站处置计数, 未识别处置词报告)"""
+    if not Path(input_path).exists():
         raise FileNotFoundError(f"找不到输入文件：{input_path}")
-    df = pd.read_excel(input_path)
-
-    # 2. 删除不需要的列
-    columns_to_drop = ['中队出警用时', 'zzjly', 'ddjq', '中队到场用时']
-    df = df.drop(columns=[col for col in columns_to_drop if col in df.columns])
-
-    # 3. 重排列顺序以匹配目标 CSV
-    desired_order = [
-        '立案时间', '火警地址', '火警类型', '所属大队', '所属街道',
-        '实/虚警', '所属队站', '备注内容', '微站',
-        '微站调派时间', '微站出动时间', '微站到场时间', '微站出动用时',
-        '中队到场时间', '微站出水情况', '微站处置', '建筑物内/外', '中队出动时间'
-    ]
-    missing = [col for col in desired_order if col not in df.columns]
-    if missing:
-        raise KeyError(f"以下列在原表中不存在，请检查列名：{missing}")
-    df = df[desired_order]
-
-    # 4. 删除关键列有空值的行
-    required_cols = [
-        '微站调派时间', '微站出动时间', '所属大队',
-        '微站到场时间', '微站出动用时',
-        '中队到场时间', '中队出动时间',
-        '所属队站', '微站'
-    ]
-    df = df.dropna(subset=required_cols)
-
-    # 5. 格式化所有的时间列（去掉秒数、去除前导零）
-    time_cols = [
-        '立案时间', '微站调派时间', '微站出动时间',
-        '微站到场时间', '中队到场时间', '中队出动时间'
-    ]
-    for col in time_cols:
-        df[col] = pd.to_datetime(df[col], errors='coerce')
-        df[col] = df[col].apply(format_dt_no_leading_zero)
-
-    # 6. 微站处置归并（批量归并+侦查警戒复杂合并）
-    if "微站处置" in df.columns:
-        # 基础归并
-        replace_dict = {
-            # 警戒类
-            '警戒管控': '警戒', '警戒监控': '警戒', '侦查警戒': '警戒', '周边警戒': '警戒',
-            '周围警戒': '警戒', '外围警戒': '警戒', '现场警戒': '警戒', '到场警戒': '警戒', '查看警戒': '警戒',
-            # 出水类
-            '出水': '出水处置', '出水监护': '出水处置', '出水堵截': '出水处置', '出水降温': '出水处置',
-            '到场出水': '出水处置', '破拆出水': '出水处置', '使用手台泵出水': '出水处置',
-            # 排查类
-            '周边排查': '排查', '现场排查': '排查', '上楼排查': '排查', '寻找火点': '排查', '上去查看': '排查',
-            '周边寻找': '排查', '上楼查看': '排查', '寻找火源': '排查', '查看情况': '排查',
-            # 监护类
-            '现场监护': '监护',
-            # 配合处置
-            '配合中队警戒': '配合处置', '配合中队处置': '配合处置', '配合队站处置': '配合处置', '协助队站处置': '配合处置',
-            '配合中队周围搜寻': '配合处置', '配合队站进行排查': '配合处置', '配合消防站处置': '配合处置',
-            # 灭火器
-            '使用1个灭火器': '使用灭火器', '使用灭火器处置': '使用灭火器',
-            # 人员疏散
-            '疏散人员': '人员疏散',
-            # 堵截
-            '控制堵截': '堵截',
-        }
-        df["微站处置"] = df["微站处置"].astype(str).str.strip().replace(replace_dict)
-
-        # 侦查警戒相关复合项归并
-        df['微站处置'] = df['微站处置'].replace('侦查警戒，出水处置', '侦查警戒,出水处置')
-        df['微站处置'] = df['微站处置'].replace('侦查警戒疏散人员控控制堵截', '侦查警戒,人员疏散,堵截')
-        df['微站处置'] = df['微站处置'].replace('侦查警戒、疏散人员', '侦查警戒,人员疏散')
-        df['微站处置'] = df['微站处置'].replace('侦查警戒2', '侦查警戒')
-        df['微站处置'] = df['微站处置'].replace('侦查警戒、人员疏散', '侦查警戒,人员疏散')
-        df['微站处置'] = df['微站处置'].replace('控控制堵截', '堵截')
-
-        # 复合项"侦查警戒"转"警戒"（如“侦查警戒,出水处置”等）
-        def merge_jingjie(val):
-            if pd.isna(val):
-                return val
-            s = str(val)
-            parts = [p.strip() for p in s.split(',')]
-            parts = ['警戒' if p == '侦查警戒' else p for p in parts]
-            # 去重且保持顺序
-            seen = set()
-            parts_no_dup = []
-            for x in parts:
-                if x not in seen:
-                    seen.add(x)
-                    parts_no_dup.append(x)
-            return ','.join(parts_no_dup)
-        df['微站处置'] = df['微站处置'].apply(merge_jingjie)
-
-    # 7. 保存为新的 CSV
-    output_path = r'data\每日火警详情.csv'
-    df.to_csv(output_path, index=False, encoding='utf-8-sig')
-    print(f"\n已导出清洗后 CSV：{output_path}\n")
-
-    # 8. 控制台预览
+    preview, disposal, total = None, Counter(), 0
+    # 各块共用一个归并器，已归并过的取值跨块复用
+    normalizer = DisposalNormalizer()
+    # CSV 先写到 .part，全部块成功后再改名，中途失败时原 CSV 不被截断
+    csv_part = Path(str(csv_path) + '.part')
+
+    def cleaned_chunks():
+        nonlocal preview, total
+        for i, raw in enumerate(read_xlsx_chunks(input_path, chunk_rows)):
+            df = clean_chunk(raw, normalizer)
+            if write_csv:
+                # 先写 CSV，列式文件后写，保证列式文件比 CSV 新、读取时不会被重新转换
+                legacy_csv_frame(df).to_csv(csv_part, mode='w' if i == 0 else 'a', header=i == 0,
+                                            index=False, encoding='utf-8-sig' if i == 0 else 'utf-8')
+            if preview is None:
+                preview = df.head()
+            disposal.update(df['微站处置'].dropna())
+            total += len(df)
+            yield df
+
+    try:
+        store.write_chunks('incidents', cleaned_chunks(), SCHEMA)
+        if write_csv:
+            csv_part.replace(csv_path)  # 改名不改修改时间，CSV 仍比列式文件旧
+    finally:
+        csv_part.unlink(missing_ok=True)
+    return total, preview, disposal, normalizer.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每日火警详情流式清洗")
+    parser.add_argument('--input', default=str(INPUT_PATH), help="原始 XLSX 路径")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="每块行数")
+    parser.add_argument('--no-csv', action='store_true', help="不导出旧版 CSV，只写列式文件")
+    args = parser.parse_args()
+
+    total, preview, disposal, unmapped = run(args.input, args.chunk_rows, write_csv=not args.no_csv)
+    print(f"\n已导出清洗后列式文件：{store.columnar_path('incidents')}（{total} 行）")
+    if not args.no_csv:
+        print(f"已导出清洗后 CSV：{OUTPUT_PATH}\n")
+
+    # 控制台预览
     print("=== 清洗后数据预览（前 5 行） ===")
-    print(df.head().to_string(index=False))
-    if "微站处置" in df.columns:
-        print("\n处理后的微站处置唯一值:")
-        print(df["微站处置"].unique())
-        print("\n处理后的微站处置统计:")
-        print(df["微站处置"].value_counts())
+    print(preview.to_string(index=False))
+    print("\n处理后的微站处置唯一值:")
+    print(list(disposal))
+    print("\n处理后的微站处置统计:")
+    print(pd.Series(disposal).sort_values(ascending=False).to_string())
+    if len(unmapped):
+        print("\n未识别的微站处置写法（可加入 fire_data/disposal_rules.json）:")
+        print(unmapped.to_string(index=False))
 
 if __name__ == "__main__":
     main()